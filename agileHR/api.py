@@ -0,0 +1,223 @@
+"""Read-only JSON representation of the agileHR models, for the API views.
+
+Each Resource names the fields a model exposes and the relations other resources can be embedded through. Rows are read with values(), so no model instances are built, and every embedded relation is resolved with one id__in query per level of nesting, whatever the number of rows on the page.
+"""
+
+from django.db.models import Q
+
+from agileHR.models import *
+from agileHR.history import as_of, held_during, period
+from agileHR.search import BATCH_SIZE
+
+
+class ApiError(Exception):
+    """Raised for a request the API cannot answer, e.g. an unknown field; the message is sent back with a 400"""
+
+
+class Relation:
+    """Defines a relation a resource can embed.
+
+    Arguments:
+        resource {str} -- name of the related resource
+        local {str} -- the field on this side holding the key, e.g. "department_id", or "id" for a reverse relation
+        remote {str} -- the field on the related side it matches, e.g. "id", or "employee_id" for a reverse relation
+        many {bool} -- True when a row can have several related rows, embedded as a list
+    """
+
+    def __init__(self, resource, local, remote, many=False):
+        self.resource = resource
+        self.local = local
+        self.remote = remote
+        self.many = many
+
+
+class Resource:
+    """Defines a model as the API exposes it: the fields it may return, the relations it may embed, and the query parameters its list can be filtered by.
+
+    Arguments:
+        filters {dict} -- parameter name mapped onto a function turning its value into a Q, raising ValueError for a value it cannot read
+    """
+
+    def __init__(self, model, fields, relations, filters=None):
+        self.model = model
+        self.fields = fields
+        self.relations = relations
+        self.filters = filters or {}
+
+    def queryset(self):
+        return self.model.objects.all()
+
+
+def day_end(value):
+    start, end = period(value)
+    return end or start
+
+
+# as-of lookups over the assignment history, e.g. ?computer=7&at=2024-03-01 or ?employee=3&from=2024-01-01&to=2024-03-31
+ASSIGNMENT_FILTERS = {
+    "computer": lambda value: Q(computer_id=int(value)),
+    "employee": lambda value: Q(employee_id=int(value)),
+    "at": lambda value: as_of(*period(value)),
+    "from": lambda value: held_during(start=period(value)[0]),
+    "to": lambda value: held_during(end=day_end(value))
+}
+
+# the audit trail of one kind of row, or one row, over a time range, e.g. ?entity=employee&object=3&from=2024-03-01
+AUDIT_FILTERS = {
+    "entity": lambda value: Q(entity=value),
+    "object": lambda value: Q(object_id=int(value)),
+    "from": lambda value: Q(created_at__gte=period(value)[0]),
+    "to": lambda value: Q(created_at__lt=day_end(value))
+}
+
+RESOURCES = {
+    "departments": Resource(Department, ("id", "name", "budget"), {
+        "employees": Relation("employees", "id", "department_id", many=True)
+    }),
+    "employees": Resource(Employee, ("id", "first_name", "last_name", "start_date", "end_date", "is_supervisor", "department_id", "supervisor_id", "has_computer"), {
+        "department": Relation("departments", "department_id", "id"),
+        "supervisor": Relation("employees", "supervisor_id", "id"),
+        "reports": Relation("employees", "id", "supervisor_id", many=True),
+        "assignments": Relation("assignments", "id", "employee_id", many=True),
+        "enrollments": Relation("enrollments", "id", "employee_id", many=True)
+    }),
+    "computers": Resource(Computer, ("id", "make", "model", "serial_no", "purchase_date", "retire_date", "is_available", "current_assignment_id"), {
+        "current_assignment": Relation("assignments", "current_assignment_id", "id"),
+        "assignments": Relation("assignments", "id", "computer_id", many=True)
+    }),
+    "trainings": Resource(Training, ("id", "title", "start_date", "end_date", "max_attendees", "seats_taken"), {
+        "enrollments": Relation("enrollments", "id", "training_id", many=True),
+        "waitlist": Relation("waitlist", "id", "training_id", many=True)
+    }),
+    "assignments": Resource(EmployeeComputer, ("id", "employee_id", "computer_id", "date_assigned", "date_revoked"), {
+        "employee": Relation("employees", "employee_id", "id"),
+        "computer": Relation("computers", "computer_id", "id")
+    }, ASSIGNMENT_FILTERS),
+    "enrollments": Resource(EmployeeTraining, ("id", "employee_id", "training_id"), {
+        "employee": Relation("employees", "employee_id", "id"),
+        "training": Relation("trainings", "training_id", "id")
+    }),
+    "waitlist": Resource(WaitlistEntry, ("id", "employee_id", "training_id", "joined_at"), {
+        "employee": Relation("employees", "employee_id", "id"),
+        "training": Relation("trainings", "training_id", "id")
+    }),
+    "audit": Resource(AuditEntry, ("id", "entity", "object_id", "action", "changes", "path", "created_at"), {}, AUDIT_FILTERS)
+}
+
+
+def parse_fields(params, resource_name):
+    """Reads the sparse fieldsets: ?fields=a,b for the requested resource and ?fields[name]=a,b for any resource, embedded ones included.
+
+    Returns:
+        dict -- requested field names per resource name; resources not mentioned return all their fields
+    """
+
+    selected = {}
+    for key, value in params.items():
+        if key == "fields":
+            name = resource_name
+        elif key.startswith("fields[") and key.endswith("]"):
+            name = key[len("fields["):-1]
+        else:
+            continue
+        if name not in RESOURCES:
+            raise ApiError(f"unknown resource in {key}: {name}")
+        requested = [field for field in value.split(",") if field]
+        unknown = [field for field in requested if field not in RESOURCES[name].fields]
+        if unknown:
+            raise ApiError(f"unknown field{'s' if len(unknown) > 1 else ''} for {name}: {', '.join(unknown)}")
+        selected[name] = requested
+    return selected
+
+
+def parse_filters(params, resource_name):
+    """Combines the filter parameters a resource accepts into one condition; other parameters are left to the caller.
+
+    Returns:
+        Q -- every filter given, ANDed
+    """
+
+    condition = Q()
+    for name, build in RESOURCES[resource_name].filters.items():
+        if name in params:
+            try:
+                condition &= build(params[name])
+            except ValueError:
+                raise ApiError(f"cannot read {name}: {params[name]!r}")
+    return condition
+
+
+def parse_include(value, resource_name):
+    """Turns ?include=department,assignments.computer into a tree of relation names, checking every step exists.
+
+    Returns:
+        dict -- relation name mapped onto the tree of relations to embed inside it
+    """
+
+    tree = {}
+    for path in (value or "").split(","):
+        if not path:
+            continue
+        resource = RESOURCES[resource_name]
+        branch = tree
+        for name in path.split("."):
+            if name not in resource.relations:
+                raise ApiError(f"unknown relation in include: {path}")
+            branch = branch.setdefault(name, {})
+            resource = RESOURCES[resource.relations[name].resource]
+    return tree
+
+
+def columns(resource_name, fields, include):
+    """The fields to read for a resource: those requested, plus the keys its embedded relations join on"""
+
+    resource = RESOURCES[resource_name]
+    wanted = list(fields.get(resource_name, resource.fields))
+    for name in include:
+        local = resource.relations[name].local
+        if local not in wanted:
+            wanted.append(local)
+    return wanted
+
+
+def embed(rows, resource_name, fields, include):
+    """Embeds the included relations into rows, fetching each relation for all the rows at once, then trims every row to its requested fields.
+
+    Arguments:
+        rows {list} -- dicts read with columns(resource_name, fields, include)
+        resource_name {str} -- the resource the rows belong to
+        fields {dict} -- as returned by parse_fields
+        include {dict} -- as returned by parse_include, relative to this resource
+    """
+
+    resource = RESOURCES[resource_name]
+    for name, nested in include.items():
+        relation = resource.relations[name]
+        keys = list({row[relation.local] for row in rows if row[relation.local] is not None})
+        related_columns = columns(relation.resource, fields, nested)
+        if relation.remote not in related_columns:
+            related_columns.append(relation.remote)
+        related = []
+        for start in range(0, len(keys), BATCH_SIZE):
+            batch = keys[start:start + BATCH_SIZE]
+            related.extend(RESOURCES[relation.resource].queryset().filter(**{f"{relation.remote}__in": batch}).order_by("id").values(*related_columns))
+        # the join key has to be read before the related rows are trimmed to their requested fields
+        keyed = [(row[relation.remote], row) for row in related]
+        embed(related, relation.resource, fields, nested)
+
+        if relation.many:
+            grouped = {}
+            for key, row in keyed:
+                grouped.setdefault(key, []).append(row)
+            for row in rows:
+                row[name] = grouped.get(row[relation.local], [])
+        else:
+            found = dict(keyed)
+            for row in rows:
+                row[name] = found.get(row[relation.local])
+
+    wanted = set(fields.get(resource_name, resource.fields)) | set(include)
+    for row in rows:
+        for key in [key for key in row if key not in wanted]:
+            del row[key]
+    return rows
@@ -1,5 +1,13 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class AgilehrConfig(AppConfig):
     name = 'agileHR'
+
+    def ready(self):
+        from . import signals
+        from .tallies import create_totals
+        from .search import create_search_index
+        post_migrate.connect(create_search_index, sender=self)
+        post_migrate.connect(create_totals, sender=self)
@@ -0,0 +1,84 @@
+"""Keeps the computer availability pool in step with assignments: Computer.is_available and Employee.has_computer"""
+
+from django.db.models import BooleanField, Case, Exists, OuterRef, Value, When
+from django.utils import timezone
+
+from agileHR.models import *
+from agileHR import audit
+from agileHR.fragments import bump, entity, listing
+from agileHR.tallies import ASSIGNED, IDLE, adjust
+from agileHR.search import index_computers
+from agileHR.stamps import touch
+
+
+# a computer can be handed out when nobody holds it and it has not been retired
+AVAILABLE = Case(
+    When(current_assignment__isnull=True, retire_date__isnull=True, then=Value(True)),
+    default=Value(False),
+    output_field=BooleanField()
+)
+
+# availability of a computer whose assignment is being cleared in the same UPDATE, where SET still sees the old pointer
+IN_SERVICE = Case(
+    When(retire_date__isnull=True, then=Value(True)),
+    default=Value(False),
+    output_field=BooleanField()
+)
+
+
+def refresh_computers(computer_ids):
+    """Recomputes is_available for the given computers in one UPDATE"""
+
+    return Computer.objects.filter(pk__in=list(computer_ids)).update(is_available=AVAILABLE)
+
+
+def refresh_employees(employee_ids):
+    """Recomputes has_computer for the given employees in one UPDATE"""
+
+    open_assignment = EmployeeComputer.objects.filter(employee_id=OuterRef("pk"), date_revoked=None)
+    return Employee.objects.filter(pk__in=list(employee_ids)).update(has_computer=Exists(open_assignment))
+
+
+def available_computers():
+    """Computers that can be assigned, read straight off the is_available index"""
+
+    return Computer.objects.filter(is_available=True).order_by("make", "model", "id")
+
+
+def employees_needing_computers():
+    """Employees who are not terminated and hold no computer, read off the has_computer index"""
+
+    return Employee.objects.filter(has_computer=False).exclude(end_date__lte=timezone.now()).order_by("last_name", "id")
+
+
+def revoke_assignments(assignments, when):
+    """Closes the given open assignments with one UPDATE, then clears the pointers and refreshes the flags and search rows that depended on them"""
+
+    rows = list(assignments.filter(date_revoked=None).values_list("id", "computer_id", "employee_id"))
+    if not rows:
+        return 0
+    assignment_ids = [row[0] for row in rows]
+    EmployeeComputer.objects.filter(pk__in=assignment_ids).update(date_revoked=when)
+    audit.bulk_changed(EmployeeComputer, assignment_ids, date_revoked=[None, when])
+    # computers in service become idle; the rest, if any, are retired and stay so
+    released = Computer.objects.filter(current_assignment_id__in=assignment_ids, retire_date=None).update(current_assignment=None, is_available=True)
+    if released < len(rows):
+        Computer.objects.filter(current_assignment_id__in=assignment_ids).update(current_assignment=None, is_available=IN_SERVICE)
+    adjust({ASSIGNED: -released, IDLE: released})
+    refresh_employees({row[2] for row in rows})
+    index_computers({row[1] for row in rows})
+    touch(Computer, [row[1] for row in rows])
+    touch(Employee, [row[2] for row in rows])
+    bump(*[entity("computer", row[1]) for row in rows], listing("computers"))
+    return len(rows)
+
+
+def assign_computer(employee, computer, when):
+    """Revokes whatever the employee currently holds and opens an assignment of the computer to them
+
+    Returns:
+        EmployeeComputer -- the new assignment, whose post_save receiver claims the computer
+    """
+
+    revoke_assignments(EmployeeComputer.objects.filter(employee=employee), when)
+    return EmployeeComputer.objects.create(computer=computer, employee=employee, date_assigned=when)
@@ -0,0 +1,227 @@
+"""Append-only audit trail of the changes made to the agileHR models, with field-level diffs.
+
+Saving an audited instance reads the values stored for it first, so the save records exactly the fields that changed, and deleting it records what was removed; agileHR.signals does both. Entries do not touch the database as they are made: they are held until the transaction that made them is about to commit, then written with one bulk insert inside it, so they commit with the change, and work rolled back leaves none. AuditMiddleware notes the request path each entry is tagged with.
+"""
+
+import contextvars
+import json
+from contextlib import contextmanager
+from functools import lru_cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection
+
+from agileHR.models import *
+from agileHR.search import BATCH_SIZE
+
+
+CREATED = "created"
+CHANGED = "changed"
+DELETED = "deleted"
+
+# the path of the request being served; a context variable rather than a thread local, so jobs the request hands to the write queue see it too
+_path = contextvars.ContextVar("audit_path", default="")
+
+
+@lru_cache(maxsize=None)
+def tracked_fields(model):
+    """The fields whose changes are recorded: not the primary key, the updated_at stamp, or the fields signals maintain"""
+
+    maintained = getattr(model, "maintained_fields", ())
+    return [field for field in model._meta.concrete_fields if not field.primary_key and field.name != "updated_at" and field.name not in maintained]
+
+
+def read_stored(instance, update_fields=None, row=None):
+    """Reads the values stored for an instance about to be saved, to diff the save against, in one query; only the fields the save writes are read, and none for a new row
+
+    Arguments:
+        update_fields {iterable} -- the names of the fields the save writes, or None for all of them
+        row {dict} -- the stored row, keyed by attribute name, when it was read already; no query is made then
+    """
+
+    instance._audit_state = {}
+    if instance._state.adding or instance.pk is None:
+        return
+    attnames = [field.attname for field in tracked_fields(type(instance)) if field.attname in instance.__dict__ and (update_fields is None or field.name in update_fields)]
+    if row is not None:
+        instance._audit_state = {attname: row[attname] for attname in attnames}
+    elif attnames:
+        instance._audit_state = type(instance)._base_manager.filter(pk=instance.pk).values(*attnames).first() or {}
+
+
+def stored(field, value):
+    # the value as the database would store it, so "2024-03-01" assigned from a form equals the datetime it was loaded as
+    return field.get_db_prep_value(value, connection)
+
+
+def current_values(instance):
+    return {field.name: stored(field, instance.__dict__[field.attname]) for field in tracked_fields(type(instance)) if field.attname in instance.__dict__}
+
+
+def entry(entity, object_id, action, changes):
+    return AuditEntry(entity=entity, object_id=object_id, action=action, changes=json.dumps(changes, cls=DjangoJSONEncoder, sort_keys=True), path=_path.get())
+
+
+def diff(instance, update_fields=None):
+    """The fields of an instance that differ from the values read_stored read before its save
+
+    Returns:
+        dict -- field name mapped onto [old, new]
+    """
+
+    before = getattr(instance, "_audit_state", {})
+    changes = {}
+    for field in tracked_fields(type(instance)):
+        if field.attname not in before or field.attname not in instance.__dict__:
+            continue
+        if update_fields is not None and field.name not in update_fields:
+            continue
+        old, new = stored(field, before[field.attname]), stored(field, instance.__dict__[field.attname])
+        if old != new:
+            changes[field.name] = [old, new]
+    return changes
+
+
+def record(entries):
+    """Writes entries inside the surrounding transaction as it commits, with one insert for all the entries it made, or at once outside a transaction; entries made in a savepoint that is rolled back are dropped with it"""
+
+    entries = list(entries)
+    if not entries:
+        return
+    connection.before_commit(lambda: stage(entries))
+
+
+def stage(entries):
+    # the callbacks record() registered run one after another as the transaction commits; the first queues write_staged behind the rest, so one insert writes them all
+    staged = getattr(connection, "audit_staged", None)
+    if staged is not None and any(func is write_staged for _, func in connection.run_before_commit):
+        staged.extend(entries)
+        return
+    connection.audit_staged = list(entries)
+    connection.before_commit(write_staged)
+
+
+def write_staged():
+    entries, connection.audit_staged = connection.audit_staged, None
+    AuditEntry.objects.bulk_create(entries)
+
+
+def saved(instance, created, update_fields=None):
+    """Records a saved instance: every field when it was created, the fields that changed otherwise"""
+
+    entity = instance._meta.model_name
+    if created:
+        values = current_values(instance)
+        record([entry(entity, instance.pk, CREATED, {name: [None, value] for name, value in values.items()})])
+    else:
+        changes = diff(instance, update_fields)
+        if changes:
+            record([entry(entity, instance.pk, CHANGED, changes)])
+
+
+def deleted(instance):
+    """Records the values a deleted instance held"""
+
+    values = current_values(instance)
+    record([entry(instance._meta.model_name, instance.pk, DELETED, {name: [value, None] for name, value in values.items()})])
+
+
+def read_back_ids(instances, key):
+    """Fills in the primary keys bulk_create leaves empty on backends that do not return them, e.g. SQLite, with one query matching the new rows on key
+
+    Arguments:
+        key {tuple} -- attribute names that tell the new rows apart, e.g. ("employee_id", "training_id"); where older rows share a key, the newest is taken
+    """
+
+    missing = [instance for instance in instances if instance.pk is None]
+    if not missing:
+        return
+    model = type(missing[0])
+    # the product of the key values can match more rows than were inserted; only exact keys are used
+    rows = model.objects.filter(**{f"{name}__in": {getattr(instance, name) for instance in missing} for name in key}).order_by("id").values_list("id", *key)
+    ids = {tuple(row[1:]): row[0] for row in rows}
+    for instance in missing:
+        instance.pk = ids.get(tuple(getattr(instance, name) for name in key))
+
+
+def bulk_created(instances, key=None):
+    """Records rows inserted with bulk_create, which sends no post_save
+
+    Arguments:
+        key {tuple} -- attribute names telling the new rows apart, to read back the ids the backend did not return (see read_back_ids); without one they are recorded without an id
+    """
+
+    instances = list(instances)
+    if key:
+        read_back_ids(instances, key)
+    record([entry(instance._meta.model_name, instance.pk, CREATED, {name: [None, value] for name, value in current_values(instance).items()}) for instance in instances])
+
+
+def snapshot(queryset):
+    """Reads the id and tracked values of the rows a bulk delete is about to remove, for bulk_deleted
+
+    Returns:
+        list -- a dict per row, keyed by attribute name, e.g. "training_id"
+    """
+
+    return list(queryset.values("id", *[field.attname for field in tracked_fields(queryset.model)]))
+
+
+def bulk_deleted(model, rows):
+    """Records rows removed by a delete that sends no post_delete, from the values snapshot read before it"""
+
+    entity = model._meta.model_name
+    fields = tracked_fields(model)
+    record([entry(entity, row["id"], DELETED, {field.name: [stored(field, row[field.attname]), None] for field in fields}) for row in rows])
+
+
+def imported(model, fields, rows):
+    """Records rows written by the CSV importer, each a tuple of values for ("id",) + fields.
+
+    Unlike the other entries they are written at once, inside the transaction of the chunk they belong to, rather than held until it commits: an upload can hold far more rows than a transaction should keep in memory.
+    """
+
+    entity = model._meta.model_name
+    tracked = set(tracked_fields(model))
+    columns = [model._meta.get_field(name) for name in fields]
+    entries = [entry(entity, row[0], CREATED, {field.name: [None, stored(field, value)] for field, value in zip(columns, row[1:]) if field in tracked}) for row in rows]
+    AuditEntry.objects.bulk_create(entries, batch_size=BATCH_SIZE)
+
+
+def bulk_changed(model, object_ids, **changes):
+    """Records the same change made to many rows by one queryset update, which sends no signal
+
+    Arguments:
+        changes -- field name mapped onto its [old, new] values
+    """
+
+    entity = model._meta.model_name
+    prepared = {name: [stored(model._meta.get_field(name), value) for value in values] for name, values in changes.items()}
+    record([entry(entity, object_id, CHANGED, prepared) for object_id in object_ids])
+
+
+@contextmanager
+def recording(path=""):
+    """Tags the audit entries made inside the block with the path of the request making them"""
+
+    token = _path.set(path[:200])
+    try:
+        yield
+    finally:
+        _path.reset(token)
+
+
+def trail(entity, object_id=None, start=None, end=None):
+    """The recorded changes of a kind of row, or of one row, between two moments, oldest first, read off the (entity, object_id, created_at) index
+
+    Returns:
+        QuerySet -- AuditEntry rows
+    """
+
+    entries = AuditEntry.objects.filter(entity=entity)
+    if object_id is not None:
+        entries = entries.filter(object_id=object_id)
+    if start is not None:
+        entries = entries.filter(created_at__gte=start)
+    if end is not None:
+        entries = entries.filter(created_at__lt=end)
+    return entries.order_by("created_at", "id")
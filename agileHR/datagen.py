@@ -0,0 +1,145 @@
+"""Deterministic generators of synthetic agileHR rows, used by the scale_seeder command and the benchmark tests.
+
+Every chunk of rows is drawn from its own random.Random seeded with (seed, table, chunk), so the output is the same whether chunks are generated in one process or spread across several. The functions only build plain dicts, which keeps them free of Django imports and cheap to ship between processes.
+"""
+
+import datetime
+import random
+
+
+FIRST_NAMES = ["Ada", "Brendan", "Carmen", "Deborah", "Elif", "Femi", "Grace", "Hiro", "Ines", "Jamal", "Kelly", "Luis", "Mei", "Nadia", "Omar", "Priya", "Quinn", "Rachel", "Sebastian", "Tomas", "Uma", "Vikram", "Wen", "Ximena", "Yusuf", "Zoe"]
+LAST_NAMES = ["Abbott", "Baker", "Civarolo", "Daniel", "Evans", "Flores", "Garcia", "Huang", "Ivanova", "Johnson", "Kowalski", "Lopez", "McCray", "Morin", "Nguyen", "Okafor", "Patel", "Quintero", "Rossi", "Smith", "Tanaka", "Usman", "Vargas", "Williams", "Xu", "Young", "Zimmerman"]
+DEPARTMENT_WORDS = ["Accounting", "Sales", "Marketing", "Engineering", "Support", "Legal", "Facilities", "Research", "Logistics", "Security", "Finance", "Design"]
+COMPUTER_MAKES = ["Apple", "Dell", "Samsung", "Lenovo", "MSI", "ASUS", "HP", "Acer"]
+COMPUTER_MODELS = ["SilverBook", "ThoughtSheet", "YogaPose", "Orange Pro", "XPQ", "Inspiroff", "Blinky", "Pinky", "Inky", "Clyde", "BigBrother", "AbsoluteUnit"]
+TRAINING_TOPICS = ["Onboarding", "Security Awareness", "Leadership", "Excel", "Negotiation", "First Aid", "Public Speaking", "Django", "Budgeting", "Inclusion"]
+
+# the tables in the order they are generated, so every foreign key points at rows that already exist
+TABLES = ["department", "employee", "computer", "training", "assignment", "enrollment"]
+
+
+def chunk_random(seed, table, chunk):
+    """Returns the random generator for one chunk of one table"""
+
+    return random.Random(f"{seed}:{table}:{chunk}")
+
+
+def departments(spec, rng, start, stop):
+    return [{
+        "id": spec["offsets"]["department"] + i,
+        "name": f"{rng.choice(DEPARTMENT_WORDS)} {i + 1}".lower(),
+        "budget": rng.randrange(10000, 5000000, 1000)
+    } for i in range(start, stop)]
+
+
+def employees(spec, rng, start, stop):
+    anchor = spec["anchor"]
+    rows = []
+    for i in range(start, stop):
+        start_date = anchor - datetime.timedelta(days=rng.randrange(30, 3650))
+        terminated = rng.random() < 0.1
+        rows.append({
+            "id": spec["offsets"]["employee"] + i,
+            "first_name": rng.choice(FIRST_NAMES),
+            "last_name": rng.choice(LAST_NAMES) + ("" if rng.random() < 0.5 else f"-{rng.choice(LAST_NAMES)}"),
+            "start_date": start_date,
+            "end_date": start_date + datetime.timedelta(days=rng.randrange(1, 700)) if terminated else None,
+            "is_supervisor": rng.random() < 0.1,
+            "department_id": spec["offsets"]["department"] + rng.randrange(spec["counts"]["department"]) if spec["counts"]["department"] else None
+        })
+    return rows
+
+
+def computers(spec, rng, start, stop):
+    anchor = spec["anchor"]
+    rows = []
+    for i in range(start, stop):
+        purchase_date = anchor - datetime.timedelta(days=rng.randrange(30, 2000))
+        rows.append({
+            "id": spec["offsets"]["computer"] + i,
+            "make": rng.choice(COMPUTER_MAKES),
+            "model": rng.choice(COMPUTER_MODELS),
+            "serial_no": f"{rng.getrandbits(48):012X}",
+            "purchase_date": purchase_date,
+            "retire_date": purchase_date + datetime.timedelta(days=1500) if rng.random() < 0.05 else None
+        })
+    return rows
+
+
+def trainings(spec, rng, start, stop):
+    anchor = spec["anchor"]
+    per_training = -(-spec["counts"]["enrollment"] // spec["counts"]["training"]) if spec["counts"]["training"] else 0
+    rows = []
+    for i in range(start, stop):
+        start_date = anchor + datetime.timedelta(days=rng.randrange(-365, 180))
+        rows.append({
+            "id": spec["offsets"]["training"] + i,
+            "title": f"{rng.choice(TRAINING_TOPICS)} {i + 1}",
+            "start_date": start_date,
+            "end_date": start_date + datetime.timedelta(days=rng.randrange(0, 3)),
+            "max_attendees": max(per_training, rng.randrange(10, 60))
+        })
+    return rows
+
+
+def assignments(spec, rng, start, stop):
+    """Builds the assignment history of computers start..stop: `history` back-to-back assignments each, the last one left open for most machines"""
+
+    anchor = spec["anchor"]
+    history = spec["history"]
+    rows = []
+    for computer in range(start, stop):
+        assigned = anchor - datetime.timedelta(days=history * 200 + rng.randrange(100))
+        for j in range(history):
+            revoked = assigned + datetime.timedelta(days=rng.randrange(30, 200))
+            still_open = j == history - 1 and rng.random() < 0.8
+            rows.append({
+                "id": spec["offsets"]["assignment"] + computer * history + j,
+                "computer_id": spec["offsets"]["computer"] + computer,
+                "employee_id": spec["offsets"]["employee"] + rng.randrange(spec["counts"]["employee"]),
+                "date_assigned": assigned,
+                "date_revoked": None if still_open else revoked
+            })
+            assigned = revoked
+    return rows
+
+
+def enrollments(spec, rng, start, stop):
+    """Spreads enrollments round-robin over the trainings so none ends up over capacity"""
+
+    return [{
+        "id": spec["offsets"]["enrollment"] + i,
+        "training_id": spec["offsets"]["training"] + i % spec["counts"]["training"],
+        "employee_id": spec["offsets"]["employee"] + rng.randrange(spec["counts"]["employee"])
+    } for i in range(start, stop)]
+
+
+GENERATORS = {
+    "department": departments,
+    "employee": employees,
+    "computer": computers,
+    "training": trainings,
+    "assignment": assignments,
+    "enrollment": enrollments
+}
+
+
+def units(spec, table):
+    """How many generator units a table has: rows, except assignments which are generated per computer"""
+
+    return spec["counts"]["computer"] if table == "assignment" else spec["counts"][table]
+
+
+def chunks(spec, table, chunk_size):
+    """Splits a table into (table, chunk, start, stop) work items"""
+
+    per_chunk = max(1, chunk_size // spec["history"]) if table == "assignment" and spec["history"] else chunk_size
+    total = units(spec, table)
+    return [(table, index, start, min(start + per_chunk, total)) for index, start in enumerate(range(0, total, per_chunk))]
+
+
+def generate_chunk(spec, work):
+    """Generates one work item; a top-level function so multiprocessing can pickle it"""
+
+    table, index, start, stop = work
+    return table, GENERATORS[table](spec, chunk_random(spec["seed"], table, index), start, stop)
@@ -0,0 +1,161 @@
+"""Training enrollment with a per-training seat counter, so capacity checks are a single conditional UPDATE"""
+
+from collections import Counter
+from django.db import connection, transaction
+from django.db.models import F
+
+from agileHR.models import *
+from agileHR import audit
+from agileHR.fragments import bump, entity
+from agileHR.schedule import ScheduleConflict, find_conflicts
+from agileHR.search import BATCH_SIZE
+from agileHR.stamps import touch
+
+ENROLLMENTS = EmployeeTraining._meta.db_table
+
+
+class TrainingFull(Exception):
+    """Raised when a training has no seats left for an enrollment.
+
+    Arguments:
+        trainings {list} -- the trainings that could not take another attendee
+    """
+
+    def __init__(self, trainings):
+        self.trainings = trainings
+        titles = ", ".join(training.title for training in trainings)
+        super().__init__(f"{titles} {'is' if len(trainings) == 1 else 'are'} full")
+
+
+def reserve_seats(training_id, count=1):
+    """Takes seats on a training only if that keeps it within max_attendees.
+
+    The check and the increment are one UPDATE, so two requests racing for the last seat cannot both win.
+
+    Returns:
+        bool -- True when the seats were reserved
+    """
+
+    return Training.objects.filter(pk=training_id, seats_taken__lte=F("max_attendees") - count).update(seats_taken=F("seats_taken") + count) == 1
+
+
+def release_seats(training_id, count=1):
+    """Gives back seats on a training"""
+
+    Training.objects.filter(pk=training_id).update(seats_taken=F("seats_taken") - count)
+
+
+def enroll(employee, trainings, waitlist=False):
+    """Enrolls an employee in each of the trainings, all or nothing.
+
+    The trainings are first checked against the employee's schedule and each other. Seats are then reserved one conditional UPDATE per training and the enrollments inserted with one bulk_create; bulk_create sends no post_save, so the seats are not counted twice. The employee leaves the waitlists of the trainings they were seated on.
+
+    Arguments:
+        waitlist {bool} -- put the employee on the waitlist of trainings that are full instead of refusing the whole enrollment
+
+    Raises:
+        ScheduleConflict -- naming every training that overlaps one the employee has or is being enrolled in
+        TrainingFull -- naming every training that had no seat left; leaving the atomic block rolls back the seats already reserved
+
+    Returns:
+        list -- the new EmployeeTraining rows; trainings without one were waitlisted
+    """
+
+    trainings = list(trainings)
+    with transaction.atomic():
+        conflicts = find_conflicts((employee.pk, training) for training in trainings)
+        if conflicts:
+            raise ScheduleConflict(conflicts)
+        full = [training for training in trainings if not reserve_seats(training.pk)]
+        if full and not waitlist:
+            raise TrainingFull(full)
+        seated = [training for training in trainings if training not in full]
+        enrollments = EmployeeTraining.objects.bulk_create([EmployeeTraining(employee=employee, training=training) for training in seated])
+        audit.bulk_created(enrollments, key=("employee_id", "training_id"))
+        WaitlistEntry.objects.filter(employee=employee, training__in=seated).delete()
+        # bulk_create skips the receivers that would mark both sides as modified
+        touch(Employee, [employee.pk])
+        touch(Training, [training.pk for training in seated])
+        join_waitlist(employee, full)
+    bump(entity("employee", employee.pk), *[entity("training", training.pk) for training in seated])
+    return enrollments
+
+
+def join_waitlist(employee, trainings):
+    """Queues an employee for seats on full trainings, keeping their place on any waitlist they are already on"""
+
+    trainings = list(trainings)
+    if not trainings:
+        return
+    waiting = set(WaitlistEntry.objects.filter(employee=employee, training__in=trainings).values_list("training_id", flat=True))
+    WaitlistEntry.objects.bulk_create([WaitlistEntry(employee=employee, training=training) for training in trainings if training.pk not in waiting])
+    touch(Training, [training.pk for training in trainings])
+
+
+def promote_waitlist(training_id):
+    """Fills a training's free seats from the head of its waitlist, as one batch.
+
+    A pass reads the training, then as many waiting employees as there are free seats with one bounded query, in the order they joined. Those already enrolled in the training, and those whose schedule now clashes with it, lose their place; the rest are seated with one conditional seat reservation, one bulk_create and one DELETE. Passes repeat only while dropped employees left seats unfilled.
+
+    Returns:
+        list -- ids of the employees promoted
+    """
+
+    promoted = []
+    with transaction.atomic():
+        while True:
+            training = Training.objects.filter(pk=training_id).first()
+            free = training.max_attendees - training.seats_taken if training else 0
+            if free <= 0:
+                break
+            head = list(WaitlistEntry.objects.filter(training_id=training_id).order_by("joined_at", "id").values_list("id", "employee_id")[:free])
+            if not head:
+                break
+            enrolled = set(EmployeeTraining.objects.filter(training_id=training_id, employee_id__in=[employee_id for _, employee_id in head]).values_list("employee_id", flat=True))
+            clashing = {conflict.employee_id for conflict in find_conflicts((employee_id, training) for _, employee_id in head if employee_id not in enrolled)}
+            seated = [employee_id for _, employee_id in head if employee_id not in clashing and employee_id not in enrolled]
+            if seated and not reserve_seats(training_id, len(seated)):
+                break
+            audit.bulk_created(EmployeeTraining.objects.bulk_create([EmployeeTraining(employee_id=employee_id, training_id=training_id) for employee_id in seated]), key=("employee_id", "training_id"))
+            WaitlistEntry.objects.filter(pk__in=[pk for pk, _ in head]).delete()
+            promoted.extend(seated)
+            if not clashing and not enrolled:
+                break
+        if promoted:
+            touch(Employee, promoted)
+            touch(Training, [training_id])
+    if promoted:
+        bump(entity("training", training_id), *[entity("employee", employee_id) for employee_id in promoted])
+    return promoted
+
+
+def withdraw(enrollments):
+    """Deletes enrollments, then lets each training affected promote from its waitlist.
+
+    QuerySet.delete() would load every row to send post_delete, and the receivers would release the seats and touch the pages one row at a time. Instead the rows are read once, the seats given back with one UPDATE per training, the rows removed with a plain SQL DELETE that sends no signals, and what the receivers would have done (audit entries, stamps, fragment versions) done for all the rows at once.
+
+    Returns:
+        int -- the number of enrollments removed
+    """
+
+    with transaction.atomic():
+        rows = audit.snapshot(enrollments)
+        if not rows:
+            return 0
+        seats = Counter(row["training_id"] for row in rows if row["training_id"] is not None)
+        for training_id, count in seats.items():
+            release_seats(training_id, count)
+        ids = [row["id"] for row in rows]
+        # a plain DELETE: QuerySet.delete() would send post_delete for every row, and its receivers would release the seats again
+        with connection.cursor() as cursor:
+            for start in range(0, len(ids), BATCH_SIZE):
+                batch = ids[start:start + BATCH_SIZE]
+                cursor.execute(f"DELETE FROM {ENROLLMENTS} WHERE id IN ({', '.join(['%s'] * len(batch))})", batch)
+        audit.bulk_deleted(EmployeeTraining, rows)
+        employee_ids = [row["employee_id"] for row in rows]
+        touch(Employee, employee_ids)
+        touch(Training, seats)
+    bump(*[entity("employee", employee_id) for employee_id in set(employee_ids) if employee_id is not None], *[entity("training", training_id) for training_id in seats])
+    for training_id in seats:
+        promote_waitlist(training_id)
+    return len(rows)
@@ -0,0 +1,144 @@
+"""Streaming exports of the employee roster, the computer assignment history and the training enrollments.
+
+Rows are read with iterator(), which fetches them from the database cursor a chunk at a time instead of caching the whole result, and each row is encoded and handed to the response as soon as it is read. Memory use stays flat however long the table is, and the first row goes out before the last one has been read.
+"""
+
+import csv
+from django.core.serializers.json import DjangoJSONEncoder
+
+from agileHR.models import *
+
+
+# rows fetched from the database cursor per round trip
+CHUNK_SIZE = 2000
+
+# text handed to the server per write; one write per row would cost a system call each
+BLOCK_SIZE = 64 * 1024
+
+
+class Export:
+    """Defines one exportable dataset: a queryset and the columns it is written out with.
+
+    Arguments:
+        model {Model} -- the model the rows come from
+        columns {list} -- (heading, lookup) pairs, where lookup follows foreign keys with __, e.g. "department__name"
+    """
+
+    def __init__(self, model, columns):
+        self.model = model
+        self.columns = columns
+
+    @property
+    def headings(self):
+        return [heading for heading, _ in self.columns]
+
+    def rows(self, chunk_size=CHUNK_SIZE):
+        """Yields each row as a tuple of values, in id order; the joins come from the lookups, so no row triggers a query of its own"""
+
+        lookups = [lookup for _, lookup in self.columns]
+        return self.model.objects.order_by("id").values_list(*lookups).iterator(chunk_size=chunk_size)
+
+
+EXPORTS = {
+    "employees": Export(Employee, [
+        ("id", "id"),
+        ("first_name", "first_name"),
+        ("last_name", "last_name"),
+        ("start_date", "start_date"),
+        ("end_date", "end_date"),
+        ("is_supervisor", "is_supervisor"),
+        ("department_id", "department_id"),
+        ("department", "department__name")
+    ]),
+    "assignments": Export(EmployeeComputer, [
+        ("id", "id"),
+        ("computer_id", "computer_id"),
+        ("make", "computer__make"),
+        ("model", "computer__model"),
+        ("serial_no", "computer__serial_no"),
+        ("employee_id", "employee_id"),
+        ("first_name", "employee__first_name"),
+        ("last_name", "employee__last_name"),
+        ("date_assigned", "date_assigned"),
+        ("date_revoked", "date_revoked")
+    ]),
+    "enrollments": Export(EmployeeTraining, [
+        ("id", "id"),
+        ("employee_id", "employee_id"),
+        ("first_name", "employee__first_name"),
+        ("last_name", "employee__last_name"),
+        ("training_id", "training_id"),
+        ("title", "training__title"),
+        ("start_date", "training__start_date"),
+        ("end_date", "training__end_date")
+    ])
+}
+
+
+class Echo:
+    """A file-like object csv.writer can write to that hands each line back instead of buffering it"""
+
+    def write(self, value):
+        return value
+
+
+def plain(value):
+    """Dates as ISO 8601, the format the importer reads back; empty for missing values"""
+
+    if value is None:
+        return ""
+    return value.isoformat() if hasattr(value, "isoformat") else value
+
+
+def in_blocks(pieces, size=BLOCK_SIZE):
+    """Joins small pieces of text into blocks of about size characters; the first piece goes out on its own, so the download starts at once"""
+
+    pieces = iter(pieces)
+    yield next(pieces, "")
+    block = []
+    length = 0
+    for piece in pieces:
+        block.append(piece)
+        length += len(piece)
+        if length >= size:
+            yield "".join(block)
+            block = []
+            length = 0
+    if block:
+        yield "".join(block)
+
+
+def as_csv(export):
+    """Yields the export as CSV text: the header line, then blocks of rows"""
+
+    writer = csv.writer(Echo())
+
+    def lines():
+        yield writer.writerow(export.headings)
+        for row in export.rows():
+            yield writer.writerow([plain(value) for value in row])
+
+    return in_blocks(lines())
+
+
+def as_json(export):
+    """Yields the export as a JSON array of objects keyed by column heading, in blocks of rows"""
+
+    headings = export.headings
+    encoder = DjangoJSONEncoder()
+
+    def items():
+        yield "["
+        separator = "\n"
+        for row in export.rows():
+            yield separator + encoder.encode(dict(zip(headings, row)))
+            separator = ",\n"
+        yield "\n]\n"
+
+    return in_blocks(items())
+
+
+FORMATS = {
+    "csv": (as_csv, "text/csv"),
+    "json": (as_json, "application/json")
+}
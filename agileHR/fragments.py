@@ -0,0 +1,118 @@
+"""Version stamps for the cached template fragments of the agileHR list pages.
+
+Every entity (e.g. "employee:12") and every list page (e.g. "list:employee") has a version token in the cache. Templates put the tokens in their {% cache %} keys, so bumping a token makes the fragments built from the old data unreachable instead of deleting them one by one; they age out of the cache on their own. A "generation" token is part of every key, so bump_all invalidates everything at once after bulk loads that send no signals.
+"""
+
+import time
+from django.core.cache import InvalidCacheBackendError, caches
+from django.db import transaction
+
+
+# the cache alias {% cache %} uses for fragments: its own if configured, otherwise the default one
+FRAGMENT_CACHE = "template_fragments"
+
+# the tokens never expire; if one is evicted the next read replaces it with a fresh one rather than reusing an old value
+PREFIX = "agileHR:version:"
+
+GENERATION = "generation"
+
+
+def fragment_cache():
+    try:
+        return caches[FRAGMENT_CACHE]
+    except InvalidCacheBackendError:
+        return caches["default"]
+
+
+def fresh_token():
+    """A token no earlier version of any stamp can have held"""
+
+    return str(time.time_ns())
+
+
+def entity(kind, pk):
+    return f"{kind}:{pk}"
+
+
+def listing(name):
+    return f"list:{name}"
+
+
+def versions(names):
+    """Reads the current tokens of the given stamps in one cache round trip, creating any that are missing.
+
+    Returns:
+        dict -- token per stamp name, plus the generation under GENERATION
+    """
+
+    cache = fragment_cache()
+    names = set(names) | {GENERATION}
+    found = cache.get_many([PREFIX + name for name in names])
+    tokens = {name: found.get(PREFIX + name) for name in names}
+    missing = {PREFIX + name: fresh_token() for name, token in tokens.items() if token is None}
+    if missing:
+        cache.set_many(missing, None)
+        tokens.update({key[len(PREFIX):]: token for key, token in missing.items()})
+    return tokens
+
+
+def bump(*names):
+    """Gives the stamps new tokens, now and again when the surrounding transaction commits.
+
+    The second write covers a request that read the old rows under the first new token before the change was visible to it.
+    """
+
+    names = [name for name in names if name]
+    if not names:
+        return
+
+    def write():
+        fragment_cache().set_many({PREFIX + name: fresh_token() for name in names}, None)
+
+    write()
+    transaction.on_commit(write)
+
+
+def bump_all():
+    """Invalidates every fragment, e.g. after rows were bulk-inserted or updated without signals"""
+
+    bump(GENERATION)
+
+
+def page_versions(rows, kind, related=(), lists=()):
+    """Stamps the rows of a list page and returns the token of the page as a whole.
+
+    Arguments:
+        rows {list} -- model instances of one kind
+        kind {str} -- the stamp kind of the rows, e.g. "employee"
+        related {list} -- (kind, attribute) pairs naming the foreign keys of other displayed rows, e.g. [("department", "department_id")]
+        lists {list} -- the list stamps the page depends on
+
+    Returns:
+        str -- the generation joined with the list tokens, for keying the whole-list fragment
+    """
+
+    rows = list(rows)
+    names = {entity(kind, row.pk) for row in rows} | {listing(name) for name in lists}
+    for related_kind, attribute in related:
+        names |= {entity(related_kind, value) for value in (attribute_value(row, attribute) for row in rows) if value is not None}
+    tokens = versions(names)
+
+    for row in rows:
+        parts = [tokens[entity(kind, row.pk)]]
+        for related_kind, attribute in related:
+            value = attribute_value(row, attribute)
+            parts.append(tokens[entity(related_kind, value)] if value is not None else "-")
+        row.fragment_version = ".".join([tokens[GENERATION]] + parts)
+    return ".".join([tokens[GENERATION]] + [tokens[listing(name)] for name in lists])
+
+
+def attribute_value(row, path):
+    """Follows a dotted attribute path, returning None once a link is missing"""
+
+    value = row
+    for attribute in path.split("."):
+        value = getattr(value, attribute, None)
+        if value is None:
+            return None
+    return value
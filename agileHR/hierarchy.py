@@ -0,0 +1,140 @@
+"""The reporting hierarchy: Employee.supervisor, with its transitive closure kept in ReportingLine.
+
+An employee has one ReportingLine per manager above them, at the depth between the two, and none to themselves. Reading a subtree, a chain of command or a headcount is then one query on an index of that table, however deep the organization is, and moving an employee under another manager rewrites the lines of their whole subtree with one DELETE and one INSERT ... SELECT.
+"""
+
+from django.db import connection
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from agileHR.models import *
+
+
+LINES = ReportingLine._meta.db_table
+
+# every manager above the new supervisor, and the new supervisor at depth 0, paired with the moved employee at depth 0 and everyone under them
+INSERT_LINES = f"""
+    INSERT INTO {LINES} (ancestor_id, descendant_id, depth)
+    SELECT up.ancestor_id, down.descendant_id, up.depth + down.depth + 1
+    FROM (SELECT %s AS ancestor_id, 0 AS depth UNION ALL SELECT ancestor_id, depth FROM {LINES} WHERE descendant_id = %s) AS up,
+         (SELECT %s AS descendant_id, 0 AS depth UNION ALL SELECT descendant_id, depth FROM {LINES} WHERE ancestor_id = %s) AS down
+"""
+
+
+class HierarchyCycle(Exception):
+    """Raised when a supervisor change would make an employee report to themselves, directly or through their own reports"""
+
+    def __init__(self, employee, supervisor):
+        self.employee = employee
+        self.supervisor = supervisor
+        super().__init__(f"{supervisor.first_name} {supervisor.last_name} reports to {employee.first_name} {employee.last_name}")
+
+
+def reports_under(employee_id, max_depth=None):
+    """Everyone reporting to an employee, directly or through other managers, nearest levels first.
+
+    Arguments:
+        max_depth {int} -- only go this many levels down, e.g. 1 for direct reports
+
+    Returns:
+        QuerySet -- Employee rows
+    """
+
+    lines = Q(ancestor_lines__ancestor_id=employee_id)
+    if max_depth is not None:
+        lines &= Q(ancestor_lines__depth__lte=max_depth)
+    return Employee.objects.filter(lines).order_by("ancestor_lines__depth", "last_name", "id")
+
+
+def chain_of_command(employee_id):
+    """The managers above an employee, from their supervisor up to the top of the organization
+
+    Returns:
+        QuerySet -- Employee rows
+    """
+
+    return Employee.objects.filter(descendant_lines__descendant_id=employee_id).order_by("descendant_lines__depth")
+
+
+def headcounts(employee_ids):
+    """Counts everyone under each of the given employees, at any depth, in one grouped query
+
+    Returns:
+        dict -- employee id mapped onto the number of people reporting to them; 0 for those without reports
+    """
+
+    employee_ids = list(employee_ids)
+    counts = dict.fromkeys(employee_ids, 0)
+    rows = ReportingLine.objects.filter(ancestor_id__in=employee_ids).order_by().values_list("ancestor_id").annotate(total=Count("id"))
+    counts.update(rows)
+    return counts
+
+
+def check_supervisor(employee, supervisor_id):
+    """Refuses a supervisor for an employee when it is the employee or anyone under them, i.e. when the move would close a loop
+
+    Raises:
+        HierarchyCycle -- naming the supervisor refused
+    """
+
+    if supervisor_id is None or employee.pk is None:
+        return
+    if supervisor_id == employee.pk or ReportingLine.objects.filter(ancestor_id=employee.pk, descendant_id=supervisor_id).exists():
+        raise HierarchyCycle(employee, Employee.objects.get(pk=supervisor_id))
+
+
+def move_subtree(employee_id, supervisor_id):
+    """Puts an employee, and everyone under them, below a new supervisor, or at the top of the organization when supervisor_id is None.
+
+    The lines from the employee's former managers to the subtree are dropped in one DELETE, and the lines from the new supervisor and their managers written in one INSERT ... SELECT; lines inside the subtree stay as they are. Both the employees whose chain of command changed and the managers whose headcount did are marked as modified.
+    """
+
+    subtree = Q(descendant_id=employee_id) | Q(descendant_id__in=ReportingLine.objects.filter(ancestor_id=employee_id).values("descendant_id"))
+    former = list(ReportingLine.objects.filter(descendant_id=employee_id).values_list("ancestor_id", flat=True))
+    ReportingLine.objects.filter(subtree, ancestor_id__in=former).delete()
+    if supervisor_id is not None:
+        with connection.cursor() as cursor:
+            cursor.execute(INSERT_LINES, [supervisor_id, supervisor_id, employee_id, employee_id])
+
+    managers = ReportingLine.objects.filter(descendant_id=employee_id).values("ancestor_id")
+    Employee.objects.filter(Q(pk=employee_id) | Q(pk__in=ReportingLine.objects.filter(ancestor_id=employee_id).values("descendant_id")) | Q(pk__in=managers) | Q(pk__in=former)).update(updated_at=timezone.now())
+
+
+def detach_reports(employee_id):
+    """Cuts the lines running through an employee who is about to be deleted, so the managers above them no longer count the people below them.
+
+    Deleting the employee sets their reports' supervisor to NULL, which leaves each report at the top of its own subtree.
+    """
+
+    below = ReportingLine.objects.filter(ancestor_id=employee_id).values("descendant_id")
+    above = ReportingLine.objects.filter(descendant_id=employee_id).values("ancestor_id")
+    Employee.objects.filter(Q(pk__in=below) | Q(pk__in=above)).update(updated_at=timezone.now())
+    ReportingLine.objects.filter(descendant_id__in=below, ancestor_id__in=above).delete()
+
+
+def rebuild_hierarchy():
+    """Recomputes every ReportingLine from Employee.supervisor, e.g. after employees were imported with bulk inserts.
+
+    Lines are written one depth at a time, each depth with one INSERT ... SELECT from the one above, so an organization n levels deep takes n statements.
+
+    Returns:
+        int -- the number of lines written
+    """
+
+    ReportingLine.objects.all().delete()
+    employees = Employee._meta.db_table
+    total = 0
+    depth = 1
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {LINES} (ancestor_id, descendant_id, depth) SELECT supervisor_id, id, 1 FROM {employees} WHERE supervisor_id IS NOT NULL")
+        # a loop in the stored supervisors ends in an IntegrityError, once it reaches a pair already written
+        while cursor.rowcount > 0:
+            total += cursor.rowcount
+            cursor.execute(f"""
+                INSERT INTO {LINES} (ancestor_id, descendant_id, depth)
+                SELECT e.supervisor_id, l.descendant_id, l.depth + 1
+                FROM {LINES} l JOIN {employees} e ON e.id = l.ancestor_id
+                WHERE l.depth = %s AND e.supervisor_id IS NOT NULL
+            """, [depth])
+            depth += 1
+    return total
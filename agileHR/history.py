@@ -0,0 +1,71 @@
+"""As-of queries over the computer assignment history: who held a computer at a moment, and what an employee held during a period.
+
+An assignment covers [date_assigned, date_revoked), open ended while date_revoked is NULL. Every lookup names a computer or an employee, so it is a seek on the (computer, date_assigned) or (employee, date_assigned) index, bounded above by the end of the period, and reads only that one history however many millions of assignments the table holds.
+"""
+
+import datetime
+from django.db.models import Q
+
+from agileHR.models import *
+from agileHR.importer import parse_moment
+
+
+def held_at(moment):
+    """Assignments in force at a moment"""
+
+    return Q(date_assigned__lte=moment) & (Q(date_revoked=None) | Q(date_revoked__gt=moment))
+
+
+def held_during(start=None, end=None):
+    """Assignments sharing any moment with [start, end); either end may be left open"""
+
+    overlap = Q()
+    if end is not None:
+        overlap &= Q(date_assigned__lt=end)
+    if start is not None:
+        overlap &= Q(date_revoked=None) | Q(date_revoked__gt=start)
+    return overlap
+
+
+def period(value):
+    """Reads a date (YYYY-MM-DD) as that whole day, and a datetime as that single moment.
+
+    Returns:
+        tuple -- (start, end), with end None for a moment
+
+    Raises:
+        ValueError -- when value is neither
+    """
+
+    moment = parse_moment(value.strip())
+    if moment is None:
+        raise ValueError(f"{value!r} is not a date (YYYY-MM-DD) or a date and time")
+    if "T" in value or " " in value.strip():
+        return moment, None
+    return moment, moment + datetime.timedelta(days=1)
+
+
+def as_of(start, end=None):
+    """Assignments in force at start, or during [start, end) when an end is given"""
+
+    return held_at(start) if end is None else held_during(start, end)
+
+
+def holders(computer_id, start, end=None):
+    """The assignments of a computer in force at start, or during [start, end), in the order they began
+
+    Returns:
+        QuerySet -- EmployeeComputer rows with their employee
+    """
+
+    return EmployeeComputer.objects.filter(as_of(start, end), computer_id=computer_id).select_related("employee").order_by("date_assigned", "id")
+
+
+def computers_held(employee_id, start=None, end=None):
+    """The assignments an employee had at some point during [start, end), in the order they began
+
+    Returns:
+        QuerySet -- EmployeeComputer rows with their computer
+    """
+
+    return EmployeeComputer.objects.filter(held_during(start, end), employee_id=employee_id).select_related("computer").order_by("date_assigned", "id")
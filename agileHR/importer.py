@@ -0,0 +1,411 @@
+"""Streaming CSV import of departments, employees, computers and trainings.
+
+Rows are read one at a time, checked against in-memory lookup maps (department names, employee ids) instead of a query per row, and inserted one chunk per transaction with a single prepared INSERT. Going around bulk_create skips compiling SQL for every value, which is most of its cost at this volume; like bulk_create it sends no signals, so the fields agileHR.signals would maintain are written directly, and each chunk's audit entries are written in its transaction.
+"""
+
+import codecs
+import csv
+import datetime
+from collections import Counter
+from functools import lru_cache
+from django.db import connection, models, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from agileHR.models import *
+from agileHR import audit
+from agileHR.fragments import bump_all
+from agileHR.tallies import adjust, computer_counters, employee_counters, open_departments
+from agileHR.search import BATCH_SIZE, index_computers
+
+
+CHUNK_SIZE = 5000
+
+# most rows kept in a report; the rest are only counted
+MAX_REPORTED_ERRORS = 1000
+
+
+class RowError(Exception):
+    """Raised while converting a row; the message ends up in the import report"""
+
+
+class ImportReport:
+    """Defines the outcome of one import.
+
+    Returns:
+        created -- rows inserted
+        failed -- rows rejected
+        errors -- (line, message) for the first MAX_REPORTED_ERRORS rejected rows; line 1 is the header
+    """
+
+    def __init__(self):
+        self.created = 0
+        self.failed = 0
+        self.errors = []
+
+    def reject(self, line, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+
+class DecodedLines:
+    """Decodes a binary file one line at a time, so a line that is not valid text in the encoding, e.g. from a file saved as Windows-1252, fails only the row it belongs to instead of the whole import. A UTF-8 byte order mark, which spreadsheets write, is dropped.
+
+    Arguments:
+        raw {file} -- opened in binary mode, e.g. an upload's file
+        encoding {str} -- the encoding the file should be in
+
+    Returns:
+        invalid -- the numbers of the lines read so far that did not decode, replaced by their decoding with U+FFFD
+    """
+
+    def __init__(self, raw, encoding="utf-8"):
+        self.raw = raw
+        self.encoding = encoding
+        self.invalid = set()
+
+    def __iter__(self):
+        for number, line in enumerate(self.raw, 1):
+            if number == 1 and line.startswith(codecs.BOM_UTF8):
+                line = line[len(codecs.BOM_UTF8):]
+            try:
+                yield line.decode(self.encoding)
+            except UnicodeDecodeError:
+                self.invalid.add(number)
+                yield line.decode(self.encoding, "replace")
+
+
+def required(row, column):
+    value = (row.get(column) or "").strip()
+    if value == "":
+        raise RowError(f"{column} is required")
+    return value
+
+
+def optional(row, column):
+    return (row.get(column) or "").strip()
+
+
+def to_int(value, column, minimum=None):
+    try:
+        number = int(value)
+    except ValueError:
+        raise RowError(f"{column} must be a whole number, not {value!r}")
+    if minimum is not None and number < minimum:
+        raise RowError(f"{column} must be at least {minimum}")
+    return number
+
+
+@lru_cache(maxsize=4096)
+def parse_moment(value):
+    """Parses a date (YYYY-MM-DD) or an ISO datetime, reading naive values in the current time zone; cached, since large files repeat their dates"""
+
+    try:
+        parsed = parse_datetime(value)
+        if parsed is None:
+            day = parse_date(value)
+            parsed = datetime.datetime.combine(day, datetime.time()) if day else None
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        return None
+    return timezone.make_aware(parsed) if timezone.is_naive(parsed) else parsed
+
+
+def to_datetime(value, column):
+    parsed = parse_moment(value)
+    if parsed is None:
+        raise RowError(f"{column} must be a date (YYYY-MM-DD), not {value!r}")
+    return parsed
+
+
+def to_bool(value, column):
+    lowered = value.lower()
+    if lowered in ("", "0", "false", "no", "n"):
+        return False
+    if lowered in ("1", "true", "yes", "y"):
+        return True
+    raise RowError(f"{column} must be true or false, not {value!r}")
+
+
+def insert_rows(model, fields, rows):
+    """Inserts rows of values in the order of fields (attribute names, e.g. "department_id") with one executemany.
+
+    Values are converted for the database the way the model fields would, once per value rather than through the per-value SQL compilation of bulk_create.
+    """
+
+    columns = [model._meta.get_field(name) for name in fields]
+    adapters = [connection.ops.adapt_datetimefield_value if isinstance(field, models.DateTimeField) else None for field in columns]
+    # auto_now fields, e.g. updated_at, get the time of the insert, as save() and bulk_create would give them
+    stamped = [field for field in model._meta.concrete_fields if getattr(field, "auto_now", False) and field.name not in fields]
+    stamps = [connection.ops.adapt_datetimefield_value(timezone.now())] * len(stamped)
+    sql = "INSERT INTO {} ({}) VALUES ({})".format(
+        connection.ops.quote_name(model._meta.db_table),
+        ", ".join(connection.ops.quote_name(field.column) for field in columns + stamped),
+        ", ".join(["%s"] * len(columns + stamped))
+    )
+    params = [[adapt(value) if adapt and value is not None else value for adapt, value in zip(adapters, row)] + stamps for row in rows]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, params)
+
+
+def reserve_ids(model, count):
+    """Takes the next count ids of a table from SQLite's AUTOINCREMENT counter and returns the first; the rest follow it in order.
+
+    The counter only grows, so the ids of deleted rows are never handed out again, as they are not to rows Django inserts, and audit entries keyed by a deleted row's id never attach to a new one. Bumping the counter before reading it takes the write lock, so a concurrent writer waits rather than reserving the same ids.
+    """
+
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute("UPDATE sqlite_sequence SET seq = seq + %s WHERE name = %s", [count, table])
+        if not cursor.rowcount:
+            # no row was ever inserted into the table
+            cursor.execute("INSERT INTO sqlite_sequence (name, seq) VALUES (%s, %s)", [table, count])
+            return 1
+        cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = %s", [table])
+        return cursor.fetchone()[0] - count + 1
+
+
+class Importer:
+    """Base of the per-model importers: turns rows into tuples of field values and inserts them a chunk at a time.
+
+    Subclasses set model, columns (the CSV columns a file must have) and fields (the model fields build fills, in order), implement build, and may override prepare, or insert to write related rows in the same transaction.
+    """
+
+    model = None
+    columns = ()
+    fields = ()
+
+    def prepare(self):
+        """Loads the lookup maps the rows are checked against"""
+
+    def build(self, row):
+        """Converts one CSV row into a tuple of values for fields, raising RowError when it is invalid"""
+
+        raise NotImplementedError
+
+    def insert(self, rows):
+        """Inserts a chunk in one transaction and returns the id of its first row; the others follow it in order"""
+
+        with transaction.atomic():
+            first = reserve_ids(self.model, len(rows))
+            rows = [(first + offset,) + row for offset, row in enumerate(rows)]
+            insert_rows(self.model, ("id",) + self.fields, rows)
+            audit.imported(self.model, self.fields, rows)
+        return first
+
+    def run(self, lines, chunk_size=CHUNK_SIZE):
+        """Streams the CSV text in lines, returning an ImportReport
+
+        Rows the csv module cannot parse, e.g. with a field over its size limit, and rows on lines DecodedLines could not decode are rejected like invalid ones, so a damaged line never stops the import halfway through.
+
+        Arguments:
+            lines {iterable} -- the CSV file as text, e.g. an open file or DecodedLines over an upload
+            chunk_size {int} -- rows inserted per transaction
+        """
+
+        report = ImportReport()
+        invalid = getattr(lines, "invalid", set())
+        consumed = 0
+
+        def counted():
+            # the lines handed to the reader so far; csv.reader's own line_num is not advanced by a line it fails on
+            nonlocal consumed
+            for line in lines:
+                consumed += 1
+                yield line
+
+        reader = csv.DictReader(counted())
+        try:
+            fieldnames = reader.fieldnames or []
+        except csv.Error as error:
+            report.reject(1, f"unreadable header: {error}")
+            return report
+        if 1 in invalid:
+            report.reject(1, "the header is not UTF-8 text; save the file as CSV UTF-8")
+            return report
+        missing = [column for column in self.columns if column not in fieldnames]
+        if missing:
+            report.reject(1, f"missing column{'s' if len(missing) > 1 else ''}: {', '.join(missing)}")
+            return report
+
+        self.prepare()
+        chunk = []
+        rows = iter(reader)
+        while True:
+            start = consumed + 1
+            try:
+                row = next(rows)
+            except StopIteration:
+                break
+            except csv.Error as error:
+                report.reject(start, f"unreadable row: {error}")
+                continue
+            if invalid and not invalid.isdisjoint(range(start, consumed + 1)):
+                report.reject(start, "the row is not UTF-8 text; save the file as CSV UTF-8")
+                continue
+            try:
+                chunk.append(self.build(row))
+            except RowError as error:
+                report.reject(reader.line_num, str(error))
+                continue
+            if len(chunk) >= chunk_size:
+                self.insert(chunk)
+                report.created += len(chunk)
+                chunk = []
+        if chunk:
+            self.insert(chunk)
+            report.created += len(chunk)
+
+        if report.created:
+            # nothing went through save(), so no fragment version was bumped for the new rows
+            bump_all()
+        return report
+
+
+class DepartmentImporter(Importer):
+    model = Department
+    columns = ("name", "budget")
+    fields = ("name", "budget")
+
+    def prepare(self):
+        self.names = set(name.lower() for name in Department.objects.values_list("name", flat=True))
+
+    def build(self, row):
+        # stored lowercased, as the department form does
+        name = required(row, "name").lower()
+        budget = to_int(required(row, "budget"), "budget", minimum=0)
+        if name in self.names:
+            raise RowError(f"department {name!r} already exists")
+        self.names.add(name)
+        return (name, budget)
+
+    def insert(self, rows):
+        with transaction.atomic():
+            first = super().insert(rows)
+            open_departments(range(first, first + len(rows)))
+        return first
+
+
+class EmployeeImporter(Importer):
+    model = Employee
+    columns = ("first_name", "last_name", "start_date", "department")
+    fields = ("first_name", "last_name", "start_date", "end_date", "is_supervisor", "department_id", "has_computer")
+
+    def prepare(self):
+        self.departments = {name.lower(): pk for pk, name in Department.objects.values_list("id", "name")}
+
+    def build(self, row):
+        department_name = optional(row, "department")
+        department_id = None
+        if department_name:
+            department_id = self.departments.get(department_name.lower())
+            if department_id is None:
+                raise RowError(f"unknown department {department_name!r}")
+        end_date = optional(row, "end_date")
+        return (
+            required(row, "first_name"),
+            required(row, "last_name"),
+            to_datetime(required(row, "start_date"), "start_date"),
+            to_datetime(end_date, "end_date") if end_date else None,
+            to_bool(optional(row, "is_supervisor"), "is_supervisor"),
+            department_id,
+            False
+        )
+
+    def insert(self, rows):
+        """Inserts the employees and counts them towards their departments' headcounts and the active or terminated totals"""
+
+        with transaction.atomic():
+            first = super().insert(rows)
+            adjust(Counter(key for row in rows for key in employee_counters(row[5], row[3])))
+        return first
+
+
+class ComputerImporter(Importer):
+    """Imports computers, assigning each to the employee in its optional employee_id column from its purchase date"""
+
+    model = Computer
+    columns = ("make", "model", "serial_no", "purchase_date")
+    fields = ("make", "model", "serial_no", "purchase_date", "retire_date", "is_available")
+
+    def prepare(self):
+        self.employees = set(Employee.objects.values_list("id", flat=True))
+        # employees already holding a computer, plus those given one earlier in this file
+        self.holders = set(Employee.objects.filter(has_computer=True).values_list("id", flat=True))
+
+    def build(self, row):
+        """Returns the computer's field values followed by the id of its holder, or None"""
+
+        purchase_date = to_datetime(required(row, "purchase_date"), "purchase_date")
+        retire_date = optional(row, "retire_date")
+        retire_date = to_datetime(retire_date, "retire_date") if retire_date else None
+        holder = optional(row, "employee_id")
+        if holder:
+            holder = to_int(holder, "employee_id")
+            if holder not in self.employees:
+                raise RowError(f"unknown employee {holder}")
+            if holder in self.holders:
+                raise RowError(f"employee {holder} already has a computer")
+            if retire_date is not None:
+                raise RowError("a retired computer cannot be assigned")
+            self.holders.add(holder)
+        else:
+            holder = None
+        is_available = holder is None and retire_date is None
+        return (required(row, "make"), required(row, "model"), required(row, "serial_no"), purchase_date, retire_date, is_available, holder)
+
+    def insert(self, rows):
+        """Inserts the computers with their assignments, then writes what agileHR.signals would have: the holders' has_computer, the search rows and the dashboard counters"""
+
+        with transaction.atomic():
+            first = reserve_ids(Computer, len(rows))
+            first_assignment = reserve_ids(EmployeeComputer, sum(1 for row in rows if row[-1] is not None))
+            computers = []
+            assignments = []
+            for offset, row in enumerate(rows):
+                computer_id = first + offset
+                current_assignment = None
+                if row[-1] is not None:
+                    # the computer points at its assignment before the assignment row exists; SQLite checks foreign keys at commit
+                    current_assignment = first_assignment + len(assignments)
+                    assignments.append((current_assignment, computer_id, row[-1], row[3]))
+                computers.append((computer_id,) + row[:-1] + (current_assignment,))
+            insert_rows(Computer, ("id",) + self.fields + ("current_assignment_id",), computers)
+            insert_rows(EmployeeComputer, ("id", "computer_id", "employee_id", "date_assigned"), assignments)
+            audit.imported(Computer, self.fields + ("current_assignment_id",), computers)
+            audit.imported(EmployeeComputer, ("computer_id", "employee_id", "date_assigned"), assignments)
+            holders = [assignment[2] for assignment in assignments]
+            for start in range(0, len(holders), BATCH_SIZE):
+                Employee.objects.filter(pk__in=holders[start:start + BATCH_SIZE]).update(has_computer=True, updated_at=timezone.now())
+            index_computers(computer[0] for computer in computers)
+            adjust(Counter(key for row in rows for key in computer_counters(row[4], row[-1] is not None)))
+        return first
+
+
+class TrainingImporter(Importer):
+    model = Training
+    columns = ("title", "start_date", "end_date", "max_attendees")
+    fields = ("title", "start_date", "end_date", "max_attendees", "seats_taken")
+
+    def build(self, row):
+        start_date = to_datetime(required(row, "start_date"), "start_date")
+        end_date = to_datetime(required(row, "end_date"), "end_date")
+        if end_date < start_date:
+            raise RowError("end_date is before start_date")
+        return (required(row, "title"), start_date, end_date, to_int(required(row, "max_attendees"), "max_attendees", minimum=1), 0)
+
+
+IMPORTERS = {
+    "departments": DepartmentImporter,
+    "employees": EmployeeImporter,
+    "computers": ComputerImporter,
+    "trainings": TrainingImporter
+}
+
+
+def import_csv(kind, lines, chunk_size=CHUNK_SIZE):
+    """Imports one CSV file of the given kind (a key of IMPORTERS) and returns its ImportReport"""
+
+    return IMPORTERS[kind]().run(lines, chunk_size)
@@ -0,0 +1,59 @@
+"""A static interval tree for overlap queries over a fixed set of intervals"""
+
+
+class IntervalIndex:
+    """Defines an index over half-open [start, end) intervals answering "which intervals overlap this window" in O(log n + k) for k matches.
+
+    The intervals are kept sorted by start, and the sorted list doubles as a balanced binary tree: the middle item of any slice is the root of that slice, and each root records the latest end inside its slice. A query skips every subtree that ends before the window opens, and every right subtree that starts after it closes.
+
+    Arguments:
+        intervals {iterable} -- (start, end, value) triples; start and end only need to be comparable
+    """
+
+    def __init__(self, intervals):
+        self.items = sorted(intervals, key=lambda item: item[0])
+        self.max_end = [None] * len(self.items)
+        self._build(0, len(self.items))
+
+    def _build(self, low, high):
+        if low >= high:
+            return None
+        middle = (low + high) // 2
+        latest = self.items[middle][1]
+        for child in (self._build(low, middle), self._build(middle + 1, high)):
+            if child is not None and child > latest:
+                latest = child
+        self.max_end[middle] = latest
+        return latest
+
+    def __len__(self):
+        return len(self.items)
+
+    def overlapping(self, start, end):
+        """The intervals sharing any moment with [start, end), in start order.
+
+        Returns:
+            list -- the matching (start, end, value) triples
+        """
+
+        found = []
+        self._search(0, len(self.items), start, end, found)
+        return found
+
+    def _search(self, low, high, start, end, found):
+        # walks the same slices _build did, descending into right subtrees in the loop
+        while low < high:
+            middle = (low + high) // 2
+            if self.max_end[middle] <= start:
+                return
+            self._search(low, middle, start, end, found)
+            item = self.items[middle]
+            if item[0] >= end:
+                # the right subtree starts later still
+                return
+            if item[1] > start:
+                found.append(item)
+            low = middle + 1
+
+    def overlaps(self, start, end):
+        return bool(self.overlapping(start, end))
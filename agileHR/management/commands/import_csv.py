@@ -0,0 +1,42 @@
+import csv
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from agileHR.importer import CHUNK_SIZE, IMPORTERS, DecodedLines, import_csv
+
+
+class Command(BaseCommand):
+    help = "Streams a CSV file of departments, employees, computers or trainings into the database, one bulk insert per chunk, and reports the rows it rejected."
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", choices=sorted(IMPORTERS), help="What the rows describe.")
+        parser.add_argument("path", help="CSV file with a header row naming the columns.")
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Rows inserted per transaction.")
+        parser.add_argument("--errors", help="Write every reported rejection to this CSV file as line,message.")
+
+    def handle(self, *args, **options):
+        """Imports the file, then prints the rows per second and the first rejected rows."""
+
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be at least 1")
+        started = time.perf_counter()
+        try:
+            with open(options["path"], "rb") as raw:
+                report = import_csv(options["kind"], DecodedLines(raw), options["chunk_size"])
+        except OSError as error:
+            raise CommandError(f"Cannot read {options['path']}: {error.strerror}")
+        seconds = time.perf_counter() - started
+
+        self.stdout.write(self.style.SUCCESS(f"Imported {report.created} {options['kind']} in {seconds:.2f}s ({report.created / seconds if seconds else 0:,.0f} rows/s)"))
+        if not report.failed:
+            return
+        self.stdout.write(self.style.WARNING(f"Rejected {report.failed} rows"))
+        for line, message in report.errors[:20]:
+            self.stdout.write(f"    line {line}: {message}")
+        if options["errors"]:
+            with open(options["errors"], "w", newline="") as out:
+                writer = csv.writer(out)
+                writer.writerow(["line", "message"])
+                writer.writerows(report.errors)
+            self.stdout.write(f"Rejections written to {options['errors']}")
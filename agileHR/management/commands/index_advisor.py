@@ -0,0 +1,216 @@
+import re
+import statistics
+import time
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from agileHR.profiling import capture, routes, sample_ids
+
+# plan steps worth an index: reading a whole table, or sorting rows the index order could have produced
+FULL_SCAN = re.compile(r"^SCAN (?:TABLE )?(\S+)$")
+TEMP_SORT = re.compile(r"USE TEMP B-TREE FOR (ORDER BY|GROUP BY|DISTINCT)")
+
+MAIN_TABLE = re.compile(r'\bFROM "(\w+)"')
+COLUMN = r'"{table}"\."(\w+)"'
+
+
+class Rollback(Exception):
+    """Raised to leave the atomic block a candidate index was created in"""
+
+
+def explain(sql, params):
+    with connection.cursor() as cursor:
+        cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def timed(sql, params, repeat):
+    """Median wall time of a statement, fetching every row, in milliseconds"""
+
+    samples = []
+    with connection.cursor() as cursor:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            cursor.execute(sql, params)
+            cursor.fetchall()
+            samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def problems(plan):
+    """The plan steps the advisor flags: full scans of real tables and temporary sort trees"""
+
+    flagged = []
+    for step in plan:
+        if FULL_SCAN.match(step) or TEMP_SORT.search(step):
+            flagged.append(step)
+    return flagged
+
+
+def columns_of(sql, table):
+    """Picks the columns of the main table a statement filters and sorts on, in the order an index would need them.
+
+    Returns:
+        dict -- equality, null (IS NULL tests, candidates for a partial index), range, order and wrapped (columns hidden inside a function call, which no plain index can serve)
+    """
+
+    column = COLUMN.format(table=table)
+    where, _, order = sql.partition(" ORDER BY ")
+    found = {"equality": [], "null": [], "range": [], "order": [], "wrapped": []}
+
+    def add(kind, name):
+        if name not in found[kind]:
+            found[kind].append(name)
+
+    for name in re.findall(r"\w+\(" + column, where):
+        add("wrapped", name)
+    for name in re.findall(column + r" (?:= %s|IN \()", where):
+        add("equality", name)
+    for name in re.findall(r"(?<!NOT \()" + column + r" IS NULL", where):
+        add("null", name)
+    for name in re.findall(column + r" (?:[<>]=?) %s", where):
+        add("range", name)
+    order = re.split(r" LIMIT | OFFSET ", order)[0]
+    for name in re.findall(column, order):
+        add("order", name)
+    return found
+
+
+def candidates(sql, table):
+    """Proposes indexes for one statement: equality columns first, then the sort (or else the range) columns.
+
+    Returns:
+        list -- (columns, condition) pairs; condition is a WHERE clause for a partial index, or None
+    """
+
+    found = columns_of(sql, table)
+    leading = [name for name in found["equality"] if name not in found["null"]]
+    tails = [tail for tail in (found["order"], found["range"]) if tail] or [[]]
+    proposals = []
+    for tail in tails:
+        columns = leading + [name for name in tail if name not in leading]
+        if columns:
+            proposals.append((tuple(columns), None))
+        if found["null"] and columns:
+            condition = " AND ".join(f'"{name}" IS NULL' for name in found["null"])
+            proposals.append((tuple(columns), condition))
+    return list(dict.fromkeys(proposals))
+
+
+def existing_indexes(table):
+    """Column lists of the indexes a table already has, including the one behind its primary key"""
+
+    with connection.cursor() as cursor:
+        cursor.execute(f'PRAGMA index_list("{table}")')
+        names = [row[1] for row in cursor.fetchall()]
+        indexed = [("id",)]
+        for name in names:
+            cursor.execute(f'PRAGMA index_info("{name}")')
+            indexed.append(tuple(row[2] for row in cursor.fetchall()))
+    return indexed
+
+
+def covered(columns, indexed):
+    return any(index[:len(columns)] == columns for index in indexed)
+
+
+def model_for(table):
+    for model in apps.get_app_config("agileHR").get_models():
+        if model._meta.db_table == table:
+            return model
+    return None
+
+
+def as_declaration(table, columns, condition):
+    """How to ship an index: a Meta.indexes entry, or raw SQL for a partial index, which Django 2.1 (the version requirements.txt pins) cannot declare; Index(condition=...) needs 2.2"""
+
+    model = model_for(table)
+    names = {field.column: field.name for field in model._meta.concrete_fields} if model else {}
+    if condition is None and model:
+        fields = ", ".join(f'"{names.get(column, column)}"' for column in columns)
+        return f"{model.__name__}.Meta.indexes: models.Index(fields=[{fields}])"
+    quoted = ", ".join(f'"{column}"' for column in columns)
+    name = f"{table}_{'_'.join(columns)}_partial"[:60]
+    return f'CREATE INDEX "{name}" ON "{table}" ({quoted}) WHERE {condition}'
+
+
+class Command(BaseCommand):
+    help = "Replays every agileHR view against the loaded data, flags full scans and temporary sorts in the plans of their queries, and benchmarks the indexes that would remove them."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=7, help="Runs per timing; the median is reported.")
+        parser.add_argument("--min-gain", type=float, default=0.2, help="Fraction of a statement's time an index must save to be recommended.")
+
+    def handle(self, *args, **options):
+        """Captures the statements, explains and times them, then tries each candidate index inside a transaction that is rolled back."""
+
+        if connection.vendor != "sqlite":
+            raise CommandError("index_advisor reads SQLite query plans; run it against an SQLite copy of the data")
+        repeat = max(1, options["repeat"])
+
+        ids = sample_ids()
+        statements = {}
+        for route in routes(ids):
+            if None in route[1]:
+                self.stdout.write(f"{route[0]}: skipped, no rows to point it at")
+                continue
+            for sql, params in capture(route):
+                statements.setdefault((sql, params), []).append(route[0])
+
+        recommended = {}
+        for (sql, params), names in statements.items():
+            plan = explain(sql, params)
+            flagged = problems(plan)
+            table_match = MAIN_TABLE.search(sql)
+            if not flagged or not table_match:
+                continue
+            table = table_match.group(1)
+            before = timed(sql, params, repeat)
+
+            self.stdout.write("")
+            self.stdout.write(self.style.WARNING(f"{', '.join(sorted(set(names)))}  {before:.2f}ms  {'; '.join(flagged)}"))
+            self.stdout.write(f"    {sql[:200]}{'...' if len(sql) > 200 else ''}")
+            for column in columns_of(sql, table)["wrapped"]:
+                self.stdout.write(f"    {table}.{column} is compared inside a function call, so no index on it can be used")
+
+            indexed = existing_indexes(table)
+            for columns, condition in candidates(sql, table):
+                if condition is None and covered(columns, indexed):
+                    continue
+                after, new_plan = self.try_index(table, columns, condition, sql, params, repeat)
+                gain = (before - after) / before if before else 0
+                fixed = len(problems(new_plan)) < len(flagged)
+                verdict = "recommended" if fixed and gain >= options["min_gain"] else "not worth it"
+                label = f"{table}({', '.join(columns)}){' WHERE ' + condition if condition else ''}"
+                self.stdout.write(f"    {label}: {before:.2f}ms -> {after:.2f}ms ({gain:+.0%}), {'; '.join(new_plan)}  [{verdict}]")
+                if verdict == "recommended":
+                    entry = recommended.setdefault(as_declaration(table, columns, condition), {"routes": set(), "saved": 0.0})
+                    entry["routes"].update(names)
+                    entry["saved"] += before - after
+
+        self.stdout.write("")
+        if not recommended:
+            self.stdout.write(self.style.SUCCESS("No index recommendations for this dataset"))
+            return
+        self.stdout.write(self.style.SUCCESS("Recommended indexes:"))
+        for declaration, entry in sorted(recommended.items(), key=lambda item: -item[1]["saved"]):
+            self.stdout.write(f"    {declaration}")
+            self.stdout.write(f"        saves {entry['saved']:.2f}ms on {', '.join(sorted(entry['routes']))}")
+
+    def try_index(self, table, columns, condition, sql, params, repeat):
+        """Creates an index, re-plans and re-times the statement, then rolls the index back"""
+
+        quoted = ", ".join(f'"{column}"' for column in columns)
+        where = f" WHERE {condition}" if condition else ""
+        result = None
+        try:
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    cursor.execute(f'CREATE INDEX "index_advisor_candidate" ON "{table}" ({quoted}){where}')
+                result = timed(sql, params, repeat), explain(sql, params)
+                raise Rollback
+        except Rollback:
+            pass
+        return result
@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Exists, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from agileHR.models import *
+from agileHR.assignments import AVAILABLE
+from agileHR.fragments import bump_all
+from agileHR.hierarchy import rebuild_hierarchy
+from agileHR.tallies import rebuild_tallies
+from agileHR.search import rebuild_search_index
+
+
+def rebuild_current_assignments():
+    """Re-points every computer at its open assignment in a single UPDATE."""
+
+    open_assignment = EmployeeComputer.objects.filter(computer_id=OuterRef("pk"), date_revoked=None).order_by("-date_assigned", "-id").values("pk")[:1]
+    return Computer.objects.update(current_assignment=Subquery(open_assignment), updated_at=timezone.now())
+
+
+def rebuild_availability():
+    """Recomputes is_available for every computer and has_computer for every employee."""
+
+    open_assignment = EmployeeComputer.objects.filter(employee_id=OuterRef("pk"), date_revoked=None)
+    computers = Computer.objects.update(is_available=AVAILABLE)
+    employees = Employee.objects.update(has_computer=Exists(open_assignment), updated_at=timezone.now())
+    return computers, employees
+
+
+def rebuild_seat_counts():
+    """Recounts the enrollments of every training in a single UPDATE."""
+
+    enrollments = EmployeeTraining.objects.filter(training_id=OuterRef("pk")).order_by().values("training_id").annotate(total=Count("id")).values("total")
+    return Training.objects.update(seats_taken=Coalesce(Subquery(enrollments, output_field=IntegerField()), 0), updated_at=timezone.now())
+
+
+class Command(BaseCommand):
+    help = "Recomputes the denormalized fields the agileHR views read from, e.g. after seeding or restoring a database."
+
+    def handle(self, *args, **options):
+        """Rebuilds each derived field inside one transaction and reports how many rows it touched."""
+
+        with transaction.atomic():
+            computers = rebuild_current_assignments()
+            indexed = rebuild_search_index()
+            available = rebuild_availability()
+            trainings = rebuild_seat_counts()
+            lines = rebuild_hierarchy()
+            tallies = rebuild_tallies()
+            bump_all()
+
+        self.stdout.write(self.style.SUCCESS(f"Current assignments: {computers} computers"))
+        self.stdout.write(self.style.SUCCESS(f"Search index: {indexed} computers"))
+        self.stdout.write(self.style.SUCCESS(f"Availability: {available[0]} computers, {available[1]} employees"))
+        self.stdout.write(self.style.SUCCESS(f"Seat counts: {trainings} trainings"))
+        self.stdout.write(self.style.SUCCESS(f"Reporting lines: {lines}"))
+        self.stdout.write(self.style.SUCCESS(f"Dashboard tallies: {tallies}"))
@@ -0,0 +1,132 @@
+import datetime
+import multiprocessing
+import time
+from functools import partial
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from agileHR import datagen
+from agileHR.fragments import bump_all
+from agileHR.importer import reserve_ids
+from agileHR.models import *
+
+MODELS = {
+    "department": Department,
+    "employee": Employee,
+    "computer": Computer,
+    "training": Training,
+    "assignment": EmployeeComputer,
+    "enrollment": EmployeeTraining
+}
+
+
+def build_spec(counts, history, seed, anchor):
+    """Describes a dataset: how many rows of each table, where their ids start and the fixed point in time the dates are drawn around.
+
+    The ids are reserved from each table's AUTOINCREMENT counter, as the importer reserves them, so seeded rows never take the ids of deleted rows and their audit history.
+    """
+
+    counts = dict(counts, assignment=counts["computer"] * history)
+    offsets = {table: reserve_ids(model, counts[table]) for table, model in MODELS.items()}
+    return {"counts": counts, "offsets": offsets, "history": history, "seed": seed, "anchor": anchor}
+
+
+def generate(spec, chunk_size=10000, workers=1, progress=None):
+    """Generates and inserts a dataset table by table, one bulk_create transaction per chunk.
+
+    No audit entries are written: the rows are synthetic load for benchmarks, not changes anyone made, and recording them would double what the seeder writes.
+
+    Arguments:
+        spec {dict} -- the dataset built by build_spec
+        chunk_size {int} -- rows per generated chunk and per transaction
+        workers {int} -- processes generating chunks; inserts always happen in this process, SQLite having a single writer
+        progress {callable} -- called with (table, rows, seconds) after each table
+
+    Returns:
+        dict -- rows inserted per table
+    """
+
+    inserted = {}
+    pool = multiprocessing.Pool(workers) if workers > 1 else None
+    try:
+        for table in datagen.TABLES:
+            if datagen.units(spec, table) == 0 or (table == "assignment" and spec["history"] == 0):
+                inserted[table] = 0
+                continue
+            model = MODELS[table]
+            started = time.perf_counter()
+            work = datagen.chunks(spec, table, chunk_size)
+            generated = pool.imap(partial(datagen.generate_chunk, spec), work) if pool else (datagen.generate_chunk(spec, item) for item in work)
+            rows = 0
+            for _, chunk in generated:
+                with transaction.atomic():
+                    model.objects.bulk_create([model(**row) for row in chunk])
+                rows += len(chunk)
+            inserted[table] = rows
+            if progress:
+                progress(table, rows, time.perf_counter() - started)
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+    # bulk_create sends no signals, so no fragment version was bumped for the new rows
+    bump_all()
+    return inserted
+
+
+class Command(BaseCommand):
+    help = "Generates a large, reproducible synthetic dataset with chunked bulk inserts."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--departments", type=int, default=50)
+        parser.add_argument("--employees", type=int, default=3000)
+        parser.add_argument("--computers", type=int, default=2000)
+        parser.add_argument("--history", type=int, default=2, help="Assignments per computer; the last one stays open for most machines.")
+        parser.add_argument("--trainings", type=int, default=200)
+        parser.add_argument("--enrollments", type=int, default=1000)
+        parser.add_argument("--seed", type=int, default=1, help="The same seed and anchor always produce the same rows.")
+        parser.add_argument("--anchor", help="Date (YYYY-MM-DD) the generated dates are spread around. Defaults to today.")
+        parser.add_argument("--chunk-size", type=int, default=10000)
+        parser.add_argument("--workers", type=int, default=1, help="Processes used to generate rows.")
+        parser.add_argument("--skip-rebuild", action="store_true", help="Leave the derived fields for a later rebuild_derived run.")
+
+    def handle(self, *args, **options):
+        """Generates every table, reports rows per second, then recomputes the derived fields bulk_create skipped."""
+
+        if options["anchor"]:
+            try:
+                anchor = datetime.datetime.strptime(options["anchor"], "%Y-%m-%d")
+            except ValueError:
+                raise CommandError("--anchor must be a date in YYYY-MM-DD format")
+        else:
+            anchor = datetime.datetime.combine(datetime.date.today(), datetime.time())
+        anchor = anchor.replace(tzinfo=datetime.timezone.utc)
+
+        counts = {
+            "department": options["departments"],
+            "employee": options["employees"],
+            "computer": options["computers"],
+            "training": options["trainings"],
+            "enrollment": options["enrollments"]
+        }
+        if any(count < 0 for count in counts.values()) or options["history"] < 0:
+            raise CommandError("Row counts cannot be negative")
+        if counts["computer"] and options["history"] and not counts["employee"]:
+            raise CommandError("Assignment histories need at least one employee")
+        if counts["enrollment"] and not (counts["employee"] and counts["training"]):
+            raise CommandError("Enrollments need at least one employee and one training")
+
+        def report(table, rows, seconds):
+            self.stdout.write(f"{table:<12}{rows:>10} rows in {seconds:7.2f}s ({rows / seconds if seconds else 0:,.0f} rows/s)")
+
+        spec = build_spec(counts, options["history"], options["seed"], anchor)
+        started = time.perf_counter()
+        inserted = generate(spec, options["chunk_size"], options["workers"], report)
+        seconds = time.perf_counter() - started
+        total = sum(inserted.values())
+        self.stdout.write(self.style.SUCCESS(f"Inserted {total} rows in {seconds:.2f}s ({total / seconds if seconds else 0:,.0f} rows/s)"))
+
+        if not options["skip_rebuild"]:
+            call_command("rebuild_derived", stdout=self.stdout)
@@ -0,0 +1,14 @@
+"""Middleware for the agileHR app"""
+
+from agileHR.audit import recording
+
+
+class AuditMiddleware:
+    """Tags the audit entries a request makes with its path; see agileHR.audit"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with recording(request.path):
+            return self.get_response(request)
@@ -5,6 +5,23 @@ from django.utils import timezone
 """Models component sets up data structure for agileHR app"""
 
 
+class MaintainedModel(models.Model):
+    """Base for models carrying fields that agileHR.signals keeps up to date with queryset updates.
+
+    An instance loaded before one of those updates holds a stale copy of the field, so saving an existing row writes every field except the maintained ones.
+    """
+
+    maintained_fields = ()
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and not args and kwargs.get("update_fields") is None and not kwargs.get("force_insert"):
+            kwargs["update_fields"] = [field.name for field in self._meta.concrete_fields if not field.primary_key and field.name not in self.maintained_fields]
+        super().save(*args, **kwargs)
+
+
 class Department(models.Model):
     """Defines a department within the organization.
 
@@ -16,12 +33,14 @@ class Department(models.Model):
 
     name = models.CharField(max_length=100)
     budget = models.IntegerField()
+    # stamped by save(), and by agileHR.stamps when rows shown on the department page change
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
 
 
-class Employee(models.Model):
+class Employee(MaintainedModel):
     """Defines a past or present employee of the organization.
 
     Author: Rachel Daniel
@@ -35,12 +54,31 @@ class Employee(models.Model):
     end_date = models.DateTimeField(blank=True, null=True)
     is_supervisor = models.BooleanField()
     department = models.ForeignKey(Department, on_delete=models.SET_NULL, null=True, blank=True)
+    # the manager the employee reports to; every reporting line above them is kept in ReportingLine by agileHR.signals
+    supervisor = models.ForeignKey("self", on_delete=models.SET_NULL, null=True, blank=True, related_name="reports")
+    # True while the employee holds an open computer assignment
+    has_computer = models.BooleanField(default=False)
+    # stamped by save(), and by agileHR.stamps when the employee's assignments or enrollments change
+    updated_at = models.DateTimeField(auto_now=True)
+
+    maintained_fields = ("has_computer",)
+
+    class Meta:
+        indexes = [
+            # seek pagination of the employee list, with and without a department filter
+            models.Index(fields=["last_name", "id"]),
+            models.Index(fields=["department", "last_name", "id"]),
+            # employees waiting on a computer, in the order the assignment forms list them
+            models.Index(fields=["has_computer", "last_name", "id"]),
+            # the dashboard's count of employees whose end date is still ahead
+            models.Index(fields=["end_date"])
+        ]
 
     def __str__(self):
         return f"Full Name: {self.first_name} {self.last_name} Start Date: {self.start_date} End Date: {self.end_date} Department: {self.department}"
 
 
-class Training(models.Model):
+class Training(MaintainedModel):
     """Defines a class representing a training session being hosted by the company.
 
         Author: Kelly Morin
@@ -52,12 +90,26 @@ class Training(models.Model):
     start_date = models.DateTimeField()
     end_date = models.DateTimeField()
     max_attendees = models.IntegerField()
+    # number of EmployeeTraining rows, maintained by agileHR.enrollment so capacity checks never count rows
+    seats_taken = models.IntegerField(default=0)
+    # stamped by save(), and by agileHR.stamps when enrollments change
+    updated_at = models.DateTimeField(auto_now=True)
+
+    maintained_fields = ("seats_taken",)
+
+    class Meta:
+        indexes = [
+            # the dashboard's window of upcoming trainings, ordered by start_date then id
+            models.Index(fields=["start_date"]),
+            # the upcoming and past training lists: walked in start_date order, the end_date range tested in the index without reading the rows it rejects
+            models.Index(fields=["start_date", "end_date"])
+        ]
 
     def __str__(self):
         return f"{self.title} training session is scheduled for {self.start_date} and ends {self.end_date}. It can hold a maximum of {self.max_attendees} attendees"
 
 
-class Computer(models.Model):
+class Computer(MaintainedModel):
     """Defines a class representing a computer purchased by the company.
 
         Author: Sebastian Civarolo
@@ -72,6 +124,20 @@ class Computer(models.Model):
     purchase_date = models.DateTimeField()
     employee = models.ManyToManyField(Employee, through="EmployeeComputer")
     retire_date = models.DateTimeField(default=None, blank=True, null=True)
+    # the open (non-revoked) assignment, kept in sync by agileHR.signals so the holder can be joined in
+    current_assignment = models.OneToOneField("EmployeeComputer", on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    # True while the computer is neither assigned nor retired, i.e. can be handed out
+    is_available = models.BooleanField(default=True)
+    # stamped by save(), and by agileHR.stamps when assignments change
+    updated_at = models.DateTimeField(auto_now=True)
+
+    maintained_fields = ("current_assignment", "is_available")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["make", "model", "id"]),
+            models.Index(fields=["is_available", "make", "model", "id"])
+        ]
 
     def __str__(self):
         return f"{self.make} {self.model} - Serial No: {self.serial_no}"
@@ -91,6 +157,13 @@ class EmployeeComputer(models.Model):
     date_assigned = models.DateTimeField()
     date_revoked = models.DateTimeField(default=None, blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            # as-of lookups in agileHR.history: one machine's or one person's history, seeked to a moment and walked in date order
+            models.Index(fields=["computer", "date_assigned"]),
+            models.Index(fields=["employee", "date_assigned"])
+        ]
+
     def __str__(self):
         return f"{self.employee.first_name} {self.employee.last_name}: {self.computer.make} {self.computer.model}, Serial No: {self.computer.serial_no}"
 
@@ -107,4 +180,116 @@ class EmployeeTraining(models.Model):
     training = models.ForeignKey(Training, on_delete=models.CASCADE, null=True, blank=True)
 
     def __str__(self):
-        return f"{self.employee} is registered for {self.training}"
\ No newline at end of file
+        return f"{self.employee} is registered for {self.training}"
+
+
+class WaitlistEntry(models.Model):
+    """Defines an employee waiting for a seat on a full training; agileHR.enrollment promotes the longest waiting first as seats free up.
+
+        Returns:
+            str -- Employee name and the training they are waiting for
+    """
+
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE)
+    training = models.ForeignKey(Training, on_delete=models.CASCADE)
+    joined_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        unique_together = ("employee", "training")
+        indexes = [
+            # the head of each training's queue, read with one bounded query per promotion pass
+            models.Index(fields=["training", "joined_at", "id"])
+        ]
+
+    def __str__(self):
+        return f"{self.employee.first_name} {self.employee.last_name} is waiting for {self.training.title}"
+
+
+class ReportingLine(models.Model):
+    """Defines one edge of the closure of Employee.supervisor: the descendant reports to the ancestor, depth levels down (1 for a direct report).
+
+    Every manager above an employee has a row, so the reports under a manager at any depth, an employee's chain of command and headcounts are each one indexed query; agileHR.hierarchy keeps the rows in step.
+
+        Returns:
+            str -- both names and the depth between them
+    """
+
+    ancestor = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name="descendant_lines")
+    descendant = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name="ancestor_lines")
+    depth = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = ("ancestor", "descendant")
+        indexes = [
+            # a chain of command, nearest manager first
+            models.Index(fields=["descendant", "depth"])
+        ]
+
+    def __str__(self):
+        return f"{self.descendant.first_name} {self.descendant.last_name} reports to {self.ancestor.first_name} {self.ancestor.last_name} ({self.depth} levels up)"
+
+
+class AuditQuerySet(models.QuerySet):
+    """Refuses bulk updates and deletes, so the audit trail can only grow"""
+
+    def update(self, **kwargs):
+        raise TypeError("audit entries cannot be changed")
+
+    def delete(self):
+        raise TypeError("audit entries cannot be deleted")
+
+
+class AuditEntry(models.Model):
+    """Defines one recorded change to a row of an agileHR model, written by agileHR.audit. The row is named by model and id rather than a foreign key, so its history outlives it.
+
+        Returns:
+            str -- the action, the row and when it happened
+    """
+
+    entity = models.CharField(max_length=50)
+    object_id = models.IntegerField(null=True, blank=True)
+    action = models.CharField(max_length=10)
+    # JSON object of field name to [old, new], values as the database stores them
+    changes = models.TextField()
+    # the request that made the change, blank for scripts and management commands
+    path = models.CharField(max_length=200, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    objects = AuditQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # one row's history over a time range, and everything that happened in one
+            models.Index(fields=["entity", "object_id", "created_at"]),
+            models.Index(fields=["created_at"])
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise TypeError("audit entries cannot be changed")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise TypeError("audit entries cannot be deleted")
+
+    def __str__(self):
+        return f"{self.entity} {self.object_id} {self.action} at {self.created_at}"
+
+
+class Tally(models.Model):
+    """Defines one running total shown on the dashboard, e.g. a department's headcount or the number of idle computers, moved by agileHR.tallies as rows change so the landing page never counts a table.
+
+        Returns:
+            str -- the tally, its department if any, and its value
+    """
+
+    name = models.CharField(max_length=50)
+    # set for the per-department totals; deleting the department hands its total to the NULL row first
+    department = models.ForeignKey(Department, on_delete=models.CASCADE, null=True, blank=True)
+    value = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ("name", "department")
+
+    def __str__(self):
+        return f"{self.name} ({self.department.name}) = {self.value}" if self.department else f"{self.name} = {self.value}"
@@ -0,0 +1,135 @@
+"""Keyset (seek) pagination helpers shared by the list views of the agileHR app"""
+
+import base64
+import json
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+
+class KeysetPage:
+    """Defines one page of rows fetched by seeking past a cursor rather than counting an OFFSET.
+
+    Returns:
+        object_list -- the rows on this page, in the requested order
+        next_cursor -- cursor for the page after this one, or None on the last page
+        previous_cursor -- cursor for the page before this one, or None on the first page
+    """
+
+    def __init__(self, object_list, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+def encode_cursor(values):
+    """Packs the sort key of a row into an opaque, url-safe cursor string"""
+
+    raw = json.dumps(values, default=str, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Unpacks a cursor built by encode_cursor, returning None when it is missing or has been tampered with"""
+
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (ValueError, TypeError):
+        return None
+    return values if isinstance(values, list) else None
+
+
+def sort_field(model, path):
+    """The model field a sort key names, following relations for paths like "department__name" """
+
+    field = None
+    for name in path.split("__"):
+        field = model._meta.get_field(name)
+        model = field.related_model
+    return field
+
+
+def cursor_values(model, fields, cursor):
+    """Decodes a cursor and converts each value with its sort field's to_python, returning None when it does not hold one valid, non-null value per field"""
+
+    values = decode_cursor(cursor)
+    if values is None or len(values) != len(fields):
+        return None
+    try:
+        values = [sort_field(model, name).to_python(value) for name, value in zip(fields, values)]
+    except (ValidationError, FieldDoesNotExist, ValueError, TypeError, OverflowError):
+        return None
+    for value in values:
+        # an integer the database cannot store would fail as the query runs
+        if value is None or (isinstance(value, int) and not -2 ** 63 <= value < 2 ** 63):
+            return None
+    return values
+
+
+def seek_filter(fields, values, forward=True):
+    """Builds the row-value comparison (f1, f2, ...) > (v1, v2, ...) as a Q object the ORM can hand to an index range scan"""
+
+    lookup = "gt" if forward else "lt"
+    condition = Q()
+    for position in range(len(fields)):
+        equal = {fields[i]: values[i] for i in range(position)}
+        equal[f"{fields[position]}__{lookup}"] = values[position]
+        condition |= Q(**equal)
+    return condition
+
+
+def keyset_page(queryset, fields, size, after=None, before=None):
+    """Fetches one page of a queryset ordered ascending by the given unique combination of fields.
+
+    Arguments:
+        queryset {QuerySet} -- the filtered rows to page through
+        fields {list} -- field names forming a unique sort key, ending with the primary key
+        size {int} -- rows per page
+        after {str} -- cursor of the row the page starts after
+        before {str} -- cursor of the row the page ends before
+
+    Returns:
+        KeysetPage -- the page with cursors for its neighbours
+    """
+
+    # a tampered cursor is treated as no cursor at all, so the first page is served instead of an error
+    after_values = cursor_values(queryset.model, fields, after)
+    before_values = cursor_values(queryset.model, fields, before)
+
+    if before_values is not None:
+        rows = list(queryset.filter(seek_filter(fields, before_values, forward=False)).order_by(*[f"-{field}" for field in fields])[:size + 1])
+        has_more = len(rows) > size
+        rows = rows[:size][::-1]
+        has_previous, has_next = has_more, True
+    else:
+        if after_values is not None:
+            queryset = queryset.filter(seek_filter(fields, after_values))
+        rows = list(queryset.order_by(*fields)[:size + 1])
+        has_next = len(rows) > size
+        rows = rows[:size]
+        has_previous = after_values is not None
+
+    def cursor_for(row):
+        # rows are model instances, or dicts when the queryset comes from values()
+        return encode_cursor([row[field] if isinstance(row, dict) else getattr(row, field) for field in fields])
+
+    next_cursor = cursor_for(rows[-1]) if rows and has_next else None
+    previous_cursor = cursor_for(rows[0]) if rows and has_previous else None
+    return KeysetPage(rows, next_cursor, previous_cursor)
@@ -0,0 +1,98 @@
+"""Replays the agileHR views against whatever data is loaded, for the benchmark tests and the index_advisor command"""
+
+import datetime
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection
+from django.test import RequestFactory
+from django.urls import resolve, reverse
+from django.utils import timezone
+
+from agileHR.models import *
+
+
+def routes(ids):
+    """Every route in agileHR/urls.py as (url name, args, method, data), pointed at rows of the loaded dataset"""
+
+    today = timezone.now().date()
+    return [
+        ("agileHR:index", (), "get", None),
+        ("agileHR:employee", (), "get", None),
+        ("agileHR:employee_add", (), "get", None),
+        ("agileHR:employee_detail", (ids["employee"],), "get", None),
+        ("agileHR:employee_edit", (ids["employee"],), "get", None),
+        ("agileHR:employee_computers", (ids["employee"],), "get", {"from": str(today - datetime.timedelta(days=365)), "to": str(today)}),
+        ("agileHR:department", (), "get", None),
+        ("agileHR:departmentadd", (), "get", None),
+        ("agileHR:department_detail", (ids["department"],), "get", None),
+        ("agileHR:training", (), "get", None),
+        ("agileHR:training_past", (), "get", None),
+        ("agileHR:traindetail", (ids["training"],), "get", None),
+        ("agileHR:training_edit", (ids["training"],), "get", None),
+        ("agileHR:training_delete", (ids["training"],), "get", None),
+        ("agileHR:training_add", (), "get", None),
+        ("agileHR:computers", (), "get", None),
+        ("agileHR:computer_search", (), "post", {"search_text": "dell"}),
+        ("agileHR:computer_detail", (ids["computer"],), "get", None),
+        ("agileHR:computer_holders", (ids["computer"],), "get", {"on": str(today)}),
+        ("agileHR:delete_computer", (ids["computer"],), "get", None),
+        ("agileHR:new_computer", (), "get", None),
+        ("agileHR:import_data", (), "get", None),
+        ("agileHR:export", ("assignments", "csv"), "get", None),
+        ("agileHR:api_list", ("employees",), "get", {"include": "department"}),
+        ("agileHR:api_detail", ("computers", ids["computer"]), "get", {"include": "assignments.employee"})
+    ]
+
+
+def sample_ids():
+    """Picks representative rows to point the routes at: the first of each table, an assigned computer and an upcoming training
+
+    Returns:
+        dict -- row id per table, or None when the table is empty
+    """
+
+    upcoming = Training.objects.filter(start_date__gt=timezone.now() + datetime.timedelta(days=1)).order_by("start_date").first()
+    computer = Computer.objects.filter(current_assignment__isnull=False).order_by("id").first() or Computer.objects.order_by("id").first()
+    department = Department.objects.order_by("id").first()
+    employee = Employee.objects.order_by("id").first()
+    training = upcoming or Training.objects.order_by("id").first()
+    return {
+        "department": department.id if department else None,
+        "employee": employee.id if employee else None,
+        "computer": computer.id if computer else None,
+        "training": training.id if training else None
+    }
+
+
+class StatementLog:
+    """Execute wrapper recording the SELECT statements a view sends, with their parameters"""
+
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        if not many and sql.lstrip().upper().startswith("SELECT"):
+            self.statements.append((sql, tuple(params or ())))
+        return execute(sql, params, many, context)
+
+
+def capture(route):
+    """Calls the view behind a route directly, outside the middleware stack, and returns the SELECT statements it ran
+
+    Returns:
+        list -- (sql, params) pairs in the order the view sent them
+    """
+
+    name, args, method, data = route
+    path = reverse(name, args=args)
+    request = getattr(RequestFactory(), method)(path, data or {})
+    request.user = AnonymousUser()
+    match = resolve(path)
+    log = StatementLog()
+    with connection.execute_wrapper(log):
+        response = match.func(request, *match.args, **match.kwargs)
+        if hasattr(response, "render"):
+            response.render()
+        if response.streaming:
+            for _ in response.streaming_content:
+                pass
+    return log.statements
@@ -0,0 +1,92 @@
+"""Schedule conflict detection for training enrollments: an employee cannot attend two trainings that overlap in time"""
+
+import datetime
+from bisect import bisect_left
+
+from agileHR.models import *
+from agileHR.intervals import IntervalIndex
+from agileHR.search import BATCH_SIZE
+
+# the forms store dates as midnight, so a training runs until the end of the day its end_date falls on
+DAY = datetime.timedelta(days=1)
+
+
+class ScheduleConflict(Exception):
+    """Raised when enrollments would put an employee in two trainings at once.
+
+    Arguments:
+        conflicts {list} -- the Conflict pairs found
+    """
+
+    def __init__(self, conflicts):
+        self.conflicts = conflicts
+        super().__init__("; ".join(str(conflict) for conflict in conflicts))
+
+
+class Conflict:
+    """Defines a requested training that overlaps another one on the same employee's schedule.
+
+    Returns:
+        str -- both titles, e.g. "Safety overlaps First Aid"
+    """
+
+    def __init__(self, employee_id, training, other):
+        self.employee_id = employee_id
+        self.training = training
+        self.other = other
+
+    def __str__(self):
+        return f"{self.training.title} overlaps {self.other.title}"
+
+
+def as_interval(training):
+    # half-open [start, end of the last day), so a one-day training clashes with anything else on that day and a training ending the day before another starts does not
+    return (training.start_date, training.end_date + DAY, training)
+
+
+def trainings_overlapping(employee_id, start, end):
+    """The trainings on an employee's schedule that share any moment with [start, end), in start order, read with one query on the training dates"""
+
+    return list(Training.objects.filter(employeetraining__employee_id=employee_id, start_date__lt=end, end_date__gt=start - DAY).order_by("start_date", "id"))
+
+
+def find_conflicts(requests):
+    """Checks many requested enrollments at once, against each employee's existing enrollments and against the other requests for the same employee.
+
+    Existing enrollments of every employee involved are read with one query per BATCH_SIZE employees, then each employee's schedule is indexed once, however many requests name them.
+
+    Arguments:
+        requests {iterable} -- (employee_id, Training) pairs
+
+    Returns:
+        list -- a Conflict for every request overlapping a training the employee already has or requested earlier in the list; the others are clear to enroll
+    """
+
+    requests = list(requests)
+    employee_ids = list({employee_id for employee_id, _ in requests})
+    booked = {employee_id: [] for employee_id in employee_ids}
+    for start in range(0, len(employee_ids), BATCH_SIZE):
+        batch = employee_ids[start:start + BATCH_SIZE]
+        rows = EmployeeTraining.objects.filter(employee_id__in=batch, training__isnull=False).select_related("training").only("employee_id", "training__title", "training__start_date", "training__end_date")
+        for row in rows:
+            booked[row.employee_id].append(as_interval(row.training))
+    schedules = {employee_id: IntervalIndex(intervals) for employee_id, intervals in booked.items()}
+
+    conflicts = []
+    # requests accepted so far, per employee, sorted by start; they never overlap one another, so their ends are sorted too and only the last one starting before a training ends can clash with it
+    accepted = {employee_id: ([], []) for employee_id in employee_ids}
+    for employee_id, training in requests:
+        interval = as_interval(training)
+        start, end, _ = interval
+        clashes = [item for item in schedules[employee_id].overlapping(start, end) if item[2].pk != training.pk]
+        starts, items = accepted[employee_id]
+        position = bisect_left(starts, end)
+        if position and items[position - 1][1] > start and items[position - 1][2].pk != training.pk:
+            clashes.append(items[position - 1])
+        if clashes:
+            conflicts.append(Conflict(employee_id, training, clashes[0][2]))
+        else:
+            position = bisect_left(starts, start)
+            starts.insert(position, start)
+            items.insert(position, interval)
+    return conflicts
@@ -0,0 +1,144 @@
+"""Full-text search over the computer fleet, backed by an SQLite FTS5 table kept in step with the Computer rows"""
+
+import re
+from django.db import connection
+from django.db.models import Q
+
+from agileHR.models import *
+
+
+SEARCH_TABLE = "agileHR_computer_fts"
+
+# bm25 weights for make, model, serial_no and holder: a hit on the machine itself outranks a hit on who holds it
+RANK = f"bm25({SEARCH_TABLE}, 4.0, 4.0, 2.0, 1.0)"
+
+# stay under SQLite's default limit on bound parameters per statement
+BATCH_SIZE = 500
+
+INDEX_ROWS = f"""
+    INSERT INTO {SEARCH_TABLE} (rowid, make, model, serial_no, holder)
+    SELECT c.id, c.make, c.model, c.serial_no, COALESCE(e.first_name || ' ' || e.last_name, '')
+    FROM agileHR_computer c
+    LEFT JOIN agileHR_employeecomputer ec ON ec.id = c.current_assignment_id
+    LEFT JOIN agileHR_employee e ON e.id = ec.employee_id
+"""
+
+
+def search_enabled():
+    """Returns True when the database can hold the FTS5 index; other backends fall back to substring matching"""
+
+    return connection.vendor == "sqlite"
+
+
+def create_search_index(sender=None, **kwargs):
+    """Creates the FTS5 table if it is missing. Connected to post_migrate, since the table is not a Django model."""
+
+    if not search_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE}
+            USING fts5(make, model, serial_no, holder, prefix='2 3 4')
+        """)
+
+
+def index_computers(computer_ids):
+    """Rewrites the search rows of the given computers from their current make, model, serial number and holder"""
+
+    if not search_enabled():
+        return
+    computer_ids = list(computer_ids)
+    with connection.cursor() as cursor:
+        for start in range(0, len(computer_ids), BATCH_SIZE):
+            batch = computer_ids[start:start + BATCH_SIZE]
+            placeholders = ", ".join(["%s"] * len(batch))
+            cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({placeholders})", batch)
+            cursor.execute(f"{INDEX_ROWS} WHERE c.id IN ({placeholders})", batch)
+
+
+def unindex_computer(computer_id):
+    """Drops a deleted computer from the search index"""
+
+    if not search_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s", [computer_id])
+
+
+def rebuild_search_index():
+    """Repopulates the whole search index from the Computer table and returns the number of rows indexed"""
+
+    if not search_enabled():
+        return 0
+    create_search_index()
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+        cursor.execute(INDEX_ROWS)
+        cursor.execute(f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('optimize')")
+        cursor.execute(f"SELECT count(*) FROM {SEARCH_TABLE}")
+        return cursor.fetchone()[0]
+
+
+def build_match(search_text):
+    """Turns free text into an FTS5 query that requires every word, each matched as a prefix.
+
+    Returns:
+        str -- the MATCH expression, or "" when the text has no searchable words
+    """
+
+    words = re.findall(r"\w+", search_text)
+    return " ".join(f'"{word}"*' for word in words)
+
+
+class ComputerSearch:
+    """Defines the ranked hits for one search, shaped so django.core.paginator.Paginator can count and slice it.
+
+    Counting and slicing each run a single statement against the index; only the computers on the requested page are loaded.
+    """
+
+    def __init__(self, search_text):
+        self.search_text = search_text
+        self.match = build_match(search_text)
+        self._count = None
+
+    def count(self):
+        if self._count is None:
+            if self.match == "":
+                self._count = 0
+            elif search_enabled():
+                with connection.cursor() as cursor:
+                    cursor.execute(f"SELECT count(*) FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s", [self.match])
+                    self._count = cursor.fetchone()[0]
+            else:
+                self._count = self._fallback().count()
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+        start = key.start or 0
+        stop = key.stop if key.stop is not None else self.count()
+        if self.match == "" or stop <= start:
+            return []
+        if not search_enabled():
+            return list(self._fallback()[start:stop])
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s ORDER BY {RANK} LIMIT %s OFFSET %s",
+                [self.match, stop - start, start]
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+        computers = Computer.objects.select_related("current_assignment__employee").in_bulk(ids)
+        return [computers[pk] for pk in ids if pk in computers]
+
+    def _fallback(self):
+        """Substring match on make and model for databases without FTS5"""
+
+        computers = Computer.objects.select_related("current_assignment__employee")
+        for word in re.findall(r"\w+", self.search_text):
+            computers = computers.filter(Q(make__icontains=word) | Q(model__icontains=word))
+        return computers.order_by("make", "model", "id")
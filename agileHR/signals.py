@@ -0,0 +1,313 @@
+"""Signal receivers that keep the denormalized fields of the agileHR models in step with the rows they summarize"""
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+from agileHR.models import *
+from agileHR import audit
+from agileHR.assignments import IN_SERVICE, refresh_computers, refresh_employees
+from agileHR.enrollment import promote_waitlist, release_seats
+from agileHR.fragments import bump, entity, listing
+from agileHR.hierarchy import check_supervisor, detach_reports, move_subtree
+from agileHR.tallies import ASSIGNED, IDLE, close_department, computer_counters, employee_counters, open_departments, shift
+from agileHR.search import index_computers, unindex_computer
+from agileHR.stamps import touch
+
+
+@receiver(post_save, sender=EmployeeComputer)
+def sync_current_assignment(sender, instance, **kwargs):
+    """Points a computer at its open assignment, or clears the pointer once that assignment is revoked, then refreshes availability and the holder in the search index.
+
+    An idle computer being claimed, or an assigned one being released, is matched by the UPDATE itself, whose row count moves the computer between the idle and assigned tallies; other computers take a second UPDATE.
+    """
+
+    if instance.date_revoked is None:
+        if Computer.objects.filter(pk=instance.computer_id, current_assignment=None, retire_date=None).update(current_assignment=instance, is_available=False):
+            shift([IDLE], [ASSIGNED])
+        else:
+            Computer.objects.filter(pk=instance.computer_id).update(current_assignment=instance, is_available=False)
+        Employee.objects.filter(pk=instance.employee_id).update(has_computer=True)
+    else:
+        if Computer.objects.filter(pk=instance.computer_id, current_assignment=instance, retire_date=None).update(current_assignment=None, is_available=True):
+            shift([ASSIGNED], [IDLE])
+        else:
+            Computer.objects.filter(pk=instance.computer_id, current_assignment=instance).update(current_assignment=None, is_available=IN_SERVICE)
+        refresh_employees([instance.employee_id])
+    index_computers([instance.computer_id])
+
+
+@receiver(post_delete, sender=EmployeeComputer)
+def release_deleted_assignment(sender, instance, **kwargs):
+    """Frees the computer of a deleted assignment, whose pointer the delete cleared with a plain UPDATE, then refreshes the holder's flag and the search row.
+
+    A computer still marked unavailable without a pointer or a retire date was held through this assignment, so the UPDATE that frees it also tells whether it moves from the assigned tally to the idle one.
+    """
+
+    if Computer.objects.filter(pk=instance.computer_id, current_assignment=None, retire_date=None, is_available=False).update(is_available=True):
+        shift([ASSIGNED], [IDLE])
+    refresh_employees([instance.employee_id])
+    index_computers([instance.computer_id])
+
+
+@receiver(post_save, sender=Computer)
+def sync_computer(sender, instance, **kwargs):
+    """Recomputes availability, which retiring a computer changes, and re-indexes its make, model and serial number"""
+
+    refresh_computers([instance.pk])
+    index_computers([instance.pk])
+
+
+@receiver(post_delete, sender=Computer)
+def remove_computer_search(sender, instance, **kwargs):
+    """Drops a deleted computer from the search index"""
+
+    unindex_computer(instance.pk)
+
+
+@receiver(post_save, sender=Employee)
+def sync_holder_search(sender, instance, created, **kwargs):
+    """Re-indexes the computers an employee holds, since their name is searchable"""
+
+    if not created:
+        index_computers(Computer.objects.filter(current_assignment__employee=instance).values_list("id", flat=True))
+
+
+@receiver(post_save, sender=EmployeeTraining)
+def count_seat(sender, instance, created, **kwargs):
+    """Counts an enrollment saved one row at a time, e.g. by the seeders; enrollment.enroll reserves its seats itself"""
+
+    if created and instance.training_id is not None:
+        Training.objects.filter(pk=instance.training_id).update(seats_taken=F("seats_taken") + 1)
+
+
+@receiver(post_delete, sender=EmployeeTraining)
+def free_seat(sender, instance, **kwargs):
+    """Releases the seat of a removed enrollment, and offers it to the training's waitlist once the deletion has committed"""
+
+    training_id = instance.training_id
+    if training_id is not None:
+        release_seats(training_id)
+        transaction.on_commit(lambda: promote_waitlist(training_id))
+
+
+@receiver([post_save, post_delete], sender=EmployeeComputer)
+def touch_assignment_pages(sender, instance, **kwargs):
+    """Marks the detail pages of both sides of an assignment as modified"""
+
+    touch(Employee, [instance.employee_id])
+    touch(Computer, [instance.computer_id])
+
+
+@receiver([post_save, post_delete], sender=EmployeeTraining)
+def touch_enrollment_pages(sender, instance, **kwargs):
+    """Marks the detail pages of both sides of an enrollment as modified"""
+
+    touch(Employee, [instance.employee_id])
+    touch(Training, [instance.training_id])
+
+
+@receiver(pre_save, sender=Employee)
+def read_stored_employee(sender, instance, **kwargs):
+    """Reads the stored row of an employee about to be saved, once, for the pre_save receivers below that compare the save against it; None for a new employee"""
+
+    instance._stored = None if instance._state.adding or instance.pk is None else Employee._base_manager.filter(pk=instance.pk).values().first()
+
+
+@receiver(pre_save, sender=Employee)
+def touch_previous_department(sender, instance, update_fields=None, **kwargs):
+    """Marks the department an employee is moving out of as modified"""
+
+    if instance._stored is None or (update_fields is not None and "department" not in update_fields):
+        return
+    previous = instance._stored["department_id"]
+    if previous is not None and previous != instance.department_id:
+        Department.objects.filter(pk=previous).update(updated_at=timezone.now())
+
+
+@receiver(pre_delete, sender=Employee)
+def touch_employee_pages(sender, instance, **kwargs):
+    """Marks the pages listing an employee as modified before deleting the employee clears the links to them"""
+
+    touch(Department, [instance.department_id])
+    touch(Training, EmployeeTraining.objects.filter(employee_id=instance.pk).values_list("training_id", flat=True))
+
+
+@receiver(pre_save, sender=Employee)
+def check_reporting_line(sender, instance, update_fields=None, **kwargs):
+    """Notes whether the save changes the employee's supervisor, refusing a change that would make them report to themselves"""
+
+    instance._supervisor_moved = False
+    if update_fields is not None and "supervisor" not in update_fields:
+        return
+    stored = instance._stored["supervisor_id"] if instance._stored else None
+    if stored != instance.supervisor_id:
+        check_supervisor(instance, instance.supervisor_id)
+        instance._supervisor_moved = True
+
+
+@receiver(post_save, sender=Employee)
+def sync_reporting_lines(sender, instance, **kwargs):
+    """Moves the employee's subtree under their new supervisor in the ReportingLine closure"""
+
+    if getattr(instance, "_supervisor_moved", False):
+        move_subtree(instance.pk, instance.supervisor_id)
+        instance._supervisor_moved = False
+
+
+@receiver(pre_delete, sender=Employee)
+def detach_employee_reports(sender, instance, **kwargs):
+    """Stops the managers above a deleted employee from counting the people below them"""
+
+    detach_reports(instance.pk)
+
+
+@receiver(pre_delete, sender=Department)
+def touch_department_members(sender, instance, **kwargs):
+    """Marks the pages of a department's employees as modified before deleting the department clears their department"""
+
+    Employee.objects.filter(department_id=instance.pk).update(updated_at=timezone.now())
+
+
+@receiver(pre_save, sender=Employee)
+def read_employee_counters(sender, instance, update_fields=None, **kwargs):
+    """Notes the dashboard counters the stored employee counts towards, read before the save overwrites them"""
+
+    instance._tally_counters = None
+    if instance.pk is None or (update_fields is not None and "department" not in update_fields and "end_date" not in update_fields):
+        return
+    stored = instance._stored
+    instance._tally_counters = employee_counters(stored["department_id"], stored["end_date"]) if stored else []
+
+
+@receiver(post_save, sender=Employee)
+def count_employee(sender, instance, created, **kwargs):
+    """Moves a created employee, or one whose department or end date changed, between the dashboard counters"""
+
+    before = [] if created else getattr(instance, "_tally_counters", None)
+    if before is not None:
+        shift(before, employee_counters(instance.department_id, instance.end_date))
+    instance._tally_counters = None
+
+
+@receiver(post_delete, sender=Employee)
+def uncount_employee(sender, instance, **kwargs):
+    """Takes a deleted employee off the dashboard counters"""
+
+    shift(employee_counters(instance.department_id, instance.end_date), [])
+
+
+@receiver(pre_save, sender=Computer)
+def read_computer_counters(sender, instance, update_fields=None, **kwargs):
+    """Notes whether the stored computer is held, and the dashboard counter it counts towards; save() never writes the assignment pointer, so only the retire date can move it"""
+
+    instance._tally_assigned = False
+    instance._tally_counters = None
+    if instance.pk is None or (update_fields is not None and "retire_date" not in update_fields):
+        return
+    stored = Computer.objects.filter(pk=instance.pk).values_list("retire_date", "current_assignment_id").first()
+    if stored:
+        instance._tally_assigned = stored[1] is not None
+        instance._tally_counters = computer_counters(stored[0], instance._tally_assigned)
+
+
+@receiver(post_save, sender=Computer)
+def count_computer(sender, instance, created, **kwargs):
+    """Counts a created computer as idle or retired, and moves one whose retire date changed"""
+
+    before = [] if created else getattr(instance, "_tally_counters", None)
+    if before is not None:
+        shift(before, computer_counters(instance.retire_date, getattr(instance, "_tally_assigned", False)))
+    instance._tally_counters = None
+
+
+@receiver(post_delete, sender=Computer)
+def uncount_computer(sender, instance, **kwargs):
+    """Takes a deleted computer off the dashboard counters"""
+
+    shift(computer_counters(instance.retire_date, instance.current_assignment_id is not None), [])
+
+
+@receiver(post_save, sender=Department)
+def open_headcount(sender, instance, created, **kwargs):
+    """Lists a new department on the dashboard with nobody in it"""
+
+    if created:
+        open_departments([instance.pk])
+
+
+@receiver(pre_delete, sender=Department)
+def close_headcount(sender, instance, **kwargs):
+    """Hands a department's headcount to the employees without a department, which its employees become once it is deleted"""
+
+    close_department(instance.pk)
+
+
+# the entity stamps whose fragments display a row of each model
+FRAGMENT_ENTITIES = {
+    Employee: lambda row: [entity("employee", row.pk)],
+    Department: lambda row: [entity("department", row.pk)],
+    Computer: lambda row: [entity("computer", row.pk)],
+    EmployeeComputer: lambda row: [entity("computer", row.computer_id)],
+    Training: lambda row: [entity("training", row.pk)],
+    EmployeeTraining: lambda row: [entity("employee", row.employee_id), entity("training", row.training_id)]
+}
+
+# the list pages that show each model, directly, through a joined name or through a count
+FRAGMENT_LISTS = {
+    Employee: ["employee", "computers", "department"],
+    Department: ["department", "employee"],
+    Computer: ["computers"],
+    EmployeeComputer: ["computers"],
+    Training: ["training"],
+    EmployeeTraining: []
+}
+
+
+@receiver([post_save, post_delete], sender=Employee)
+@receiver([post_save, post_delete], sender=Department)
+@receiver([post_save, post_delete], sender=Computer)
+@receiver([post_save, post_delete], sender=EmployeeComputer)
+@receiver([post_save, post_delete], sender=Training)
+@receiver([post_save, post_delete], sender=EmployeeTraining)
+def invalidate_fragments(sender, instance, **kwargs):
+    """Bumps the versions of the cached fragments showing the saved or deleted row, leaving every other row's fragments in place"""
+
+    bump(*FRAGMENT_ENTITIES[sender](instance), *[listing(name) for name in FRAGMENT_LISTS[sender]])
+
+
+@receiver(pre_save, sender=Employee)
+@receiver(pre_save, sender=Department)
+@receiver(pre_save, sender=Computer)
+@receiver(pre_save, sender=EmployeeComputer)
+@receiver(pre_save, sender=Training)
+@receiver(pre_save, sender=EmployeeTraining)
+def read_audit_state(sender, instance, update_fields=None, **kwargs):
+    """Reads the values stored for an audited row before the save overwrites them, to diff the save against; an employee's were read by read_stored_employee already"""
+
+    audit.read_stored(instance, update_fields, getattr(instance, "_stored", None) if sender is Employee else None)
+
+
+@receiver(post_save, sender=Employee)
+@receiver(post_save, sender=Department)
+@receiver(post_save, sender=Computer)
+@receiver(post_save, sender=EmployeeComputer)
+@receiver(post_save, sender=Training)
+@receiver(post_save, sender=EmployeeTraining)
+def audit_save(sender, instance, created, update_fields=None, **kwargs):
+    """Records the fields a save set or changed"""
+
+    audit.saved(instance, created, update_fields)
+
+
+@receiver(post_delete, sender=Employee)
+@receiver(post_delete, sender=Department)
+@receiver(post_delete, sender=Computer)
+@receiver(post_delete, sender=EmployeeComputer)
+@receiver(post_delete, sender=Training)
+@receiver(post_delete, sender=EmployeeTraining)
+def audit_delete(sender, instance, **kwargs):
+    """Records the values of a deleted row"""
+
+    audit.deleted(instance)
@@ -0,0 +1,104 @@
+"""Last-modified stamps for the agileHR detail pages, so a browser revalidating one gets a 304 without the page being queried for or rendered.
+
+Department, Employee, Computer and Training carry an updated_at that save() stamps. A detail page was last modified when the newest of the rows it displays was, which one query reads: the row, with a subquery per related set. Rows disappearing from a page cannot raise that maximum, so whatever removes them (revoking an assignment, withdrawing an enrollment, moving an employee to another department) touches the rows they were displayed on.
+"""
+
+from django.db.models import F, OuterRef, Subquery
+from django.utils import timezone
+from django.views.decorators.http import condition
+
+from agileHR.models import *
+
+
+def touch(model, pks):
+    """Stamps rows as modified now, e.g. because a row they display was added, changed or removed"""
+
+    pks = [pk for pk in set(pks) if pk is not None]
+    if pks:
+        model.objects.filter(pk__in=pks).update(updated_at=timezone.now())
+
+
+def newest(stamps):
+    """The latest of the stamps a row returned, or None when the row itself is missing"""
+
+    values = [value for value in stamps.values() if value is not None]
+    return max(values) if values and stamps.get("own") is not None else None
+
+
+def latest(model, **lookups):
+    """A correlated subquery for the newest updated_at among the rows of model matching lookups, e.g. latest(Department, pk=OuterRef("department_id"))"""
+
+    return Subquery(model.objects.filter(**lookups).order_by("-updated_at").values("updated_at")[:1])
+
+
+def read_stamps(model, pk, **relations):
+    """Reads a row's updated_at with the newest stamp of each related set, in one query.
+
+    Each set is its own subquery rather than a join in one aggregate, so the rows of one relation do not multiply those of the others: a manager's page costs the sum of their reports, managers, computers and trainings, not the product.
+
+    Returns:
+        datetime -- the newest of the stamps, or None when the row is missing
+    """
+
+    return newest(model.objects.filter(pk=pk).values(own=F("updated_at"), **relations).first() or {})
+
+
+def employee_modified(employee_id):
+    """The employee, their department, their chain of command, their direct reports, and the computers and trainings listed on their page"""
+
+    return read_stamps(
+        Employee,
+        employee_id,
+        of_department=latest(Department, pk=OuterRef("department_id")),
+        of_managers=latest(Employee, descendant_lines__descendant_id=OuterRef("pk")),
+        of_reports=latest(Employee, supervisor_id=OuterRef("pk")),
+        of_computers=latest(Computer, employeecomputer__employee_id=OuterRef("pk")),
+        of_trainings=latest(Training, employeetraining__employee_id=OuterRef("pk"))
+    )
+
+
+def computer_modified(computer_id):
+    """The computer and every employee in its assignment history"""
+
+    return read_stamps(Computer, computer_id, of_holders=latest(Employee, employeecomputer__computer_id=OuterRef("pk")))
+
+
+def department_modified(dept_id):
+    """The department and its employees"""
+
+    return read_stamps(Department, dept_id, of_employees=latest(Employee, department_id=OuterRef("pk")))
+
+
+def training_modified(training_id):
+    """The training, its attendees and waitlist, and the moments it started and ended, since the page shows whether it is upcoming"""
+
+    stamps = Training.objects.filter(pk=training_id).values(
+        "start_date",
+        "end_date",
+        own=F("updated_at"),
+        of_attendees=latest(Employee, employeetraining__training_id=OuterRef("pk")),
+        of_waiting=latest(Employee, waitlistentry__training_id=OuterRef("pk"))
+    ).first() or {}
+    now = timezone.now()
+    for moment in ("start_date", "end_date"):
+        if stamps.get(moment) is not None and stamps[moment] > now:
+            stamps[moment] = None
+    return newest(stamps)
+
+
+def conditional_page(modified):
+    """Decorates a detail view so it answers If-None-Match and If-Modified-Since from a stamp function, called with the view's URL arguments.
+
+    The stamp is read once per request and serves both headers: Last-Modified, which HTTP only keeps to the second, and an ETag holding the full microseconds, so two changes within a second still differ.
+    """
+
+    def last_modified(request, *args, **kwargs):
+        if not hasattr(request, "page_modified"):
+            request.page_modified = modified(*args, **kwargs)
+        return request.page_modified
+
+    def etag(request, *args, **kwargs):
+        stamp = last_modified(request, *args, **kwargs)
+        return stamp.isoformat() if stamp else None
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
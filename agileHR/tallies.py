@@ -0,0 +1,163 @@
+"""Running totals for the dashboard, kept in Tally so the landing page reads a few dozen rows instead of counting the tables.
+
+Each employee counts once towards their department's headcount and once as active or as having an end date, and each computer once as assigned, idle or retired. agileHR.signals moves those counts as rows are saved and deleted, taking one from the counter a row leaves and adding one to the counter it joins; writes that go around save() adjust them alongside (the importer, revoke_assignments), and rebuild_derived recounts everything after bulk loads.
+
+Upcoming trainings are not counted here: a training stops being upcoming as the clock passes its start, with no write to hook, so they are read off the start_date index within a short window instead. For the same reason the end-date counter includes employees whose end date is still ahead; the dashboard reads those off the end_date index and counts them as active, as the employee list does.
+
+The totals and the headcount of employees without a department have no department to key them, and unique_together does not stop two NULL-department rows with the same name. Those rows are created once, by create_totals after migrate and by rebuild_tallies, so adjust only ever updates them.
+"""
+
+import datetime
+from collections import Counter
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from agileHR.models import *
+
+
+HEADCOUNT = "headcount"
+ACTIVE = ("active_employees", None)
+# every employee with an end date, past or future; see dashboard()
+TERMINATED = ("terminated_employees", None)
+ASSIGNED = ("assigned_computers", None)
+IDLE = ("idle_computers", None)
+RETIRED = ("retired_computers", None)
+TOTALS = (ACTIVE, TERMINATED, ASSIGNED, IDLE, RETIRED)
+# the counters without a department, which are never created by adjust
+UNKEYED = TOTALS + ((HEADCOUNT, None),)
+
+# how many departments the dashboard lists, how far ahead it lists trainings, and how many of those it shows
+HEADCOUNT_LIMIT = 10
+UPCOMING_DAYS = 30
+UPCOMING_LIMIT = 10
+
+
+def employee_counters(department_id, end_date):
+    """The counters an employee counts towards: their department's headcount (the NULL one without a department), and active, or the end-date counter once they have an end date
+
+    Returns:
+        list -- (name, department_id) keys
+    """
+
+    return [(HEADCOUNT, department_id), TERMINATED if end_date is not None else ACTIVE]
+
+
+def computer_counters(retire_date, assigned):
+    """The counter a computer counts towards: retired once it has a retire date, whether or not someone still holds it, else assigned or idle
+
+    Returns:
+        list -- (name, department_id) keys
+    """
+
+    if retire_date is not None:
+        return [RETIRED]
+    return [ASSIGNED if assigned else IDLE]
+
+
+def create_totals(sender=None, **kwargs):
+    """Creates the counters without a department that are missing. Connected to post_migrate, so adjust finds them and never inserts a second NULL-department row."""
+
+    existing = set(Tally.objects.filter(department=None).values_list("name", flat=True))
+    Tally.objects.bulk_create([Tally(name=name, department_id=None) for name, _ in UNKEYED if name not in existing])
+
+
+def adjust(deltas):
+    """Adds to each counter, creating the per-department ones that do not exist yet, with one UPDATE per counter that changed
+
+    Arguments:
+        deltas {dict} -- (name, department_id) key mapped onto the amount to add, negative to take away
+    """
+
+    # a fixed order, so concurrent writers adjusting the same counters take their row locks in the same sequence
+    for (name, department_id), delta in sorted(deltas.items(), key=lambda item: (item[0][0], item[0][1] or 0)):
+        if not delta or Tally.objects.filter(name=name, department_id=department_id).update(value=F("value") + delta):
+            continue
+        if department_id is None:
+            # seeded by create_totals; only missing if the table was emptied by hand
+            create_totals()
+            Tally.objects.filter(name=name, department_id=None).update(value=F("value") + delta)
+        else:
+            Tally.objects.create(name=name, department_id=department_id, value=delta)
+
+
+def shift(before, after):
+    """Moves a row from the counters it counted towards to the ones it counts towards now; counters in both are left alone
+
+    Arguments:
+        before {list} -- keys, empty for a row being created
+        after {list} -- keys, empty for a row being deleted
+    """
+
+    deltas = Counter(after)
+    deltas.subtract(before)
+    adjust(deltas)
+
+
+def open_departments(department_ids):
+    """Creates the empty headcounts of new departments, so the dashboard lists them before anyone joins"""
+
+    Tally.objects.bulk_create([Tally(name=HEADCOUNT, department_id=department_id) for department_id in department_ids])
+
+
+def close_department(department_id):
+    """Hands a department's headcount to the employees without one, as deleting it clears their department; its own counter goes with the department"""
+
+    headcount = Tally.objects.filter(name=HEADCOUNT, department_id=department_id).values_list("value", flat=True).first()
+    adjust({(HEADCOUNT, None): headcount or 0})
+
+
+def rebuild_tallies():
+    """Recounts every tally from the tables, e.g. after rows were loaded with bulk inserts: one grouped query for the employees and one aggregate for the computers
+
+    Returns:
+        int -- the number of tallies written
+    """
+
+    Tally.objects.all().delete()
+    counts = Counter()
+    counts.update({(HEADCOUNT, department_id): 0 for department_id in Department.objects.values_list("id", flat=True)})
+    rows = Employee.objects.order_by().values_list("department_id").annotate(
+        active=Count("id", filter=Q(end_date__isnull=True)),
+        terminated=Count("id", filter=Q(end_date__isnull=False))
+    )
+    for department_id, active, terminated in rows:
+        counts[(HEADCOUNT, department_id)] += active + terminated
+        counts[ACTIVE] += active
+        counts[TERMINATED] += terminated
+    computers = Computer.objects.aggregate(
+        assigned=Count("id", filter=Q(retire_date__isnull=True, current_assignment__isnull=False)),
+        idle=Count("id", filter=Q(retire_date__isnull=True, current_assignment__isnull=True)),
+        retired=Count("id", filter=Q(retire_date__isnull=False))
+    )
+    counts.update({ASSIGNED: computers["assigned"], IDLE: computers["idle"], RETIRED: computers["retired"]})
+    for key in UNKEYED:
+        counts.setdefault(key, 0)
+    Tally.objects.bulk_create([Tally(name=name, department_id=department_id, value=value) for (name, department_id), value in counts.items()])
+    return len(counts)
+
+
+def dashboard():
+    """Reads what the landing page shows: the largest headcounts and the totals from Tally, and the trainings of the next UPCOMING_DAYS off the start_date index, listed and totalled; five queries whatever the size of the tables.
+
+    The end-date counter includes employees leaving on a future date, since nothing is written when that date passes. They are counted off the end_date index and moved to active, so the totals agree with the employee list's active and terminated filters at any moment.
+
+    Returns:
+        dict -- headcounts (Tally rows with their department, largest first), totals (tally name mapped onto value), upcoming (Training rows, each with a fill percentage) and seats (count, offered and taken over the window)
+    """
+
+    headcounts = list(Tally.objects.filter(name=HEADCOUNT).exclude(department=None, value=0).select_related("department").order_by("-value", "department__name")[:HEADCOUNT_LIMIT])
+    totals = {name: 0 for name, _ in TOTALS}
+    totals.update(Tally.objects.filter(department=None).exclude(name=HEADCOUNT).values_list("name", "value"))
+    now = timezone.now()
+    leaving = Employee.objects.filter(end_date__gt=now).count()
+    totals[ACTIVE[0]] += leaving
+    totals[TERMINATED[0]] -= leaving
+
+    window = Training.objects.filter(start_date__gt=now, start_date__lte=now + datetime.timedelta(days=UPCOMING_DAYS))
+    upcoming = list(window.order_by("start_date", "id")[:UPCOMING_LIMIT])
+    for training in upcoming:
+        training.fill = round(100 * training.seats_taken / training.max_attendees) if training.max_attendees else 100
+    seats = window.aggregate(count=Count("id"), offered=Sum("max_attendees"), taken=Sum("seats_taken"))
+    seats["fill"] = round(100 * seats["taken"] / seats["offered"]) if seats["offered"] else 0
+
+    return {"headcounts": headcounts, "totals": totals, "upcoming": upcoming, "seats": seats}
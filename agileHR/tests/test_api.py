@@ -0,0 +1,115 @@
+import json
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from agileHR.models import *
+from agileHR.pagination import encode_cursor
+
+
+class ApiTest(TestCase):
+    """Defines tests for the read-only JSON API
+
+    Methods:
+        setUpTestData
+        test_sparse_fields
+        test_nested_include_queries
+        test_cursor_pagination
+        test_etag
+        test_detail
+        test_bad_requests
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = Department.objects.create(name="engineering", budget=100000)
+        cls.employees = [
+            Employee.objects.create(first_name=f"First{number}", last_name=f"Last{number}", start_date=timezone.now(), is_supervisor=False, department=cls.department)
+            for number in range(5)
+        ]
+        for number, employee in enumerate(cls.employees[:3]):
+            computer = Computer.objects.create(make="Dell", model=f"XPS {number}", serial_no=f"D-{number}", purchase_date=timezone.now())
+            EmployeeComputer.objects.create(employee=employee, computer=computer, date_assigned=timezone.now())
+
+    def get(self, path, **params):
+        return self.client.get(path, params)
+
+    def test_sparse_fields(self):
+        """Test case verifies that fields and fields[resource] limit the keys of the main and embedded rows"""
+
+        response = self.get(reverse("agileHR:api_list", args=("employees",)), fields="last_name", include="department", **{"fields[departments]": "name"})
+
+        self.assertEqual(response.status_code, 200)
+        first = response.json()["data"][0]
+        self.assertEqual(first, {"last_name": "Last0", "department": {"name": "engineering"}})
+
+    def test_nested_include_queries(self):
+        """Test case verifies that embedded relations cost one query per level, whatever the number of rows"""
+
+        with self.assertNumQueries(3):
+            response = self.get(reverse("agileHR:api_list", args=("employees",)), include="assignments.computer")
+        data = response.json()["data"]
+        self.assertEqual(data[0]["assignments"][0]["computer"]["model"], "XPS 0")
+        self.assertEqual(data[4]["assignments"], [])
+
+        with self.assertNumQueries(2):
+            response = self.get(reverse("agileHR:api_list", args=("computers",)), include="current_assignment")
+        self.assertEqual(response.json()["data"][2]["current_assignment"]["employee_id"], self.employees[2].id)
+
+    def test_cursor_pagination(self):
+        """Test case verifies that the next and prev links walk the rows in id order without overlap"""
+
+        url = reverse("agileHR:api_list", args=("employees",))
+        first = self.get(url, limit=2, fields="id").json()
+        self.assertEqual([row["id"] for row in first["data"]], [employee.id for employee in self.employees[:2]])
+        self.assertIsNone(first["links"]["prev"])
+
+        second = self.client.get(first["links"]["next"]).json()
+        self.assertEqual([row["id"] for row in second["data"]], [employee.id for employee in self.employees[2:4]])
+        self.assertIn("fields=id", second["links"]["next"])
+        last = self.client.get(second["links"]["next"]).json()
+        self.assertEqual(len(last["data"]), 1)
+        self.assertIsNone(last["links"]["next"])
+
+        back = self.client.get(last["links"]["prev"]).json()
+        self.assertEqual(back["data"], second["data"])
+
+        for values in (["b"], [None], [1, 2], [{"id": 1}]):
+            response = self.get(url, limit=2, fields="id", after=encode_cursor(values))
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()["data"], first["data"])
+
+    def test_etag(self):
+        """Test case verifies that a matching If-None-Match gets an empty 304 until the data changes"""
+
+        url = reverse("agileHR:api_list", args=("departments",))
+        response = self.client.get(url)
+        etag = response["ETag"]
+        self.assertTrue(etag.startswith('"'))
+
+        cached = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached.content, b"")
+        self.assertEqual(cached["ETag"], etag)
+
+        Department.objects.filter(pk=self.department.pk).update(budget=5)
+        changed = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed["ETag"], etag)
+
+    def test_detail(self):
+        """Test case verifies that a single row can be fetched with its relations, and a missing one is a 404"""
+
+        response = self.get(reverse("agileHR:api_detail", args=("departments", self.department.id)), include="employees", **{"fields[employees]": "first_name"})
+
+        self.assertEqual(len(response.json()["data"]["employees"]), 5)
+        self.assertEqual(self.client.get(reverse("agileHR:api_detail", args=("departments", 999))).status_code, 404)
+
+    def test_bad_requests(self):
+        """Test case verifies that unknown resources are 404s, unknown fields and relations are 400s, and writes are refused"""
+
+        self.assertEqual(self.client.get(reverse("agileHR:api_list", args=("salaries",))).status_code, 404)
+        response = self.get(reverse("agileHR:api_list", args=("employees",)), fields="salary")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"error": "unknown field for employees: salary"})
+        self.assertEqual(self.get(reverse("agileHR:api_list", args=("employees",)), include="department.budget").status_code, 400)
+        self.assertEqual(self.client.post(reverse("agileHR:api_list", args=("employees",))).status_code, 405)
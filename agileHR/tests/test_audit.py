@@ -0,0 +1,192 @@
+import io
+import json
+from django.db import IntegrityError, connection, transaction
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from agileHR.models import *
+from bangazon.db.writer import write_queue
+from .. import audit
+from ..audit import recording, trail
+from ..enrollment import withdraw
+from ..importer import import_csv
+
+
+class AuditTest(TransactionTestCase):
+    """Defines tests for the audit trail. Entries are written as their transaction commits, which TestCase never does, hence TransactionTestCase.
+
+    Methods:
+        setUp
+        edit
+        changes
+        test_edit_records_changed_fields
+        test_one_insert_per_request
+        test_rolled_back_edit_leaves_no_entries
+        test_entries_commit_with_the_change
+        test_loading_takes_no_snapshot
+        test_deletes_are_recorded
+        test_write_queue_records_into_request
+        test_trail_by_entity_and_time
+        test_entries_are_append_only
+        test_bulk_enrollments_keep_their_ids
+        test_imports_are_recorded
+    """
+
+    def setUp(self):
+        self.department = Department.objects.create(name="HR", budget=1)
+        self.employee = Employee.objects.create(first_name="Rob", last_name="Boss", start_date=timezone.make_aware(timezone.datetime(2016, 3, 7)), is_supervisor=False, department=self.department)
+        self.computer = Computer.objects.create(make="Apple", model="MacBook Pro", serial_no="A-1", purchase_date=timezone.now())
+        self.started = timezone.now()
+
+    def edit(self, **changes):
+        form = {"first_name": "Rob", "last_name": "Boss", "department": self.department.id, "start_date": "2016-03-07", "end_date": "", "computer": "select"}
+        form.update(changes)
+        return self.client.post(reverse("agileHR:employee_edit", args=(self.employee.id,)), form)
+
+    def changes(self, entity, object_id):
+        return [(entry.action, json.loads(entry.changes)) for entry in trail(entity, object_id, start=self.started)]
+
+    def test_edit_records_changed_fields(self):
+        """Test case verifies that an edit records only the fields it changed, with their old and new values, and the request that made it"""
+
+        self.edit(first_name="Bob", is_supervisor="on")
+
+        self.assertEqual(self.changes("employee", self.employee.id), [("changed", {"first_name": ["Rob", "Bob"], "is_supervisor": [False, True]})])
+        self.assertEqual(trail("employee", self.employee.id, start=self.started).get().path, reverse("agileHR:employee_edit", args=(self.employee.id,)))
+
+    # the insert is counted on this thread's connection, which the write queue would bypass
+    @override_settings(WRITE_QUEUE=False)
+    def test_one_insert_per_request(self):
+        """Test case verifies that the entries of a request changing several rows are written with one insert"""
+
+        training = Training.objects.create(title="Safety", start_date=timezone.now() + timezone.timedelta(days=2), end_date=timezone.now() + timezone.timedelta(days=3), max_attendees=5)
+        with CaptureQueriesContext(connection) as queries:
+            self.edit(first_name="Bob", computer=self.computer.id, trainings=[training.id])
+
+        inserts = [query["sql"] for query in queries if query["sql"].startswith('INSERT INTO "agileHR_auditentry"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual({entry.entity for entry in AuditEntry.objects.filter(path__startswith="/bangazon/employees")}, {"employee", "employeecomputer", "employeetraining"})
+
+    def test_rolled_back_edit_leaves_no_entries(self):
+        """Test case verifies that an edit refused after some of its writes leaves nothing in the trail"""
+
+        full = Training.objects.create(title="Full", start_date=timezone.now() + timezone.timedelta(days=2), end_date=timezone.now() + timezone.timedelta(days=3), max_attendees=0)
+        response = self.edit(first_name="Bob", computer=self.computer.id, trainings=[full.id])
+
+        self.assertIn(b"No changes were saved", response.content)
+        self.assertFalse(AuditEntry.objects.filter(path__startswith="/bangazon/employees").exists())
+
+    def test_entries_commit_with_the_change(self):
+        """Test case verifies that entries are written inside the transaction that made them, as it commits, and that those made in a savepoint rolled back are dropped"""
+
+        with recording("/test"):
+            with transaction.atomic():
+                self.employee.first_name = "Bob"
+                self.employee.save()
+                try:
+                    with transaction.atomic():
+                        self.computer.serial_no = "A-2"
+                        self.computer.save()
+                        raise IntegrityError
+                except IntegrityError:
+                    pass
+                self.assertFalse(AuditEntry.objects.filter(path="/test").exists())
+
+        self.assertEqual([(entry.entity, entry.object_id) for entry in AuditEntry.objects.filter(path="/test")], [("employee", self.employee.id)])
+
+    def test_loading_takes_no_snapshot(self):
+        """Test case verifies that loading rows keeps no copy of their values, which are read only when a row is saved"""
+
+        employee = Employee.objects.get(pk=self.employee.pk)
+        self.assertFalse(hasattr(employee, "_audit_state"))
+
+        employee.last_name = "Bossman"
+        with self.assertNumQueries(1):
+            audit.read_stored(employee, ["last_name"])
+        self.assertEqual(employee._audit_state, {"last_name": "Boss"})
+
+    def test_deletes_are_recorded(self):
+        """Test case verifies that deleting a row records the values it held, and that the trail outlives it"""
+
+        computer_id = self.computer.id
+        with recording("/test"):
+            self.computer.delete()
+
+        [(action, values)] = self.changes("computer", computer_id)
+        self.assertEqual(action, "deleted")
+        self.assertEqual(values["serial_no"], ["A-1", None])
+
+    @override_settings(WRITE_QUEUE=True)
+    def test_write_queue_records_into_request(self):
+        """Test case verifies that writes run on the writer thread are recorded inside the writer's transaction, under the request's path"""
+
+        try:
+            self.edit(first_name="Bob")
+        finally:
+            write_queue().stop()
+
+        self.assertEqual(self.changes("employee", self.employee.id), [("changed", {"first_name": ["Rob", "Bob"]})])
+
+    def test_trail_by_entity_and_time(self):
+        """Test case verifies that the trail reads one row's history within a time range off its index, and through the API"""
+
+        self.edit(first_name="Bob")
+        middle = timezone.now()
+        self.edit(first_name="Robert")
+
+        self.assertEqual([values["first_name"][1] for _, values in self.changes("employee", self.employee.id)], ["Bob", "Robert"])
+        self.assertEqual(trail("employee", self.employee.id, start=middle).count(), 1)
+        self.assertIn("USING INDEX", trail("employee", self.employee.id, start=middle).explain())
+
+        response = self.client.get(reverse("agileHR:api_list", args=("audit",)), {"entity": "employee", "object": self.employee.id, "fields": "action,changes"})
+        self.assertEqual(len(response.json()["data"]), 3)
+
+    def test_entries_are_append_only(self):
+        """Test case verifies that audit entries can be neither changed nor deleted"""
+
+        employee_id = self.employee.id
+        with recording():
+            self.employee.delete()
+        entry = AuditEntry.objects.get(entity="employee", object_id=employee_id, action="deleted")
+
+        with self.assertRaises(TypeError):
+            entry.save()
+        with self.assertRaises(TypeError):
+            entry.delete()
+        with self.assertRaises(TypeError):
+            AuditEntry.objects.all().delete()
+        with self.assertRaises(TypeError):
+            AuditEntry.objects.update(path="")
+
+    def test_bulk_enrollments_keep_their_ids(self):
+        """Test case verifies that enrollments inserted with bulk_create, by an edit or a waitlist promotion, are recorded under the ids SQLite did not return"""
+
+        training = Training.objects.create(title="Safety", start_date=timezone.now() + timezone.timedelta(days=2), end_date=timezone.now() + timezone.timedelta(days=3), max_attendees=1)
+        self.edit(trainings=[training.id])
+        enrollment = EmployeeTraining.objects.get(employee=self.employee, training=training)
+        self.assertEqual([action for action, _ in self.changes("employeetraining", enrollment.id)], ["created"])
+
+        waiting = Employee.objects.create(first_name="Wai", last_name="Ting", start_date=timezone.now(), is_supervisor=False, department=self.department)
+        WaitlistEntry.objects.create(employee=waiting, training=training)
+        with recording("/test"):
+            withdraw(EmployeeTraining.objects.filter(pk=enrollment.pk))
+        promoted = EmployeeTraining.objects.get(employee=waiting, training=training)
+        [(action, values)] = self.changes("employeetraining", promoted.id)
+        self.assertEqual((action, values["employee"]), ("created", [None, waiting.id]))
+        self.assertFalse(AuditEntry.objects.filter(entity="employeetraining", object_id=None).exists())
+
+    def test_imports_are_recorded(self):
+        """Test case verifies that rows written by the CSV importer, which skips save(), are recorded under their ids, without the fields signals maintain"""
+
+        with recording("/import"):
+            import_csv("employees", io.StringIO("first_name,last_name,start_date,department\nGrace,Hopper,2019-01-07,HR\n"))
+            grace = Employee.objects.get(last_name="Hopper")
+            import_csv("computers", io.StringIO(f"make,model,serial_no,purchase_date,employee_id\nLenovo,X1,L-9,2019-01-01,{grace.id}\n"))
+
+        [(action, values)] = self.changes("employee", grace.id)
+        self.assertEqual((action, values["last_name"], values["department"]), ("created", [None, "Hopper"], [None, self.department.id]))
+        self.assertNotIn("has_computer", values)
+        computer = Computer.objects.get(serial_no="L-9")
+        self.assertEqual(self.changes("computer", computer.id)[0][1]["serial_no"], [None, "L-9"])
+        self.assertEqual(self.changes("employeecomputer", computer.current_assignment_id)[0][1]["employee"], [None, grace.id])
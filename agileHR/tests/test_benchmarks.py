@@ -0,0 +1,147 @@
+import json
+import os
+import time
+import tracemalloc
+from io import StringIO
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase
+from django.urls import URLPattern, resolve, reverse
+from django.utils import timezone
+from .. import urls
+from ..management.commands.scale_seeder import build_spec, generate
+from ..models import *
+from ..profiling import routes, sample_ids
+
+BUDGETS_FILE = os.path.join(os.path.dirname(__file__), "benchmark_budgets.json")
+
+# row counts per dataset; the small scale runs with every test run, the others on request through BENCHMARK_SCALES
+SCALES = {
+    "small": {"department": 10, "employee": 300, "computer": 200, "training": 30, "enrollment": 300},
+    "medium": {"department": 100, "employee": 5000, "computer": 3000, "training": 300, "enrollment": 5000},
+    "large": {"department": 1000, "employee": 50000, "computer": 30000, "training": 2000, "enrollment": 50000}
+}
+
+
+class QueryCounter:
+    """Execute wrapper counting the statements a request sends; unlike CaptureQueriesContext it does not depend on the bounded debug query log"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def load_budgets():
+    with open(BUDGETS_FILE) as budgets_file:
+        return json.load(budgets_file)
+
+
+class RouteCoverageTest(TestCase):
+    """Defines tests keeping the benchmark routes and budgets in step with agileHR/urls.py
+
+    Methods:
+        test_every_url_is_benchmarked
+        test_every_route_has_a_budget_per_scale
+    """
+
+    def test_every_url_is_benchmarked(self):
+        """Test case verifies that every named pattern in agileHR/urls.py is replayed by routes(), and that each route reverses to the pattern it names"""
+
+        ids = {"department": 1, "employee": 1, "computer": 1, "training": 1}
+        patterns = {f"{urls.app_name}:{pattern.name}" for pattern in urls.urlpatterns if isinstance(pattern, URLPattern)}
+        replayed = set()
+        for name, args, _, _ in routes(ids):
+            replayed.add(name)
+            with self.subTest(route=name):
+                self.assertEqual(resolve(reverse(name, args=args)).view_name, name)
+
+        self.assertEqual(patterns - replayed, set(), "add these urls to agileHR.profiling.routes and their budgets to benchmark_budgets.json")
+
+    def test_every_route_has_a_budget_per_scale(self):
+        """Test case verifies that benchmark_budgets.json holds a budget for every route at every scale, and none for routes that no longer exist"""
+
+        budgets = load_budgets()
+        names = {route[0] for route in routes({"department": 1, "employee": 1, "computer": 1, "training": 1})}
+
+        self.assertEqual(set(budgets), names)
+        for name, scales in budgets.items():
+            with self.subTest(route=name):
+                self.assertEqual(set(scales), set(SCALES))
+
+
+class ViewBudgetTest(TestCase):
+    """Defines the per-view benchmark: loads datasets of increasing size and holds every route to its query, latency and memory budget for that scale.
+
+    Query counts and memory are asserted on every run. Wall-clock time depends on the machine and its load, so it is only asserted when BENCHMARK_TIMING=1.
+    Set BENCHMARK_SCALES (e.g. "small,medium,large") to choose the datasets and BENCHMARK_OUTPUT to a file path to keep the measurements as JSON.
+
+    Methods:
+        test_view_budgets
+    """
+
+    def request(self, name, args, method, data):
+        """Sends a route's request and, for a streamed response, reads the whole body, since the queries run as it is sent"""
+
+        url = reverse(name, args=args)
+        response = getattr(self.client, method)(url, data) if data else getattr(self.client, method)(url)
+        if response.streaming:
+            for _ in response.streaming_content:
+                pass
+        return response
+
+    def measure(self, route):
+        """Runs a route twice: once timed with its queries captured, once under tracemalloc, whose overhead would distort the timing"""
+
+        self.request(*route)
+        queries = QueryCounter()
+        with connection.execute_wrapper(queries):
+            started = time.perf_counter()
+            response = self.request(*route)
+            elapsed = time.perf_counter() - started
+        self.assertLess(response.status_code, 400, route[0])
+
+        tracemalloc.start()
+        self.request(*route)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        return {"queries": queries.count, "ms": round(elapsed * 1000, 2), "kb": round(peak / 1024, 1)}
+
+    def load(self, scale):
+        """Loads one dataset and returns the ids of representative rows to point the routes at"""
+
+        spec = build_spec(SCALES[scale], 2, 1, timezone.now().replace(hour=0, minute=0, second=0, microsecond=0))
+        generate(spec)
+        call_command("rebuild_derived", stdout=StringIO())
+        return sample_ids()
+
+    def test_view_budgets(self):
+        """Test case verifies that no view exceeds its budget at any loaded scale"""
+
+        budgets = load_budgets()
+        timed = os.environ.get("BENCHMARK_TIMING") == "1"
+        scales = [scale.strip() for scale in os.environ.get("BENCHMARK_SCALES", "small").split(",") if scale.strip()]
+        results = {}
+
+        for scale in scales:
+            with transaction.atomic():
+                ids = self.load(scale)
+                results[scale] = {route[0]: self.measure(route) for route in routes(ids)}
+                transaction.set_rollback(True)
+
+        output = os.environ.get("BENCHMARK_OUTPUT")
+        if output:
+            with open(output, "w") as output_file:
+                json.dump(results, output_file, indent=2, sort_keys=True)
+
+        for scale, measurements in results.items():
+            for name, measured in measurements.items():
+                budget = budgets[name][scale]
+                with self.subTest(scale=scale, view=name):
+                    self.assertLessEqual(measured["queries"], budget["queries"], f"{name} ran {measured['queries']} queries at {scale} scale")
+                    self.assertLessEqual(measured["kb"], budget["kb"], f"{name} peaked at {measured['kb']}KB at {scale} scale")
+                    if timed:
+                        self.assertLessEqual(measured["ms"], budget["ms"], f"{name} took {measured['ms']}ms at {scale} scale")
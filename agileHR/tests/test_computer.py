@@ -1,8 +1,12 @@
 import unittest
 import datetime
+from io import StringIO
+from django.core.management import call_command
 from django.test import TestCase
 from django.urls import reverse
-from ..models import Computer, EmployeeComputer, Employee
+from ..models import Computer, EmployeeComputer, Employee, Tally
+from ..assignments import assign_computer
+from ..pagination import encode_cursor
 from django.db.models.deletion import ProtectedError
 
 class ComputerListTest(TestCase):
@@ -240,3 +244,223 @@ class ComputerSearchTest(TestCase):
 
         response = self.client.get(reverse('agileHR:computer_search'))
         self.assertEqual(response.status_code, 302)
+
+
+class ComputerInventoryTest(TestCase):
+    """Tests the current assignment pointer and the filters of the computer list.
+
+    Methods:
+        test_current_assignment_pointer
+        test_inventory_filters
+        test_inventory_queries
+        test_tampered_cursors
+    """
+
+    def setUp(self):
+        now = datetime.datetime.now()
+        self.employee = Employee.objects.create(first_name="Deborah", last_name="Smith", start_date=now, is_supervisor=False, department=None)
+        self.assigned = Computer.objects.create(make="Apple", model="iMac", serial_no="A1", purchase_date=now)
+        self.idle = Computer.objects.create(make="Dell", model="XPS", serial_no="D1", purchase_date=now)
+        self.retired = Computer.objects.create(make="Dell", model="Old", serial_no="D2", purchase_date=now, retire_date=now)
+        self.join = EmployeeComputer.objects.create(computer=self.assigned, employee=self.employee, date_assigned=now)
+
+    def test_current_assignment_pointer(self):
+        """Tests that the pointer follows an assignment being opened and revoked."""
+
+        self.assigned.refresh_from_db()
+        self.assertEqual(self.assigned.current_assignment, self.join)
+
+        self.join.date_revoked = datetime.datetime.now()
+        self.join.save()
+        self.assigned.refresh_from_db()
+        self.assertIsNone(self.assigned.current_assignment)
+
+    def test_inventory_filters(self):
+        """Tests that make, assignment and retirement filters narrow the list."""
+
+        response = self.client.get(reverse('agileHR:computers'), {"make": "Dell"})
+        self.assertEqual({c.id for c in response.context['computers']}, {self.idle.id, self.retired.id})
+
+        response = self.client.get(reverse('agileHR:computers'), {"assigned": "yes"})
+        self.assertEqual([c.id for c in response.context['computers']], [self.assigned.id])
+        self.assertIn(self.employee.last_name.encode(), response.content)
+
+        response = self.client.get(reverse('agileHR:computers'), {"assigned": "no", "retired": "no"})
+        self.assertEqual([c.id for c in response.context['computers']], [self.idle.id])
+
+    def test_inventory_queries(self):
+        """Tests that holders are joined in rather than looked up once per computer."""
+
+        now = datetime.datetime.now()
+        for i in range(10):
+            computer = Computer.objects.create(make="Lenovo", model=f"T{i}", serial_no=f"L{i}", purchase_date=now)
+            EmployeeComputer.objects.create(computer=computer, employee=self.employee, date_assigned=now)
+
+        with self.assertNumQueries(2):
+            self.client.get(reverse('agileHR:computers'))
+
+    def test_tampered_cursors(self):
+        """Tests that a cursor with a null, non-integer or out of range id is ignored rather than failing the list."""
+
+        for values in (["Dell", "XPS", "b"], ["Dell", "XPS", None], ["Dell", "XPS", 2 ** 70]):
+            response = self.client.get(reverse('agileHR:computers'), {"after": encode_cursor(values)})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.context['computers']), 3)
+
+
+class ComputerFullTextSearchTest(TestCase):
+    """Tests the full-text index behind the computer search.
+
+    Methods:
+        test_search_prefix_and_serial
+        test_search_holder
+        test_search_ranking
+        test_search_pages
+    """
+
+    def setUp(self):
+        self.now = datetime.datetime.now()
+        self.employee = Employee.objects.create(first_name="Deborah", last_name="Smith", start_date=self.now, is_supervisor=False, department=None)
+        self.macbook = Computer.objects.create(make="Apple", model="MacBook Pro", serial_no="C02XK1", purchase_date=self.now)
+        self.dell = Computer.objects.create(make="Dell", model="Latitude", serial_no="DL-998", purchase_date=self.now)
+
+    def search(self, text):
+        return self.client.post(reverse('agileHR:computer_search'), {"search_text": text})
+
+    def test_search_prefix_and_serial(self):
+        """Checks that partial words and serial numbers find their computer."""
+
+        response = self.search("macb")
+        self.assertEqual([c.id for c in response.context['results']], [self.macbook.id])
+
+        response = self.search("DL 998")
+        self.assertEqual([c.id for c in response.context['results']], [self.dell.id])
+        self.assertEqual(response.context['length'], 1)
+
+    def test_search_holder(self):
+        """Checks that a computer can be found by its holder, and stops matching once it is revoked."""
+
+        join = EmployeeComputer.objects.create(computer=self.dell, employee=self.employee, date_assigned=self.now)
+
+        response = self.search("deborah")
+        self.assertEqual([c.id for c in response.context['results']], [self.dell.id])
+        self.assertIn("Deborah Smith".encode(), response.content)
+
+        join.date_revoked = self.now
+        join.save()
+        response = self.search("deborah")
+        self.assertTrue(response.context['no_results'])
+
+    def test_search_ranking(self):
+        """Checks that a match on the make ranks above a match on the holder's name."""
+
+        apple_fan = Employee.objects.create(first_name="Apple", last_name="Seed", start_date=self.now, is_supervisor=False, department=None)
+        EmployeeComputer.objects.create(computer=self.dell, employee=apple_fan, date_assigned=self.now)
+
+        response = self.search("apple")
+        self.assertEqual([c.id for c in response.context['results']], [self.macbook.id, self.dell.id])
+
+    def test_search_pages(self):
+        """Checks that a large result set reports its full count but loads one page at a time."""
+
+        Computer.objects.bulk_create([Computer(make="Lenovo", model=f"T{i}", serial_no=f"L{i}", purchase_date=self.now) for i in range(60)])
+        call_command("rebuild_derived", stdout=StringIO())
+
+        response = self.search("lenovo")
+        self.assertEqual(response.context['length'], 60)
+        self.assertEqual(len(response.context['results']), 50)
+
+        response = self.client.get(reverse('agileHR:computer_search'), {"search_text": "lenovo", "page": 2})
+        self.assertEqual(len(response.context['results']), 10)
+
+
+class ComputerAvailabilityTest(TestCase):
+    """Tests the availability flags behind the assignment forms.
+
+    Methods:
+        test_assign_revoke_retire
+        test_stale_save_keeps_flags
+        test_assignment_form_lists
+        test_list_rows_follow_assignments
+        test_deleted_assignment_frees_computer
+    """
+
+    def setUp(self):
+        self.now = datetime.datetime.now()
+        self.employee = Employee.objects.create(first_name="Deborah", last_name="Smith", start_date=self.now, is_supervisor=False, department=None)
+        self.waiting = Employee.objects.create(first_name="Rob", last_name="Boss", start_date=self.now, is_supervisor=False, department=None)
+        self.computer = Computer.objects.create(make="Apple", model="iMac", serial_no="A1", purchase_date=self.now)
+        self.spare = Computer.objects.create(make="Dell", model="XPS", serial_no="D1", purchase_date=self.now)
+
+    def test_assign_revoke_retire(self):
+        """Checks that assigning, revoking and retiring flip the flags."""
+
+        join = EmployeeComputer.objects.create(computer=self.computer, employee=self.employee, date_assigned=self.now)
+        self.assertFalse(Computer.objects.get(pk=self.computer.id).is_available)
+        self.assertTrue(Employee.objects.get(pk=self.employee.id).has_computer)
+
+        join.date_revoked = self.now
+        join.save()
+        self.assertTrue(Computer.objects.get(pk=self.computer.id).is_available)
+        self.assertFalse(Employee.objects.get(pk=self.employee.id).has_computer)
+
+        self.computer.retire_date = self.now
+        self.computer.save()
+        self.assertFalse(Computer.objects.get(pk=self.computer.id).is_available)
+
+    def test_stale_save_keeps_flags(self):
+        """Checks that saving an instance loaded before an assignment does not undo it."""
+
+        EmployeeComputer.objects.create(computer=self.computer, employee=self.employee, date_assigned=self.now)
+        self.computer.serial_no = "A2"
+        self.computer.save()
+
+        computer = Computer.objects.get(pk=self.computer.id)
+        self.assertEqual(computer.serial_no, "A2")
+        self.assertIsNotNone(computer.current_assignment)
+        self.assertFalse(computer.is_available)
+
+    def test_assignment_form_lists(self):
+        """Checks that only available computers and employees without one are offered."""
+
+        EmployeeComputer.objects.create(computer=self.computer, employee=self.employee, date_assigned=self.now)
+
+        response = self.client.get(reverse('agileHR:new_computer'))
+        self.assertEqual([e.id for e in response.context['employees']], [self.waiting.id])
+
+        response = self.client.get(reverse('agileHR:employee_edit', args=(self.waiting.id,)))
+        self.assertEqual([c.id for c in response.context['computers']], [self.spare.id])
+
+    def test_list_rows_follow_assignments(self):
+        """Checks that the cached computer rows pick up a new holder, a revoked assignment and a holder's new name."""
+
+        self.client.get(reverse('agileHR:computers'))
+        assign_computer(self.employee, self.computer, self.now)
+        response = self.client.get(reverse('agileHR:computers'))
+        self.assertIn(b"Deborah Smith", response.content)
+
+        self.employee.first_name = "Debbie"
+        self.employee.save()
+        response = self.client.get(reverse('agileHR:computers'))
+        self.assertIn(b"Debbie Smith", response.content)
+
+        assign_computer(self.employee, self.spare, self.now)
+        response = self.client.get(reverse('agileHR:computers'))
+        self.assertEqual(response.content.count(b"Debbie Smith"), 1)
+
+    def test_deleted_assignment_frees_computer(self):
+        """Checks that deleting an open assignment outright frees the computer, clears the holder's flag and search row, and moves the dashboard counters."""
+
+        join = assign_computer(self.employee, self.computer, self.now)
+        self.assertEqual(Tally.objects.get(name="assigned_computers").value, 1)
+
+        join.delete()
+
+        computer = Computer.objects.get(pk=self.computer.id)
+        self.assertIsNone(computer.current_assignment)
+        self.assertTrue(computer.is_available)
+        self.assertFalse(Employee.objects.get(pk=self.employee.id).has_computer)
+        response = self.client.post(reverse('agileHR:computer_search'), {"search_text": "smith"})
+        self.assertEqual(list(response.context['results']), [])
+        self.assertEqual(Tally.objects.get(name="assigned_computers").value, 0)
+        self.assertEqual(Tally.objects.get(name="idle_computers").value, 2)
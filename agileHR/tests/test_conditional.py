@@ -0,0 +1,144 @@
+import datetime
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from agileHR.models import *
+from ..assignments import assign_computer, revoke_assignments
+from ..enrollment import enroll, withdraw
+from ..stamps import employee_modified
+
+
+class ConditionalDetailTest(TestCase):
+    """Defines tests for the conditional GET support of the detail pages
+
+    Methods:
+        setUpTestData
+        revalidate
+        test_unchanged_page_is_not_rendered
+        test_assignments_change_both_pages
+        test_enrollments_change_both_pages
+        test_moving_employee_changes_old_department
+        test_reporting_line_changes_linked_pages
+        test_employee_stamp_reads_each_relation
+        test_training_page_changes_when_it_starts
+        test_missing_row
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.sales = Department.objects.create(name="sales", budget=1000)
+        cls.engineering = Department.objects.create(name="engineering", budget=2000)
+        cls.employee = Employee.objects.create(first_name="Ada", last_name="Lovelace", start_date=timezone.now(), is_supervisor=False, department=cls.sales)
+        cls.computer = Computer.objects.create(make="Apple", model="MacBook Pro", serial_no="A-1", purchase_date=timezone.now())
+        cls.training = Training.objects.create(title="Safety", start_date=timezone.now() + datetime.timedelta(days=1), end_date=timezone.now() + datetime.timedelta(days=2), max_attendees=5)
+
+    def revalidate(self, name, pk):
+        """Fetches a page, then asks again with its validators, returning the status of the second response"""
+
+        url = reverse(name, args=(pk,))
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        return lambda: self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"], HTTP_IF_MODIFIED_SINCE=first["Last-Modified"]).status_code
+
+    def test_unchanged_page_is_not_rendered(self):
+        """Test case verifies that a page that has not changed is answered with an empty 304 after a single query"""
+
+        url = reverse("agileHR:employee_detail", args=(self.employee.id,))
+        first = self.client.get(url)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=first["Last-Modified"]).status_code, 304)
+
+    def test_assignments_change_both_pages(self):
+        """Test case verifies that assigning and revoking a computer changes the employee and computer pages"""
+
+        employee_page = self.revalidate("agileHR:employee_detail", self.employee.id)
+        computer_page = self.revalidate("agileHR:computer_detail", self.computer.id)
+        assign_computer(self.employee, self.computer, timezone.now())
+        self.assertEqual((employee_page(), computer_page()), (200, 200))
+
+        employee_page = self.revalidate("agileHR:employee_detail", self.employee.id)
+        computer_page = self.revalidate("agileHR:computer_detail", self.computer.id)
+        revoke_assignments(EmployeeComputer.objects.filter(employee=self.employee), timezone.now())
+        self.assertEqual((employee_page(), computer_page()), (200, 200))
+
+    def test_enrollments_change_both_pages(self):
+        """Test case verifies that enrolling and withdrawing change the employee and training pages, and renaming an attendee changes the training page"""
+
+        employee_page = self.revalidate("agileHR:employee_detail", self.employee.id)
+        training_page = self.revalidate("agileHR:traindetail", self.training.id)
+        enroll(self.employee, [self.training])
+        self.assertEqual((employee_page(), training_page()), (200, 200))
+
+        training_page = self.revalidate("agileHR:traindetail", self.training.id)
+        self.employee.last_name = "King"
+        self.employee.save()
+        self.assertEqual(training_page(), 200)
+
+        employee_page = self.revalidate("agileHR:employee_detail", self.employee.id)
+        training_page = self.revalidate("agileHR:traindetail", self.training.id)
+        withdraw(EmployeeTraining.objects.filter(employee=self.employee))
+        self.assertEqual((employee_page(), training_page()), (200, 200))
+
+    def test_moving_employee_changes_old_department(self):
+        """Test case verifies that moving an employee changes the pages of the department they left and the one they joined"""
+
+        old_page = self.revalidate("agileHR:department_detail", self.sales.id)
+        new_page = self.revalidate("agileHR:department_detail", self.engineering.id)
+        self.employee.department = self.engineering
+        self.employee.save()
+        self.assertEqual((old_page(), new_page()), (200, 200))
+
+    def test_reporting_line_changes_linked_pages(self):
+        """Test case verifies that editing a direct report changes their manager's page but not the page of the manager above, editing a manager changes the pages of everyone under them, and moving a report changes the page of the manager they left"""
+
+        manager = Employee.objects.create(first_name="Grace", last_name="Hopper", start_date=timezone.now(), is_supervisor=True, department=self.sales)
+        lead = Employee.objects.create(first_name="Alan", last_name="Turing", start_date=timezone.now(), is_supervisor=True, department=self.sales, supervisor=manager)
+        self.employee.supervisor = lead
+        self.employee.save()
+
+        manager_page = self.revalidate("agileHR:employee_detail", manager.id)
+        lead_page = self.revalidate("agileHR:employee_detail", lead.id)
+        self.employee.first_name = "Augusta"
+        self.employee.save()
+        self.assertEqual((manager_page(), lead_page()), (304, 200))
+
+        employee_page = self.revalidate("agileHR:employee_detail", self.employee.id)
+        manager.last_name = "Murray Hopper"
+        manager.save()
+        self.assertEqual(employee_page(), 200)
+
+        lead_page = self.revalidate("agileHR:employee_detail", lead.id)
+        self.employee.supervisor = manager
+        self.employee.save()
+        self.assertEqual(lead_page(), 200)
+
+    def test_employee_stamp_reads_each_relation(self):
+        """Test case verifies that a manager's stamp is the newest of their own row and every related row, read in one query with a subquery per relation"""
+
+        reports = [Employee.objects.create(first_name=f"Report {number}", last_name="R", start_date=timezone.now(), is_supervisor=False, department=self.sales, supervisor=self.employee) for number in range(3)]
+        assign_computer(self.employee, self.computer, timezone.now())
+        enroll(self.employee, [self.training])
+        Employee.objects.filter(pk=reports[1].pk).update(updated_at=timezone.now() + datetime.timedelta(hours=1))
+
+        with self.assertNumQueries(1):
+            stamp = employee_modified(self.employee.id)
+        self.assertEqual(stamp, Employee.objects.get(pk=reports[1].pk).updated_at)
+        self.assertIsNone(employee_modified(999))
+
+    def test_training_page_changes_when_it_starts(self):
+        """Test case verifies that the training page counts the moment the training started as a modification, since it then stops offering edits"""
+
+        before = self.client.get(reverse("agileHR:traindetail", args=(self.training.id,)))
+        Training.objects.filter(pk=self.training.id).update(start_date=timezone.now() - datetime.timedelta(minutes=1), updated_at=timezone.now() - datetime.timedelta(days=1))
+        after = self.client.get(reverse("agileHR:traindetail", args=(self.training.id,)))
+        self.assertNotEqual(before["ETag"], after["ETag"])
+        self.assertEqual(self.client.get(reverse("agileHR:traindetail", args=(self.training.id,)), HTTP_IF_NONE_MATCH=after["ETag"]).status_code, 304)
+
+    def test_missing_row(self):
+        """Test case verifies that a missing row still gets the view's 404"""
+
+        self.assertEqual(self.client.get(reverse("agileHR:employee_detail", args=(999,))).status_code, 404)
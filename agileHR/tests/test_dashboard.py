@@ -0,0 +1,137 @@
+import io
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from agileHR.models import *
+from ..assignments import assign_computer, revoke_assignments
+from ..importer import import_csv
+from ..tallies import UNKEYED, adjust, rebuild_tallies
+
+
+class DashboardTest(TestCase):
+    """Defines tests for the dashboard and the Tally counters behind it
+
+    Methods:
+        setUp
+        counters
+        assertCountersMatchRebuild
+        test_index_shows_kpis
+        test_index_queries_do_not_grow
+        test_counters_follow_changes
+        test_counters_follow_deletes
+        test_import_adjusts_counters
+        test_future_end_dates_count_as_active
+        test_unkeyed_counters_are_seeded
+    """
+
+    def setUp(self):
+        self.now = timezone.now()
+        self.hr = Department.objects.create(name="hr", budget=1)
+        self.it = Department.objects.create(name="it", budget=1)
+        self.ann = Employee.objects.create(first_name="Ann", last_name="A", start_date=self.now, is_supervisor=False, department=self.hr)
+        self.bob = Employee.objects.create(first_name="Bob", last_name="B", start_date=self.now, is_supervisor=False, department=self.it)
+        self.cat = Employee.objects.create(first_name="Cat", last_name="C", start_date=self.now, end_date=self.now, is_supervisor=False, department=self.it)
+        self.laptop = Computer.objects.create(make="Apple", model="MacBook Pro", serial_no="A-1", purchase_date=self.now)
+        self.desktop = Computer.objects.create(make="Dell", model="XPS", serial_no="D-1", purchase_date=self.now)
+        self.old = Computer.objects.create(make="Dell", model="XPS", serial_no="D-0", purchase_date=self.now, retire_date=self.now)
+        assign_computer(self.ann, self.laptop, self.now)
+
+    def counters(self):
+        return {(tally.name, tally.department_id): tally.value for tally in Tally.objects.all()}
+
+    def assertCountersMatchRebuild(self):
+        maintained = {key: value for key, value in self.counters().items() if value}
+        rebuild_tallies()
+        self.assertEqual(maintained, {key: value for key, value in self.counters().items() if value})
+
+    def test_index_shows_kpis(self):
+        """Test case verifies that the landing page shows the headcounts, the employee and computer totals, and the fill rate of trainings starting soon"""
+
+        training = Training.objects.create(title="Safety", start_date=self.now + timezone.timedelta(days=2), end_date=self.now + timezone.timedelta(days=3), max_attendees=4)
+        Training.objects.create(title="Later", start_date=self.now + timezone.timedelta(days=90), end_date=self.now + timezone.timedelta(days=91), max_attendees=4)
+        EmployeeTraining.objects.create(employee=self.ann, training=training)
+
+        response = self.client.get(reverse("agileHR:index"))
+
+        self.assertEqual([(tally.department.name, tally.value) for tally in response.context["headcounts"]], [("it", 2), ("hr", 1)])
+        self.assertEqual(response.context["totals"], {"active_employees": 2, "terminated_employees": 1, "assigned_computers": 1, "idle_computers": 1, "retired_computers": 1})
+        self.assertEqual([(training.title, training.fill) for training in response.context["upcoming"]], [("Safety", 25)])
+        self.assertEqual(response.context["seats"], {"count": 1, "offered": 4, "taken": 1, "fill": 25})
+        self.assertIn(b"Largest Departments", response.content)
+
+    def test_index_queries_do_not_grow(self):
+        """Test case verifies that the landing page reads the same few rows however many employees there are"""
+
+        Employee.objects.bulk_create([Employee(first_name="E", last_name=str(number), start_date=self.now, is_supervisor=False, department=self.hr) for number in range(200)])
+        rebuild_tallies()
+
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse("agileHR:index"))
+        self.assertEqual(response.context["totals"]["active_employees"], 202)
+
+    def test_counters_follow_changes(self):
+        """Test case verifies that moving, terminating, assigning, revoking and retiring keep every counter equal to a recount"""
+
+        self.bob.department = self.hr
+        self.bob.end_date = self.now
+        self.bob.save()
+        assign_computer(self.bob, self.desktop, self.now)
+        revoke_assignments(EmployeeComputer.objects.filter(employee=self.ann), self.now)
+        self.desktop.retire_date = self.now
+        self.desktop.save()
+        self.old.retire_date = None
+        self.old.save()
+
+        self.assertEqual(self.counters()[("headcount", self.hr.id)], 2)
+        self.assertEqual(self.counters()[("idle_computers", None)], 2)
+        self.assertCountersMatchRebuild()
+
+    def test_counters_follow_deletes(self):
+        """Test case verifies that deleting employees, computers and departments keeps every counter equal to a recount, a deleted department's employees counting as without one"""
+
+        self.cat.delete()
+        self.desktop.delete()
+        self.it.delete()
+
+        self.assertEqual(self.counters()[("headcount", None)], 1)
+        self.assertCountersMatchRebuild()
+
+    def test_import_adjusts_counters(self):
+        """Test case verifies that imported departments, employees and computers are counted though they bypass save()"""
+
+        import_csv("departments", io.StringIO("name,budget\nops,5\n"))
+        import_csv("employees", io.StringIO("first_name,last_name,start_date,end_date,department\nDee,D,2024-01-01,,ops\nEve,E,2024-01-01,2024-06-01,ops\n"))
+        import_csv("computers", io.StringIO(f"make,model,serial_no,purchase_date,retire_date,employee_id\nLenovo,X1,L-1,2024-01-01,,{self.bob.id}\nLenovo,X1,L-2,2024-01-01,,\n"))
+
+        ops = Department.objects.get(name="ops")
+        self.assertEqual(self.counters()[("headcount", ops.id)], 2)
+        self.assertCountersMatchRebuild()
+
+    def test_future_end_dates_count_as_active(self):
+        """Test case verifies that an employee leaving on a future date counts as active on the dashboard, as in the employee list, and as terminated once the date has passed"""
+
+        self.bob.end_date = self.now + timezone.timedelta(days=30)
+        self.bob.save()
+
+        totals = self.client.get(reverse("agileHR:index")).context["totals"]
+        listed = {status: len(self.client.get(reverse("agileHR:employee"), {"status": status}).context["employee_list"]) for status in ("active", "terminated")}
+        self.assertEqual((totals["active_employees"], totals["terminated_employees"]), (2, 1))
+        self.assertEqual(listed, {"active": 2, "terminated": 1})
+
+        Employee.objects.filter(pk=self.bob.pk).update(end_date=self.now - timezone.timedelta(days=1))
+        totals = self.client.get(reverse("agileHR:index")).context["totals"]
+        self.assertEqual((totals["active_employees"], totals["terminated_employees"]), (1, 2))
+
+    def test_unkeyed_counters_are_seeded(self):
+        """Test case verifies that the counters without a department exist once each, before and after a rebuild, so adjust never inserts a duplicate NULL-department row"""
+
+        for _ in range(2):
+            adjust({key: 1 for key in UNKEYED})
+            rows = list(Tally.objects.filter(department=None).values_list("name", flat=True))
+            self.assertEqual(sorted(rows), sorted(name for name, _ in UNKEYED))
+            rebuild_tallies()
+
+        Tally.objects.all().delete()
+        adjust({("headcount", None): 3})
+        self.assertEqual(Tally.objects.get(name="headcount", department=None).value, 3)
+        self.assertEqual(Tally.objects.filter(department=None).count(), len(UNKEYED))
@@ -0,0 +1,118 @@
+import os
+import tempfile
+import threading
+import time
+from django.db import connection
+from django.db.utils import OperationalError
+from django.test import TestCase, TransactionTestCase
+from bangazon.db.sqlite3.base import DatabaseWrapper
+from bangazon.db.writer import WriteQueue
+from ..models import Department
+
+
+def file_database(directory, **options):
+    """A second connection wrapper using the project's database settings, pointed at a file in the given directory"""
+
+    settings_dict = dict(connection.settings_dict, NAME=os.path.join(directory, "bangazon.sqlite3"))
+    settings_dict["OPTIONS"] = dict(settings_dict["OPTIONS"], **options)
+    return DatabaseWrapper(settings_dict, alias="tuning")
+
+
+class DatabaseTuningTest(TestCase):
+    """Defines tests for the tuned SQLite backend
+
+    Methods:
+        test_connect_pragmas
+        test_immediate_transactions
+    """
+
+    def pragma(self, database, name):
+        with database.cursor() as cursor:
+            cursor.execute(f"PRAGMA {name}")
+            return cursor.fetchone()[0]
+
+    def test_connect_pragmas(self):
+        """Test case verifies that every new connection is switched to WAL with the configured synchronous, cache and busy settings"""
+
+        with tempfile.TemporaryDirectory() as directory:
+            database = file_database(directory, cache_size=-2048, busy_timeout=1234)
+            try:
+                self.assertEqual(self.pragma(database, "journal_mode"), "wal")
+                self.assertEqual(self.pragma(database, "synchronous"), 1)
+                self.assertEqual(self.pragma(database, "cache_size"), -2048)
+                self.assertEqual(self.pragma(database, "busy_timeout"), 1234)
+            finally:
+                database.close()
+
+    def test_immediate_transactions(self):
+        """Test case verifies that a transaction holds the write lock from its first statement, so a second writer waits rather than failing midway"""
+
+        with tempfile.TemporaryDirectory() as directory:
+            first = file_database(directory, busy_timeout=0)
+            second = file_database(directory, busy_timeout=0)
+            try:
+                with first.cursor() as cursor:
+                    cursor.execute("CREATE TABLE counter (value integer)")
+                first.set_autocommit(False, force_begin_transaction_with_broken_autocommit=True)
+                with first.cursor() as cursor:
+                    cursor.execute("SELECT count(*) FROM counter")
+
+                with self.assertRaises(OperationalError):
+                    second.set_autocommit(False, force_begin_transaction_with_broken_autocommit=True)
+                first.rollback()
+            finally:
+                first.close()
+                second.close()
+
+
+class WriteQueueTest(TransactionTestCase):
+    """Defines tests for the single-writer queue
+
+    Methods:
+        test_group_commit
+    """
+
+    def test_group_commit(self):
+        """Test case verifies that writes queued while the writer is busy commit together, that each caller gets its own result, and that a failing write rolls back alone"""
+
+        writes = WriteQueue()
+        started = threading.Event()
+
+        def slow_write():
+            started.set()
+            time.sleep(0.1)
+            return Department.objects.create(name="first", budget=1).name
+
+        def failing_write():
+            Department.objects.create(name="failing", budget=1)
+            raise ValueError("rejected")
+
+        results = {}
+
+        def submit(name, function, *args, **kwargs):
+            try:
+                results[name] = writes.submit(function, *args, **kwargs)
+            except ValueError as exc:
+                results[name] = exc
+
+        try:
+            first = threading.Thread(target=submit, args=("first", slow_write))
+            first.start()
+            started.wait()
+            # queued while the first write holds the writer, so they share the next transaction
+            others = [threading.Thread(target=submit, args=(f"dept{i}", lambda i=i: Department.objects.create(name=f"dept{i}", budget=i).budget)) for i in range(8)]
+            others.append(threading.Thread(target=submit, args=("failing", failing_write)))
+            for thread in others:
+                thread.start()
+            for thread in [first] + others:
+                thread.join()
+        finally:
+            writes.stop()
+
+        self.assertEqual(results["first"], "first")
+        self.assertEqual([results[f"dept{i}"] for i in range(8)], list(range(8)))
+        self.assertIsInstance(results["failing"], ValueError)
+        self.assertEqual(Department.objects.count(), 9)
+        self.assertFalse(Department.objects.filter(name="failing").exists())
+        self.assertEqual(writes.jobs_committed, 10)
+        self.assertLess(writes.batches, 10)
@@ -123,4 +123,56 @@ class DepartmentPostTest(TestCase):
         # Get 200 from request to verify that when a POST operation is performed to the corresponding URL, then a successful HttpRedirect response is received (200)
         # NOTE: Some machines process quickly enough to capture the 302 response from the post
         post_response = self.client.post(reverse("agileHR:departmentadd"), {"name":"Bacon Chef Department", "budget":50000})
-        self.assertEqual(post_response.status_code, 200)
\ No newline at end of file
+        self.assertEqual(post_response.status_code, 200)
+
+
+class DepartmentSizeTest(TestCase):
+    """Defines tests for the headcount, sorting and paging of the Department list view
+
+    Methods:
+        test_department_size
+        test_department_sort_by_size
+        test_department_pagination
+    """
+
+    def test_department_size(self):
+        """Test case verifies that each department carries its headcount and budget per head from the list query"""
+
+        dept = Department.objects.create(name="Accounting", budget=1000)
+        Department.objects.create(name="Empty", budget=500)
+        for name in ["Rob", "Dave"]:
+            Employee.objects.create(first_name=name, last_name="Boss", start_date="2016-03-07 05:53:53", is_supervisor=0, department=dept)
+
+        response = self.client.get(reverse('agileHR:department'))
+        departments = {d.name: d for d in response.context['departments']}
+
+        self.assertEqual(departments["Accounting"].size, 2)
+        self.assertEqual(departments["Accounting"].per_head, 500)
+        self.assertEqual(departments["Empty"].size, 0)
+        self.assertIsNone(departments["Empty"].per_head)
+        self.assertIn("Size: 2".encode(), response.content)
+
+    def test_department_sort_by_size(self):
+        """Test case verifies that sorting by size lists the largest department first"""
+
+        small = Department.objects.create(name="Small", budget=1000)
+        large = Department.objects.create(name="Large", budget=10)
+        Employee.objects.create(first_name="Rob", last_name="Boss", start_date="2016-03-07 05:53:53", is_supervisor=0, department=large)
+
+        response = self.client.get(reverse('agileHR:department'), {"sort": "size"})
+        self.assertEqual([d.name for d in response.context['departments']], ["Large", "Small"])
+
+        response = self.client.get(reverse('agileHR:department'), {"sort": "budget", "dir": "asc"})
+        self.assertEqual([d.name for d in response.context['departments']], ["Large", "Small"])
+
+    def test_department_pagination(self):
+        """Test case verifies that the department list is split into pages"""
+
+        Department.objects.bulk_create([Department(name=f"Dept {i:03}", budget=i) for i in range(60)])
+
+        response = self.client.get(reverse('agileHR:department'))
+        self.assertEqual(len(response.context['departments']), 50)
+
+        response = self.client.get(reverse('agileHR:department'), {"page": 2})
+        self.assertEqual(len(response.context['departments']), 10)
+        self.assertIn("Page 2 of 2".encode(), response.content)
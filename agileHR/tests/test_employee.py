@@ -4,6 +4,7 @@ from datetime import timedelta
 from django.test import TestCase
 from django.urls import reverse
 from ..models import *
+from ..pagination import encode_cursor
 
 
 class EmployeeTest(TestCase):
@@ -239,4 +240,176 @@ class EmployeeEditTest(TestCase):
         response = self.client.post(reverse("agileHR:employee_edit", args=(1,)), {"first_name": "Debbie", "last_name": "Smith", "department": 1, "is_supervisor": True, "start_date": now, "delete": 1, "trainings": 2, "computer": 1})
 
         #Test that status code comes back as either 302 or 200 after post
-        self.assertIn(response.status_code, [302, 200])
\ No newline at end of file
+        self.assertIn(response.status_code, [302, 200])
+
+
+class EmployeePaginationTest(TestCase):
+    """Defines tests for seek pagination and filtering of the Employee list view
+
+    Methods:
+        test_employee_pages
+        test_employee_filters
+        test_employee_list_queries
+        test_tampered_cursors
+    """
+
+    def setUp(self):
+        now = datetime.datetime.now()
+        self.accounting = Department.objects.create(name="Accounting", budget=1000)
+        self.sales = Department.objects.create(name="Sales", budget=1000)
+        for i in range(120):
+            Employee.objects.create(
+                first_name = f"First{i}",
+                last_name = f"Smith{i % 60:02}",
+                start_date = now,
+                end_date = now - timedelta(days=1) if i % 4 == 0 else None,
+                is_supervisor = False,
+                department = self.accounting if i % 2 else self.sales
+            )
+
+    def test_employee_pages(self):
+        """Tests that following next and previous cursors visits every employee once, in last name then id order"""
+
+        seen = []
+        response = self.client.get(reverse('agileHR:employee'))
+        while True:
+            page = response.context['page']
+            seen.extend(employee.id for employee in page)
+            if not page.has_next():
+                break
+            response = self.client.get(reverse('agileHR:employee'), {"after": page.next_cursor})
+
+        expected = list(Employee.objects.order_by("last_name", "id").values_list("id", flat=True))
+        self.assertEqual(seen, expected)
+
+        previous = self.client.get(reverse('agileHR:employee'), {"before": response.context['page'].previous_cursor})
+        self.assertEqual([employee.id for employee in previous.context['page']], expected[50:100])
+
+    def test_employee_filters(self):
+        """Tests that the department and status filters narrow the list"""
+
+        response = self.client.get(reverse('agileHR:employee'), {"department": self.accounting.id})
+        self.assertTrue(all(e.department_id == self.accounting.id for e in response.context['employee_list']))
+
+        response = self.client.get(reverse('agileHR:employee'), {"status": "terminated"})
+        self.assertEqual(len(response.context['employee_list']), 30)
+        self.assertFalse(response.context['page'].has_next())
+
+    def test_employee_list_queries(self):
+        """Tests that departments are joined in rather than looked up once per employee"""
+
+        with self.assertNumQueries(2):
+            self.client.get(reverse('agileHR:employee'))
+
+    def test_tampered_cursors(self):
+        """Tests that a cursor with the wrong types, nulls or the wrong length is ignored and the first page served"""
+
+        first = [employee.id for employee in self.client.get(reverse('agileHR:employee')).context['page']]
+        for values in (["a", "b"], [None, None], ["Smith01", 1.5e300], [["x"], {"y": 1}], ["Smith01"]):
+            for direction in ("after", "before"):
+                response = self.client.get(reverse('agileHR:employee'), {direction: encode_cursor(values)})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual([employee.id for employee in response.context['page']], first)
+
+
+class EmployeeEditWriteTest(TestCase):
+    """Defines tests for the batched write path of the Employee Edit view
+
+    Methods:
+        test_employee_edit_applies_changes
+        test_employee_edit_rolls_back
+        test_employee_save_reads_its_row_once
+    """
+
+    def setUp(self):
+        now = datetime.datetime.now()
+        tomorrow = now + timedelta(days=1)
+        self.department = Department.objects.create(name="Accounting", budget=1000)
+        self.employee = Employee.objects.create(first_name="Deborah", last_name="Smith", start_date=now, is_supervisor=False, department=self.department)
+        self.old_computer = Computer.objects.create(make="Apple", model="iMac", purchase_date=now, serial_no="A1")
+        self.new_computer = Computer.objects.create(make="Dell", model="XPS", purchase_date=now, serial_no="D1")
+        EmployeeComputer.objects.create(computer=self.old_computer, employee=self.employee, date_assigned=now)
+        # one a day, since one-day trainings on the same date clash
+        self.trainings = [Training.objects.create(title=f"Training {i}", start_date=tomorrow + timedelta(days=i), end_date=tomorrow + timedelta(days=i), max_attendees=30) for i in range(30)]
+        self.enrollments = [EmployeeTraining.objects.create(employee=self.employee, training=training) for training in self.trainings[:10]]
+
+    def post(self, **changes):
+        data = {"first_name": "Debbie", "last_name": "Smith", "department": self.department.id, "start_date": "2019-01-01", "end_date": "", "computer": "select"}
+        data.update(changes)
+        return self.client.post(reverse("agileHR:employee_edit", args=(self.employee.id,)), data)
+
+    def test_employee_edit_applies_changes(self):
+        """Tests that one submit swaps the computer, drops and adds trainings, and updates the employee"""
+
+        response = self.post(
+            computer=self.new_computer.id,
+            delete=[e.id for e in self.enrollments[:5]],
+            trainings=[t.id for t in self.trainings[5:30]]
+        )
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Employee.objects.get(pk=self.employee.id).first_name, "Debbie")
+        self.assertEqual(Computer.objects.get(pk=self.new_computer.id).current_assignment.employee_id, self.employee.id)
+        self.assertTrue(Computer.objects.get(pk=self.old_computer.id).is_available)
+        self.assertEqual(
+            sorted(EmployeeTraining.objects.filter(employee=self.employee).values_list("training_id", flat=True)),
+            [t.id for t in self.trainings[5:30]]
+        )
+
+    def test_employee_edit_rolls_back(self):
+        """Tests that a submit naming a computer that is not available changes nothing"""
+
+        response = self.post(computer=self.old_computer.id, delete=[e.id for e in self.enrollments])
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(EmployeeTraining.objects.filter(employee=self.employee).count(), 10)
+
+    def test_employee_save_reads_its_row_once(self):
+        """Tests that a rename reads the stored employee once for every receiver comparing against it: the read, the UPDATE, and the three statements re-indexing the computer the employee holds, whose search row carries their name"""
+
+        employee = Employee.objects.get(pk=self.employee.id)
+        employee.first_name = "Debbie"
+        with self.assertNumQueries(5):
+            employee.save()
+
+
+class EmployeeFragmentCacheTest(TestCase):
+    """Defines tests for the cached rows of the Employee list view
+
+    Methods:
+        test_row_fragments_follow_their_employee
+        test_department_rename_reaches_rows
+    """
+
+    def setUp(self):
+        now = datetime.datetime.now()
+        self.department = Department.objects.create(name="Accounting", budget=1000)
+        self.ada = Employee.objects.create(first_name="Ada", last_name="Abbott", start_date=now, is_supervisor=False, department=self.department)
+        self.ben = Employee.objects.create(first_name="Ben", last_name="Baker", start_date=now, is_supervisor=False, department=self.department)
+
+    def test_row_fragments_follow_their_employee(self):
+        """Tests that saving one employee rebuilds only that employee's row, while a write that skips the signals keeps being served from cache"""
+
+        self.client.get(reverse('agileHR:employee'))
+
+        # an UPDATE sends no post_save, so nothing tells the cache about it
+        Employee.objects.filter(pk=self.ben.id).update(first_name="Bernard")
+        response = self.client.get(reverse('agileHR:employee'))
+        self.assertIn(b"Baker, Ben", response.content)
+
+        self.ada.first_name = "Adaline"
+        self.ada.save()
+        response = self.client.get(reverse('agileHR:employee'))
+        self.assertIn(b"Abbott, Adaline", response.content)
+        self.assertIn(b"Baker, Ben", response.content)
+
+    def test_department_rename_reaches_rows(self):
+        """Tests that renaming a department rebuilds the rows of its employees"""
+
+        self.client.get(reverse('agileHR:employee'))
+        self.department.name = "Finance"
+        self.department.save()
+
+        response = self.client.get(reverse('agileHR:employee'))
+        self.assertIn(b"Department: Finance", response.content)
+        self.assertNotIn(b"Department: Accounting", response.content)
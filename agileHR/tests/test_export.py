@@ -0,0 +1,74 @@
+import csv
+import io
+import json
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from agileHR.models import *
+from ..exports import EXPORTS
+from ..importer import import_csv
+
+
+class ExportTest(TestCase):
+    """Defines tests for the streaming exports
+
+    Methods:
+        setUpTestData
+        test_csv_export
+        test_json_export
+        test_rows_come_from_chunked_reads
+        test_unknown_export
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        department = Department.objects.create(name="engineering", budget=100000)
+        cls.employee = Employee.objects.create(first_name="Ada", last_name="Lovelace", start_date=timezone.now(), is_supervisor=True, department=department)
+        Employee.objects.create(first_name="Grace", last_name="Hopper", start_date=timezone.now(), is_supervisor=False)
+        computer = Computer.objects.create(make="Apple", model="MacBook Pro", serial_no="A-1", purchase_date=timezone.now())
+        EmployeeComputer.objects.create(employee=cls.employee, computer=computer, date_assigned=timezone.now(), date_revoked=timezone.now())
+        EmployeeComputer.objects.create(employee=cls.employee, computer=computer, date_assigned=timezone.now())
+
+    def test_csv_export(self):
+        """Test case verifies that the roster streams as a CSV attachment, with department names joined in, that the importer can read back"""
+
+        response = self.client.get(reverse("agileHR:export", args=("employees", "csv")))
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        self.assertIn('attachment; filename="employees-', response["Content-Disposition"])
+        text = b"".join(response.streaming_content).decode()
+        rows = list(csv.DictReader(io.StringIO(text)))
+        self.assertEqual([row["last_name"] for row in rows], ["Lovelace", "Hopper"])
+        self.assertEqual(rows[0]["department"], "engineering")
+        self.assertEqual(rows[1]["department"], "")
+
+        self.assertEqual(import_csv("employees", io.StringIO(text)).created, 2)
+        self.assertEqual(Employee.objects.filter(last_name="Lovelace", department__name="engineering", is_supervisor=True).count(), 2)
+
+    def test_json_export(self):
+        """Test case verifies that the assignment history streams as a JSON array, revoked assignments included"""
+
+        response = self.client.get(reverse("agileHR:export", args=("assignments", "json")))
+
+        rows = json.loads(b"".join(response.streaming_content))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0]["serial_no"], "A-1")
+        self.assertIsNotNone(rows[0]["date_revoked"])
+        self.assertIsNone(rows[1]["date_revoked"])
+
+        empty = self.client.get(reverse("agileHR:export", args=("enrollments", "json")))
+        self.assertEqual(json.loads(b"".join(empty.streaming_content)), [])
+
+    def test_rows_come_from_chunked_reads(self):
+        """Test case verifies that an export reads its rows in one query, however small the chunks"""
+
+        with self.assertNumQueries(1):
+            rows = list(EXPORTS["employees"].rows(chunk_size=1))
+        self.assertEqual(len(rows), 2)
+
+    def test_unknown_export(self):
+        """Test case verifies that unknown datasets and formats are not found"""
+
+        self.assertEqual(self.client.get(reverse("agileHR:export", args=("computers", "csv"))).status_code, 404)
+        self.assertEqual(self.client.get(reverse("agileHR:export", args=("employees", "xml"))).status_code, 404)
@@ -0,0 +1,136 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from agileHR.models import *
+from ..hierarchy import HierarchyCycle, chain_of_command, headcounts, rebuild_hierarchy, reports_under
+
+
+class HierarchyTest(TestCase):
+    """Defines tests for the supervisor hierarchy and its ReportingLine closure
+
+    Methods:
+        setUp
+        hire
+        lines
+        test_subtree_and_chain
+        test_headcounts
+        test_move_subtree
+        test_cycle_refused
+        test_delete_detaches_reports
+        test_rebuild_matches_signals
+        test_deep_chain_is_one_query
+        test_employee_edit_moves_and_refuses_cycle
+        test_detail_shows_hierarchy
+    """
+
+    def setUp(self):
+        self.department = Department.objects.create(name="HR", budget=1)
+        # ceo <- vp <- manager <- (alice, bob); ceo <- cfo
+        self.ceo = self.hire("Ceo")
+        self.vp = self.hire("Vp", self.ceo)
+        self.cfo = self.hire("Cfo", self.ceo)
+        self.manager = self.hire("Manager", self.vp)
+        self.alice = self.hire("Alice", self.manager)
+        self.bob = self.hire("Bob", self.manager)
+
+    def hire(self, name, supervisor=None):
+        return Employee.objects.create(first_name=name, last_name="Smith", start_date=timezone.now(), is_supervisor=True, department=self.department, supervisor=supervisor)
+
+    def lines(self):
+        return set(ReportingLine.objects.values_list("ancestor_id", "descendant_id", "depth"))
+
+    def test_subtree_and_chain(self):
+        """Test case verifies that reports are found at any depth, nearest first, and that a chain of command runs up to the top"""
+
+        self.assertEqual(list(reports_under(self.vp.id)), [self.manager, self.alice, self.bob])
+        self.assertEqual(list(reports_under(self.ceo.id, max_depth=1)), [self.vp, self.cfo])
+        self.assertEqual(list(chain_of_command(self.alice.id)), [self.manager, self.vp, self.ceo])
+        self.assertEqual(list(chain_of_command(self.ceo.id)), [])
+
+    def test_headcounts(self):
+        """Test case verifies headcounts at every level, including employees without reports"""
+
+        self.assertEqual(headcounts([self.ceo.id, self.vp.id, self.manager.id, self.alice.id]), {self.ceo.id: 5, self.vp.id: 3, self.manager.id: 2, self.alice.id: 0})
+
+    def test_move_subtree(self):
+        """Test case verifies that changing a manager's supervisor carries their reports along and leaves the closure as a rebuild would write it"""
+
+        self.manager.supervisor = self.cfo
+        self.manager.save()
+
+        self.assertEqual(list(chain_of_command(self.alice.id)), [self.manager, self.cfo, self.ceo])
+        self.assertEqual(headcounts([self.vp.id, self.cfo.id]), {self.vp.id: 0, self.cfo.id: 3})
+
+        moved = self.lines()
+        rebuild_hierarchy()
+        self.assertEqual(self.lines(), moved)
+
+        self.manager.supervisor = None
+        self.manager.save()
+        self.assertEqual(list(chain_of_command(self.bob.id)), [self.manager])
+        self.assertEqual(headcounts([self.ceo.id]), {self.ceo.id: 2})
+
+    def test_cycle_refused(self):
+        """Test case verifies that nobody can report to themselves or to anyone under them"""
+
+        self.vp.supervisor = self.alice
+        with self.assertRaises(HierarchyCycle):
+            self.vp.save()
+        self.vp.supervisor = self.vp
+        with self.assertRaises(HierarchyCycle):
+            self.vp.save()
+        self.assertEqual(Employee.objects.get(pk=self.vp.id).supervisor_id, self.ceo.id)
+
+    def test_delete_detaches_reports(self):
+        """Test case verifies that deleting a manager leaves their reports at the top of their own subtree"""
+
+        self.vp.delete()
+
+        self.assertIsNone(Employee.objects.get(pk=self.manager.id).supervisor_id)
+        self.assertEqual(list(chain_of_command(self.alice.id)), [self.manager])
+        self.assertEqual(headcounts([self.ceo.id]), {self.ceo.id: 1})
+
+    def test_rebuild_matches_signals(self):
+        """Test case verifies that rebuilding from Employee.supervisor writes the lines the signals maintained"""
+
+        maintained = self.lines()
+        self.assertEqual(rebuild_hierarchy(), len(maintained))
+        self.assertEqual(self.lines(), maintained)
+
+    def test_deep_chain_is_one_query(self):
+        """Test case verifies that a twelve level chain of command, its subtree and headcount each take one query"""
+
+        top = bottom = self.hire("Level0")
+        for level in range(1, 12):
+            bottom = self.hire(f"Level{level}", bottom)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(len(list(chain_of_command(bottom.id))), 11)
+            self.assertEqual(len(list(reports_under(top.id))), 11)
+            self.assertEqual(headcounts([top.id]), {top.id: 11})
+        self.assertEqual(len(queries), 3)
+
+    def test_employee_edit_moves_and_refuses_cycle(self):
+        """Test case verifies that the edit form changes an employee's supervisor and refuses one that reports to them"""
+
+        form = {"first_name": "Vp", "last_name": "Smith", "department": self.department.id, "start_date": "2016-03-07", "end_date": "", "is_supervisor": "on", "computer": "select"}
+
+        response = self.client.post(reverse("agileHR:employee_edit", args=(self.vp.id,)), dict(form, supervisor=self.alice.id))
+        self.assertIn(b"No changes were saved", response.content)
+        self.assertEqual(Employee.objects.get(pk=self.vp.id).supervisor_id, self.ceo.id)
+
+        response = self.client.post(reverse("agileHR:employee_edit", args=(self.vp.id,)), dict(form, supervisor=self.cfo.id))
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(list(chain_of_command(self.alice.id)), [self.manager, self.vp, self.cfo, self.ceo])
+
+    def test_detail_shows_hierarchy(self):
+        """Test case verifies that the detail page shows the chain of command, the team size and the direct reports"""
+
+        response = self.client.get(reverse("agileHR:employee_detail", args=(self.manager.id,)))
+
+        self.assertEqual(response.context["employee"].headcount, 2)
+        self.assertIn(b"Team Size: 2", response.content)
+        self.assertIn(b"Alice Smith", response.content)
+        self.assertIn(b"Vp Smith", response.content)
@@ -0,0 +1,107 @@
+import datetime
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from agileHR.models import *
+from ..history import computers_held, holders, period
+
+
+class AssignmentHistoryTest(TestCase):
+    """Defines tests for the as-of queries over the computer assignment history
+
+    Methods:
+        setUpTestData
+        day
+        test_holder_at_a_moment
+        test_holders_on_a_day
+        test_computers_held_during_period
+        test_period_parsing
+        test_lookups_seek_the_history_indexes
+        test_holders_view
+        test_employee_computers_view
+        test_api_filters
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.start = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0) - datetime.timedelta(days=30)
+        department = Department.objects.create(name="IT", budget=1)
+        cls.ada = Employee.objects.create(first_name="Ada", last_name="Lovelace", start_date=cls.start, is_supervisor=False, department=department)
+        cls.grace = Employee.objects.create(first_name="Grace", last_name="Hopper", start_date=cls.start, is_supervisor=False, department=department)
+        cls.laptop = Computer.objects.create(make="Apple", model="MacBook Pro", serial_no="A-1", purchase_date=cls.start)
+        cls.desktop = Computer.objects.create(make="Dell", model="Optiplex", serial_no="D-1", purchase_date=cls.start)
+        # laptop: Ada days 0-10 noon, Grace day 10 noon onwards; desktop: Ada from day 12
+        cls.first = EmployeeComputer.objects.create(employee=cls.ada, computer=cls.laptop, date_assigned=cls.day(0), date_revoked=cls.day(10, 12))
+        cls.second = EmployeeComputer.objects.create(employee=cls.grace, computer=cls.laptop, date_assigned=cls.day(10, 12))
+        cls.third = EmployeeComputer.objects.create(employee=cls.ada, computer=cls.desktop, date_assigned=cls.day(12))
+
+    @classmethod
+    def day(cls, days, hours=0):
+        return cls.start + datetime.timedelta(days=days, hours=hours)
+
+    def test_holder_at_a_moment(self):
+        """Test case verifies that a moment finds the one holder then, the handover moment belonging to the new holder"""
+
+        self.assertEqual(list(holders(self.laptop.id, self.day(5))), [self.first])
+        self.assertEqual(list(holders(self.laptop.id, self.day(10, 12))), [self.second])
+        self.assertEqual(list(holders(self.desktop.id, self.day(5))), [])
+
+    def test_holders_on_a_day(self):
+        """Test case verifies that a whole day finds both sides of a handover made that day"""
+
+        self.assertEqual(list(holders(self.laptop.id, self.day(10), self.day(11))), [self.first, self.second])
+        self.assertEqual(list(holders(self.laptop.id, self.day(11), self.day(12))), [self.second])
+
+    def test_computers_held_during_period(self):
+        """Test case verifies that a period finds every assignment sharing time with it, open ended ones included"""
+
+        self.assertEqual(list(computers_held(self.ada.id, self.day(1), self.day(3))), [self.first])
+        self.assertEqual(list(computers_held(self.ada.id, self.day(9), self.day(20))), [self.first, self.third])
+        self.assertEqual(list(computers_held(self.ada.id, self.day(11), self.day(12))), [])
+        self.assertEqual(list(computers_held(self.ada.id)), [self.first, self.third])
+
+    def test_period_parsing(self):
+        """Test case verifies that a date reads as its whole day and a date and time as one moment"""
+
+        start, end = period("2024-03-01")
+        self.assertEqual(end - start, datetime.timedelta(days=1))
+        self.assertIsNone(period("2024-03-01T09:30")[1])
+        with self.assertRaises(ValueError):
+            period("yesterday")
+
+    def test_lookups_seek_the_history_indexes(self):
+        """Test case verifies that both lookups search an index on the assignment table instead of scanning it"""
+
+        for queryset in (holders(self.laptop.id, self.day(5)), computers_held(self.ada.id, self.day(1), self.day(3))):
+            plan = queryset.explain()
+            self.assertIn("USING INDEX", plan)
+            self.assertNotIn("SCAN agileHR_employeecomputer", plan)
+
+    def test_holders_view(self):
+        """Test case verifies that the holders page names who held the computer on the day asked for, and reports unreadable dates"""
+
+        response = self.client.get(reverse("agileHR:computer_holders", args=(self.laptop.id,)), {"on": str(self.day(10).date())})
+        self.assertEqual(list(response.context["assignments"]), [self.first, self.second])
+        self.assertIn(b"Grace Hopper", response.content)
+
+        response = self.client.get(reverse("agileHR:computer_holders", args=(self.laptop.id,)), {"on": "soon"})
+        self.assertIn(b"is not a date", response.content)
+
+    def test_employee_computers_view(self):
+        """Test case verifies that the period on the employee page includes its last day"""
+
+        response = self.client.get(reverse("agileHR:employee_computers", args=(self.ada.id,)), {"from": str(self.day(11).date()), "to": str(self.day(12).date())})
+        self.assertEqual(list(response.context["assignments"]), [self.third])
+        self.assertIn(b"Optiplex", response.content)
+
+    def test_api_filters(self):
+        """Test case verifies the as-of filters on the assignments resource"""
+
+        response = self.client.get(reverse("agileHR:api_list", args=("assignments",)), {"computer": self.laptop.id, "at": self.day(5).isoformat(), "include": "employee"})
+        self.assertEqual([row["employee"]["first_name"] for row in response.json()["data"]], ["Ada"])
+
+        response = self.client.get(reverse("agileHR:api_list", args=("assignments",)), {"employee": self.ada.id, "from": str(self.day(11).date())})
+        self.assertEqual([row["id"] for row in response.json()["data"]], [self.third.id])
+
+        response = self.client.get(reverse("agileHR:api_list", args=("assignments",)), {"at": "whenever"})
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,129 @@
+import io
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from agileHR.models import *
+from ..importer import import_csv
+
+
+class ImportTest(TestCase):
+    """Defines tests for the CSV importer and its upload page
+
+    Methods:
+        setUpTestData
+        test_import_employees
+        test_import_computers_with_holders
+        test_missing_columns
+        test_upload
+        test_upload_in_another_encoding
+        test_unreadable_rows
+        test_deleted_ids_are_not_reused
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = Department.objects.create(name="engineering", budget=100000)
+        cls.employee = Employee.objects.create(first_name="Ada", last_name="Lovelace", start_date=timezone.now(), is_supervisor=False, department=cls.department)
+
+    def test_import_employees(self):
+        """Test case verifies that valid rows are inserted across chunks, department names resolve without case, and bad rows are reported by line"""
+
+        lines = io.StringIO(
+            "first_name,last_name,start_date,is_supervisor,department\n"
+            "Grace,Hopper,2019-01-07,yes,Engineering\n"
+            "Alan,Turing,not a date,no,engineering\n"
+            "Edsger,Dijkstra,2019-02-01,,\n"
+            "Barbara,Liskov,2019-03-01,no,sales\n"
+            "Ken,Thompson,2019-04-01T09:30:00,false,ENGINEERING\n"
+        )
+        report = import_csv("employees", lines, chunk_size=2)
+
+        self.assertEqual(report.created, 3)
+        self.assertEqual(report.failed, 2)
+        self.assertEqual(report.errors, [(3, "start_date must be a date (YYYY-MM-DD), not 'not a date'"), (5, "unknown department 'sales'")])
+        grace = Employee.objects.get(last_name="Hopper")
+        self.assertTrue(grace.is_supervisor)
+        self.assertEqual(grace.department, self.department)
+        self.assertIsNone(Employee.objects.get(last_name="Dijkstra").department)
+        self.assertEqual(Employee.objects.filter(department=self.department).count(), 3)
+
+    def test_import_computers_with_holders(self):
+        """Test case verifies that an employee_id column opens an assignment and fills in the fields the signals would maintain"""
+
+        lines = io.StringIO(
+            "make,model,serial_no,purchase_date,employee_id\n"
+            f"Apple,MacBook Pro,A-1,2019-01-01,{self.employee.id}\n"
+            f"Dell,XPS 13,D-1,2019-01-01,{self.employee.id}\n"
+            "Dell,XPS 15,D-2,2019-01-01,\n"
+            "Lenovo,ThinkPad,L-1,2019-01-01,999999\n"
+        )
+        report = import_csv("computers", lines)
+
+        self.assertEqual(report.created, 2)
+        self.assertEqual([line for line, _ in report.errors], [3, 5])
+        assigned = Computer.objects.get(serial_no="A-1")
+        self.assertEqual(assigned.current_assignment.employee, self.employee)
+        self.assertFalse(assigned.is_available)
+        self.assertTrue(Computer.objects.get(serial_no="D-2").is_available)
+        self.assertTrue(Employee.objects.get(pk=self.employee.id).has_computer)
+
+        response = self.client.post(reverse("agileHR:computer_search"), {"search_text": "lovelace"})
+        self.assertContains(response, "MacBook Pro")
+
+    def test_missing_columns(self):
+        """Test case verifies that a file without a required column is rejected before any row is read"""
+
+        report = import_csv("departments", io.StringIO("name\nsales\n"))
+
+        self.assertEqual(report.created, 0)
+        self.assertEqual(report.errors, [(1, "missing column: budget")])
+        self.assertFalse(Department.objects.filter(name="sales").exists())
+
+    def test_upload(self):
+        """Test case verifies that an uploaded file is imported and the rejected rows are listed on the page"""
+
+        upload = SimpleUploadedFile("trainings.csv", b"\xef\xbb\xbftitle,start_date,end_date,max_attendees\nSafety,2030-01-01,2030-01-02,20\nBackwards,2030-01-02,2030-01-01,20\n", content_type="text/csv")
+        response = self.client.post(reverse("agileHR:import_data"), {"kind": "trainings", "csv_file": upload})
+
+        self.assertContains(response, "Imported 1 trainings; 1 row rejected.")
+        self.assertContains(response, "end_date is before start_date")
+        self.assertTrue(Training.objects.filter(title="Safety").exists())
+
+    def test_upload_in_another_encoding(self):
+        """Test case verifies that lines of a Windows-1252 upload that are not UTF-8 are rejected on their own, the rows around them still imported"""
+
+        upload = SimpleUploadedFile("departments.csv", "name,budget\nsales,10\nréception,20\nsupport,30\n".encode("cp1252"), content_type="text/csv")
+        response = self.client.post(reverse("agileHR:import_data"), {"kind": "departments", "csv_file": upload})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["report"].errors, [(3, "the row is not UTF-8 text; save the file as CSV UTF-8")])
+        self.assertEqual(set(Department.objects.filter(name__in=["sales", "support"]).values_list("name", flat=True)), {"sales", "support"})
+
+        upload = SimpleUploadedFile("departments.csv", "näme,budget\nlegal,10\n".encode("cp1252"), content_type="text/csv")
+        response = self.client.post(reverse("agileHR:import_data"), {"kind": "departments", "csv_file": upload})
+        self.assertEqual(response.context["report"].errors, [(1, "the header is not UTF-8 text; save the file as CSV UTF-8")])
+        self.assertFalse(Department.objects.filter(name="legal").exists())
+
+    def test_unreadable_rows(self):
+        """Test case verifies that a row the csv module cannot parse is reported by its line and the rows after it still imported"""
+
+        lines = io.StringIO("name,budget\nsales,10\nhuge," + "9" * 200000 + "\nsupport,30\n")
+        report = import_csv("departments", lines)
+
+        self.assertEqual(report.created, 2)
+        self.assertEqual(report.errors, [(3, "unreadable row: field larger than field limit (131072)")])
+
+    def test_deleted_ids_are_not_reused(self):
+        """Test case verifies that imported rows take ids after the highest ever used, not those of deleted rows, so they never inherit a deleted row's audit history"""
+
+        deleted = Computer.objects.create(make="Apple", model="MacBook Pro", serial_no="OLD-1", purchase_date=timezone.now()).id
+        Computer.objects.filter(pk=deleted).delete()
+
+        import_csv("computers", io.StringIO(f"make,model,serial_no,purchase_date,retire_date,employee_id\nDell,XPS,NEW-1,2024-01-01,,{self.employee.id}\nDell,XPS,NEW-2,2024-01-01,,\n"))
+        imported = list(Computer.objects.order_by("id"))
+        self.assertEqual([computer.id for computer in imported], [deleted + 1, deleted + 2])
+
+        created = Computer.objects.create(make="Apple", model="iMac", serial_no="NEW-3", purchase_date=timezone.now())
+        self.assertEqual(created.id, deleted + 3)
+        self.assertEqual(imported[0].current_assignment.employee_id, self.employee.id)
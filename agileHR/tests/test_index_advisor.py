@@ -0,0 +1,62 @@
+from io import StringIO
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+from ..management.commands.index_advisor import candidates, columns_of, problems
+from ..management.commands.scale_seeder import build_spec, generate
+
+
+class IndexAdvisorTest(TestCase):
+    """Defines tests for the index_advisor command
+
+    Methods:
+        test_flags_scans_and_sorts
+        test_candidate_columns
+        test_replays_views
+    """
+
+    def test_flags_scans_and_sorts(self):
+        """Test case verifies that table scans and temporary sorts are flagged, while index searches and search-index scans are not"""
+
+        plan = [
+            "SCAN agileHR_training",
+            "USE TEMP B-TREE FOR ORDER BY",
+            "SEARCH agileHR_employee USING INDEX agileHR_emp_last_na_dfa58c_idx (last_name=?)",
+            "SCAN agileHR_computer USING COVERING INDEX agileHR_com_make_fa78e6_idx",
+            "SCAN agileHR_computer_fts VIRTUAL TABLE INDEX 0:M4"
+        ]
+        self.assertEqual(problems(plan), ["SCAN agileHR_training", "USE TEMP B-TREE FOR ORDER BY"])
+
+    def test_candidate_columns(self):
+        """Test case verifies that candidates lead with equality columns, follow with the sort columns, and add a partial index for IS NULL tests"""
+
+        sql = (
+            'SELECT "agileHR_employeecomputer"."id" FROM "agileHR_employeecomputer" '
+            'WHERE ("agileHR_employeecomputer"."employee_id" = %s AND "agileHR_employeecomputer"."date_revoked" IS NULL) '
+            'ORDER BY "agileHR_employeecomputer"."date_assigned" DESC'
+        )
+        self.assertEqual(candidates(sql, "agileHR_employeecomputer"), [
+            (("employee_id", "date_assigned"), None),
+            (("employee_id", "date_assigned"), '"date_revoked" IS NULL')
+        ])
+
+        wrapped = 'SELECT "agileHR_training"."id" FROM "agileHR_training" WHERE django_datetime_cast_date("agileHR_training"."end_date", \'UTC\') >= %s'
+        self.assertEqual(columns_of(wrapped, "agileHR_training")["wrapped"], ["end_date"])
+
+        excluded = 'SELECT "agileHR_employeecomputer"."id" FROM "agileHR_employeecomputer" WHERE NOT ("agileHR_employeecomputer"."date_revoked" IS NULL)'
+        self.assertEqual(columns_of(excluded, "agileHR_employeecomputer")["null"], [])
+
+    def test_replays_views(self):
+        """Test case verifies that the command reports on the replayed views and leaves no candidate index behind"""
+
+        generate(build_spec({"department": 5, "employee": 100, "computer": 50, "training": 200, "enrollment": 100}, 2, 1, timezone.now()))
+        call_command("rebuild_derived", stdout=StringIO())
+
+        output = StringIO()
+        call_command("index_advisor", repeat=1, stdout=output)
+
+        self.assertIn("USE TEMP B-TREE FOR ORDER BY", output.getvalue())
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT count(*) FROM sqlite_master WHERE name = 'index_advisor_candidate'")
+            self.assertEqual(cursor.fetchone()[0], 0)
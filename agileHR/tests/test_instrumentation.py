@@ -0,0 +1,106 @@
+import json
+import os
+import re
+import tempfile
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+from ..models import Department
+
+
+class ServerTimingTest(TestCase):
+    """Defines tests for the per-request timing middleware
+
+    Methods:
+        test_server_timing_header
+        test_timing_log_line
+    """
+
+    def setUp(self):
+        Department.objects.create(name="Accounting", budget=10000)
+
+    def test_server_timing_header(self):
+        """Test case verifies that every response reports its query count and SQL, template and view durations"""
+
+        statements = []
+
+        def count(execute, sql, params, many, context):
+            statements.append(sql)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count):
+            response = self.client.get(reverse('agileHR:department'))
+
+        header = response["Server-Timing"]
+        metrics = dict(re.findall(r"(\w+);dur=([\d.]+)", header))
+        self.assertEqual(set(metrics), {"db", "tpl", "view"})
+        self.assertIn(f'desc="{len(statements)} queries"', header)
+        self.assertGreater(float(metrics["tpl"]), 0)
+        self.assertGreaterEqual(float(metrics["view"]), float(metrics["db"]))
+
+    def test_timing_log_line(self):
+        """Test case verifies that the timing log line is keyed by the namespaced URL name"""
+
+        with self.assertLogs("bangazon.timing", level="INFO") as logs:
+            self.client.get(reverse('agileHR:department'))
+
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn("route=agileHR:department", logs.output[0])
+        self.assertEqual(logs.records[0].timing["status"], 200)
+
+
+class MetricsTest(TestCase):
+    """Defines tests for the Prometheus metrics endpoint
+
+    Methods:
+        test_metrics_exposition
+        test_metrics_merge_workers
+    """
+
+    def setUp(self):
+        Department.objects.create(name="Accounting", budget=10000)
+
+    def sample(self, body, line_start):
+        """Returns the value of the first exposition line starting with the given name and labels"""
+
+        for line in body.splitlines():
+            if line.startswith(line_start):
+                return float(line.rsplit(" ", 1)[1])
+        return 0
+
+    def test_metrics_exposition(self):
+        """Test case verifies that requests are counted per route and status with their latency and SQL time"""
+
+        before = self.client.get("/metrics").content.decode()
+        self.client.get(reverse('agileHR:department'))
+        self.client.get(reverse('agileHR:department'))
+        response = self.client.get("/metrics")
+        body = response.content.decode()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain; version=0.0.4"))
+        responses = 'bangazon_http_responses_total{route="agileHR:department",method="GET",status="200"}'
+        self.assertEqual(self.sample(body, responses) - self.sample(before, responses), 2)
+        latency = 'bangazon_http_request_duration_seconds_count{route="agileHR:department",method="GET"}'
+        self.assertEqual(self.sample(body, latency) - self.sample(before, latency), 2)
+        self.assertIn('bangazon_http_request_duration_seconds_bucket{route="agileHR:department",method="GET",le="+Inf"}', body)
+        self.assertGreater(self.sample(body, 'bangazon_db_queries_total{route="agileHR:department"}'), 0)
+        self.assertIn("# TYPE bangazon_db_query_duration_seconds histogram", body)
+        self.assertEqual(self.sample(body, "bangazon_http_requests_in_flight"), 1)
+
+    def test_metrics_merge_workers(self):
+        """Test case verifies that the snapshots of other workers sharing METRICS_DIR are summed into the exposition"""
+
+        with tempfile.TemporaryDirectory() as directory, self.settings(METRICS_DIR=directory):
+            with open(os.path.join(directory, "1.json"), "w") as snapshot:
+                json.dump({
+                    "bangazon_http_responses_total": [[["agileHR:computers", "GET", "200"], 5]],
+                    "bangazon_http_requests_in_flight": [[[], 3]]
+                }, snapshot)
+            before = self.client.get("/metrics").content.decode()
+            self.client.get(reverse('agileHR:computers'))
+            body = self.client.get("/metrics").content.decode()
+
+        responses = 'bangazon_http_responses_total{route="agileHR:computers",method="GET",status="200"}'
+        self.assertEqual(self.sample(body, responses), self.sample(before, responses) + 1)
+        self.assertGreaterEqual(self.sample(body, responses), 6)
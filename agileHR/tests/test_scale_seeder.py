@@ -0,0 +1,45 @@
+import datetime
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from .. import datagen
+from ..models import *
+
+
+class ScaleSeederTest(TestCase):
+    """Defines tests for the synthetic data generator
+
+    Methods:
+        test_seeder_counts
+        test_chunks_are_deterministic
+    """
+
+    def test_seeder_counts(self):
+        """Test case verifies that the command inserts the requested volumes and rebuilds the derived fields"""
+
+        call_command("scale_seeder", departments=3, employees=40, computers=30, history=2, trainings=5, enrollments=25, anchor="2019-02-01", stdout=StringIO())
+
+        self.assertEqual(Department.objects.count(), 3)
+        self.assertEqual(Employee.objects.count(), 40)
+        self.assertEqual(Computer.objects.count(), 30)
+        self.assertEqual(EmployeeComputer.objects.count(), 60)
+        self.assertEqual(EmployeeTraining.objects.count(), 25)
+        self.assertEqual(
+            Computer.objects.filter(current_assignment__isnull=False).count(),
+            EmployeeComputer.objects.filter(date_revoked=None).count()
+        )
+        self.assertEqual(sum(Training.objects.values_list("seats_taken", flat=True)), 25)
+
+    def test_chunks_are_deterministic(self):
+        """Test case verifies that the same seed produces the same rows however the work is chunked"""
+
+        anchor = datetime.datetime(2019, 2, 1, tzinfo=datetime.timezone.utc)
+        counts = {"department": 2, "employee": 100, "computer": 50, "training": 4, "enrollment": 30, "assignment": 100}
+        spec = {"counts": counts, "offsets": {table: 1 for table in datagen.TABLES}, "history": 2, "seed": 7, "anchor": anchor}
+
+        def rows(chunk_size):
+            return [row for work in datagen.chunks(spec, "employee", chunk_size) for row in datagen.generate_chunk(spec, work)[1]]
+
+        self.assertEqual(rows(100), rows(100))
+        self.assertEqual([row["id"] for row in rows(30)], list(range(1, 101)))
+        self.assertNotEqual(rows(100), [row for row in datagen.generate_chunk(dict(spec, seed=8), ("employee", 0, 0, 100))[1]])
@@ -0,0 +1,123 @@
+import datetime
+import random
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from agileHR.models import *
+from ..enrollment import enroll
+from ..intervals import IntervalIndex
+from ..schedule import ScheduleConflict, find_conflicts, trainings_overlapping
+
+
+class ScheduleConflictTest(TestCase):
+    """Defines tests for the interval index and the training schedule conflict checks
+
+    Methods:
+        setUpTestData
+        training
+        test_interval_index_matches_scan
+        test_trainings_overlapping
+        test_find_conflicts_in_bulk
+        test_enroll_rejects_overlap
+        test_employee_edit_reports_overlap
+        test_same_day_trainings_conflict
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        # midnight, as the forms store dates
+        cls.start = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0) + datetime.timedelta(days=7)
+        cls.department = Department.objects.create(name="HR", budget=1)
+        cls.employee = Employee.objects.create(first_name="Ada", last_name="Lovelace", start_date=timezone.now(), is_supervisor=False, department=cls.department)
+        cls.other = Employee.objects.create(first_name="Grace", last_name="Hopper", start_date=timezone.now(), is_supervisor=False, department=cls.department)
+        cls.monday = cls.training("Monday", 0, 0)
+        cls.tuesday = cls.training("Tuesday", 1, 1)
+        cls.two_day = cls.training("Two Day", 0, 1)
+        cls.saturday = cls.training("Saturday", 5, 5)
+        enroll(cls.employee, [cls.monday])
+
+    @classmethod
+    def training(cls, title, start_day, end_day):
+        return Training.objects.create(title=title, start_date=cls.start + datetime.timedelta(days=start_day), end_date=cls.start + datetime.timedelta(days=end_day), max_attendees=10)
+
+    def test_interval_index_matches_scan(self):
+        """Test case verifies that the index finds exactly the intervals a full scan would, for overlapping and nested intervals"""
+
+        generator = random.Random(7)
+        intervals = []
+        for value in range(300):
+            start = generator.randint(0, 1000)
+            intervals.append((start, start + generator.randint(1, 80), value))
+        index = IntervalIndex(intervals)
+
+        for _ in range(200):
+            start = generator.randint(-50, 1050)
+            end = start + generator.randint(1, 100)
+            expected = sorted(item for item in intervals if item[0] < end and item[1] > start)
+            self.assertEqual(sorted(index.overlapping(start, end)), expected)
+        self.assertEqual(IntervalIndex([]).overlapping(0, 10), [])
+
+    def test_trainings_overlapping(self):
+        """Test case verifies that a window finds the trainings it shares time with, a training lasting until the end of its last day, and that the next day does not count"""
+
+        self.assertEqual(trainings_overlapping(self.employee.id, self.start + datetime.timedelta(hours=22), self.start + datetime.timedelta(hours=23)), [self.monday])
+        self.assertEqual(trainings_overlapping(self.employee.id, self.tuesday.start_date, self.tuesday.end_date + datetime.timedelta(days=1)), [])
+
+    def test_find_conflicts_in_bulk(self):
+        """Test case verifies that requests are checked against stored enrollments and against earlier requests in the same batch, in one query"""
+
+        requests = [
+            (self.employee.id, self.tuesday),
+            (self.employee.id, self.two_day),
+            (self.employee.id, self.saturday),
+            (self.other.id, self.two_day),
+            (self.other.id, self.tuesday)
+        ]
+        with self.assertNumQueries(1):
+            conflicts = find_conflicts(requests)
+
+        self.assertEqual([(conflict.employee_id, conflict.training, conflict.other) for conflict in conflicts], [
+            (self.employee.id, self.two_day, self.monday),
+            (self.other.id, self.tuesday, self.two_day)
+        ])
+        self.assertEqual(str(conflicts[0]), "Two Day overlaps Monday")
+
+    def test_enroll_rejects_overlap(self):
+        """Test case verifies that an overlapping enrollment is refused before any seat is taken"""
+
+        with self.assertRaises(ScheduleConflict):
+            enroll(self.employee, [self.saturday, self.two_day])
+
+        self.assertFalse(EmployeeTraining.objects.filter(employee=self.employee, training=self.saturday).exists())
+        self.assertEqual(Training.objects.get(pk=self.saturday.id).seats_taken, 0)
+
+    def test_employee_edit_reports_overlap(self):
+        """Test case verifies that the employee edit form reports a schedule conflict and saves nothing"""
+
+        response = self.client.post(reverse("agileHR:employee_edit", args=(self.employee.id,)), {
+            "first_name": "Changed", "last_name": "Lovelace", "department": self.department.id,
+            "start_date": "2016-03-07", "end_date": "", "computer": "select", "trainings": [self.two_day.id]
+        })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("No changes were saved: Two Day overlaps Monday.".encode(), response.content)
+        self.assertEqual(Employee.objects.get(pk=self.employee.id).first_name, "Ada")
+
+    def test_same_day_trainings_conflict(self):
+        """Test case verifies that one-day trainings on the same date, entered through the forms with equal start and end dates, clash with each other"""
+
+        day = (self.start + datetime.timedelta(days=20)).strftime("%Y-%m-%d")
+        for title in ("First Aid", "Fire Safety", "Ergonomics"):
+            response = self.client.post(reverse("agileHR:training_add"), {"training_title": title, "start_date": day, "end_date": day, "max_attendees": 10})
+            self.assertEqual(response.status_code, 302)
+        same_day = list(Training.objects.filter(title__in=("First Aid", "Fire Safety", "Ergonomics")).order_by("id"))
+
+        conflicts = find_conflicts((self.other.id, training) for training in same_day)
+        self.assertEqual([(conflict.training, conflict.other) for conflict in conflicts], [(same_day[1], same_day[0]), (same_day[2], same_day[0])])
+
+        response = self.client.post(reverse("agileHR:employee_edit", args=(self.other.id,)), {
+            "first_name": "Grace", "last_name": "Hopper", "department": self.department.id,
+            "start_date": "2016-03-07", "end_date": "", "computer": "select", "trainings": [training.id for training in same_day]
+        })
+        self.assertIn(b"No changes were saved", response.content)
+        self.assertFalse(EmployeeTraining.objects.filter(employee=self.other).exists())
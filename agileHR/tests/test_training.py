@@ -2,7 +2,10 @@ import unittest
 from django.test import TestCase
 from django.urls import reverse
 from datetime import datetime, timedelta
-from ..models import Training, Employee, EmployeeTraining
+from ..models import Training, Employee, EmployeeTraining, Department
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from ..enrollment import TrainingFull, enroll, reserve_seats, withdraw
 
 class TrainingTest(TestCase):
     """Defines tests for Training Models and Views
@@ -207,4 +210,83 @@ class TrainingDeleteTest(TestCase):
         response = self.client.get(reverse('agileHR:training_delete', args=(1,)))
 
         # Checks that a current training cannot be deleted
-        self.assertIn("<p>Sorry, <strong>Test Training 2</strong> can\'t be deleted because it is currently underway or has already taken place.</p>".encode(), response.content)
\ No newline at end of file
+        self.assertIn("<p>Sorry, <strong>Test Training 2</strong> can\'t be deleted because it is currently underway or has already taken place.</p>".encode(), response.content)
+
+class TrainingSeatTest(TestCase):
+    """Defines tests for the training seat counter and capacity checks
+
+        Methods:
+            test_seat_counter
+            test_reserve_within_capacity
+            test_enroll_full_training
+            test_withdraw_releases_seats_per_training
+    """
+
+    def setUp(self):
+        future_date = datetime.now(tz=None) + timedelta(days=2)
+        self.training = Training.objects.create(title="Small Class", start_date=future_date, end_date=future_date, max_attendees=2)
+        self.employees = [
+            Employee.objects.create(first_name=f"Rob{i}", last_name="Boss", start_date="2016-03-07 05:53:53", is_supervisor=0)
+            for i in range(3)
+        ]
+
+    def test_seat_counter(self):
+        """Test case verifies that enrollments made and removed one at a time keep the counter and the detail page right"""
+
+        join = EmployeeTraining.objects.create(employee=self.employees[0], training=self.training)
+        self.assertEqual(Training.objects.get(pk=self.training.id).seats_taken, 1)
+
+        response = self.client.get(reverse('agileHR:traindetail', args=(self.training.id,)))
+        self.assertEqual(response.context['attendee_size'], 1)
+        self.assertIn("Available Seats: 1".encode(), response.content)
+
+        join.delete()
+        self.assertEqual(Training.objects.get(pk=self.training.id).seats_taken, 0)
+
+    def test_reserve_within_capacity(self):
+        """Test case verifies that seats cannot be reserved past max_attendees"""
+
+        self.assertTrue(reserve_seats(self.training.id))
+        self.assertTrue(reserve_seats(self.training.id))
+        self.assertFalse(reserve_seats(self.training.id))
+        self.assertEqual(Training.objects.get(pk=self.training.id).seats_taken, 2)
+
+    def test_enroll_full_training(self):
+        """Test case verifies that an employee edit enrolling into a full training is rejected as a whole"""
+
+        enroll(self.employees[0], [self.training])
+        enroll(self.employees[1], [self.training])
+        with self.assertRaises(TrainingFull):
+            enroll(self.employees[2], [self.training])
+
+        response = self.client.post(reverse("agileHR:employee_edit", args=(self.employees[2].id,)), {
+            "first_name": "Changed", "last_name": "Boss", "department": Department.objects.create(name="HR", budget=1).id,
+            "start_date": "2016-03-07", "end_date": "", "computer": "select", "trainings": [self.training.id]
+        })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("Small Class is full".encode(), response.content)
+        self.assertEqual(Employee.objects.get(pk=self.employees[2].id).first_name, "Rob2")
+        self.assertEqual(Training.objects.get(pk=self.training.id).seats_taken, 2)
+
+    def test_withdraw_releases_seats_per_training(self):
+        """Test case verifies that withdrawing enrollments gives their seats back with one UPDATE per training, however many rows are removed"""
+
+        future_date = datetime.now(tz=None) + timedelta(days=5)
+        other = Training.objects.create(title="Big Class", start_date=future_date, end_date=future_date, max_attendees=20)
+        self.training.max_attendees = 20
+        self.training.save()
+        employees = self.employees + [Employee.objects.create(first_name=f"Ann{i}", last_name="Boss", start_date="2016-03-07 05:53:53", is_supervisor=0) for i in range(5)]
+        for employee in employees:
+            enroll(employee, [self.training, other])
+
+        queries = []
+        for group in (employees[:2], employees[2:]):
+            with CaptureQueriesContext(connection) as captured:
+                self.assertEqual(withdraw(EmployeeTraining.objects.filter(employee__in=group)), 2 * len(group))
+            queries.append(len(captured))
+
+        self.assertEqual(queries[0], queries[1])
+        self.assertEqual(Training.objects.get(pk=self.training.id).seats_taken, 0)
+        self.assertEqual(Training.objects.get(pk=other.id).seats_taken, 0)
+        self.assertFalse(EmployeeTraining.objects.exists())
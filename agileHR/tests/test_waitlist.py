@@ -0,0 +1,172 @@
+import datetime
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from agileHR.models import *
+from ..enrollment import TrainingFull, enroll, promote_waitlist, withdraw
+
+
+class WaitlistTest(TestCase):
+    """Defines tests for training waitlists and their promotion as seats free up
+
+    Methods:
+        setUp
+        test_full_training_waitlists
+        test_withdraw_promotes_in_order
+        test_capacity_increase_promotes
+        test_clashing_entries_lose_their_place
+        test_promotion_query_count
+        test_employee_edit_waitlists
+        test_enrolling_leaves_the_waitlist
+        test_enrolled_entries_lose_their_place
+    """
+
+    def setUp(self):
+        self.start = timezone.now().replace(microsecond=0) + datetime.timedelta(days=7)
+        self.department = Department.objects.create(name="HR", budget=1)
+        self.training = Training.objects.create(title="Small Class", start_date=self.start, end_date=self.start + datetime.timedelta(hours=2), max_attendees=1)
+        self.employees = [
+            Employee.objects.create(first_name=f"Rob{i}", last_name="Boss", start_date=timezone.now(), is_supervisor=False, department=self.department)
+            for i in range(6)
+        ]
+        enroll(self.employees[0], [self.training])
+
+    def waiting(self):
+        return list(WaitlistEntry.objects.filter(training=self.training).order_by("joined_at", "id").values_list("employee_id", flat=True))
+
+    def test_full_training_waitlists(self):
+        """Test case verifies that a full training refuses an enrollment unless the waitlist is asked for, and that joining twice keeps one place"""
+
+        with self.assertRaises(TrainingFull):
+            enroll(self.employees[1], [self.training])
+        self.assertEqual(self.waiting(), [])
+
+        self.assertEqual(enroll(self.employees[1], [self.training], waitlist=True), [])
+        enroll(self.employees[1], [self.training], waitlist=True)
+        self.assertEqual(self.waiting(), [self.employees[1].id])
+        self.assertEqual(Training.objects.get(pk=self.training.id).seats_taken, 1)
+
+        response = self.client.get(reverse("agileHR:traindetail", args=(self.training.id,)))
+        self.assertIn(b"Waitlist:", response.content)
+        self.assertIn(b"Rob1 Boss", response.content)
+
+    def test_withdraw_promotes_in_order(self):
+        """Test case verifies that a freed seat goes to the employee who has waited longest"""
+
+        for employee in self.employees[1:4]:
+            enroll(employee, [self.training], waitlist=True)
+
+        withdraw(EmployeeTraining.objects.filter(employee=self.employees[0]))
+
+        self.assertTrue(EmployeeTraining.objects.filter(employee=self.employees[1], training=self.training).exists())
+        self.assertEqual(self.waiting(), [self.employees[2].id, self.employees[3].id])
+        self.assertEqual(Training.objects.get(pk=self.training.id).seats_taken, 1)
+
+    def test_capacity_increase_promotes(self):
+        """Test case verifies that raising max_attendees through the edit form seats the head of the waitlist"""
+
+        for employee in self.employees[1:5]:
+            enroll(employee, [self.training], waitlist=True)
+
+        response = self.client.post(reverse("agileHR:training_edit", args=(self.training.id,)), {
+            "training_title": "Small Class", "start_date": self.start.strftime("%Y-%m-%d"), "end_date": (self.start + datetime.timedelta(days=1)).strftime("%Y-%m-%d"), "max_attendees": 3
+        })
+
+        self.assertEqual(response.status_code, 302)
+        seated = set(EmployeeTraining.objects.filter(training=self.training).values_list("employee_id", flat=True))
+        self.assertEqual(seated, {employee.id for employee in self.employees[:3]})
+        self.assertEqual(self.waiting(), [self.employees[3].id, self.employees[4].id])
+        self.assertEqual(Training.objects.get(pk=self.training.id).seats_taken, 3)
+
+    def test_clashing_entries_lose_their_place(self):
+        """Test case verifies that an employee who has since booked an overlapping training is dropped and the next one seated instead"""
+
+        enroll(self.employees[1], [self.training], waitlist=True)
+        enroll(self.employees[2], [self.training], waitlist=True)
+        overlapping = Training.objects.create(title="Overlap", start_date=self.start + datetime.timedelta(hours=1), end_date=self.start + datetime.timedelta(hours=3), max_attendees=5)
+        enroll(self.employees[1], [overlapping])
+
+        withdraw(EmployeeTraining.objects.filter(employee=self.employees[0], training=self.training))
+
+        self.assertEqual(list(EmployeeTraining.objects.filter(training=self.training).values_list("employee_id", flat=True)), [self.employees[2].id])
+        self.assertEqual(self.waiting(), [])
+
+    def test_promotion_query_count(self):
+        """Test case verifies that a promotion pass takes the same number of queries however many employees it seats"""
+
+        for employee in self.employees[1:]:
+            enroll(employee, [self.training], waitlist=True)
+
+        Training.objects.filter(pk=self.training.id).update(max_attendees=2)
+        with CaptureQueriesContext(connection) as one:
+            self.assertEqual(promote_waitlist(self.training.id), [self.employees[1].id])
+
+        Training.objects.filter(pk=self.training.id).update(max_attendees=5)
+        with CaptureQueriesContext(connection) as many:
+            self.assertEqual(promote_waitlist(self.training.id), [employee.id for employee in self.employees[2:5]])
+
+        self.assertEqual(len(one), len(many))
+
+    def test_employee_edit_waitlists(self):
+        """Test case verifies that the employee edit form waitlists full trainings when the box is checked"""
+
+        response = self.client.post(reverse("agileHR:employee_edit", args=(self.employees[1].id,)), {
+            "first_name": "Rob1", "last_name": "Boss", "department": self.department.id,
+            "start_date": "2016-03-07", "end_date": "", "computer": "select", "trainings": [self.training.id], "waitlist": "on"
+        })
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.waiting(), [self.employees[1].id])
+
+    def test_enrolling_leaves_the_waitlist(self):
+        """Test case verifies that an employee seated directly, once a seat opens, is taken off the waitlist and not seated a second time by a later promotion"""
+
+        enroll(self.employees[1], [self.training], waitlist=True)
+        Training.objects.filter(pk=self.training.id).update(max_attendees=3)
+
+        enroll(self.employees[1], [self.training])
+        self.assertEqual(self.waiting(), [])
+        self.assertEqual(promote_waitlist(self.training.id), [])
+
+        self.assertEqual(EmployeeTraining.objects.filter(employee=self.employees[1], training=self.training).count(), 1)
+        self.assertEqual(Training.objects.get(pk=self.training.id).seats_taken, 2)
+
+    def test_enrolled_entries_lose_their_place(self):
+        """Test case verifies that promotion drops a waiting employee who is already enrolled, e.g. added through the admin, and seats the next one instead"""
+
+        enroll(self.employees[1], [self.training], waitlist=True)
+        enroll(self.employees[2], [self.training], waitlist=True)
+        Training.objects.filter(pk=self.training.id).update(max_attendees=2)
+        EmployeeTraining.objects.create(employee=self.employees[1], training=self.training)
+        Training.objects.filter(pk=self.training.id).update(max_attendees=3)
+
+        self.assertEqual(promote_waitlist(self.training.id), [self.employees[2].id])
+
+        self.assertEqual(EmployeeTraining.objects.filter(employee=self.employees[1], training=self.training).count(), 1)
+        self.assertEqual(self.waiting(), [])
+        self.assertEqual(Training.objects.get(pk=self.training.id).seats_taken, 3)
+
+
+class WaitlistDeleteTest(TransactionTestCase):
+    """Defines tests for promotion after enrollments deleted through the ORM. The promotion runs when the deletion commits, which TestCase never does, hence TransactionTestCase.
+
+    Methods:
+        test_deleted_enrollment_promotes
+    """
+
+    def test_deleted_enrollment_promotes(self):
+        """Test case verifies that deleting an enrollment row, rather than withdrawing it, still hands its seat to the head of the waitlist"""
+
+        start = timezone.now() + datetime.timedelta(days=7)
+        training = Training.objects.create(title="Small Class", start_date=start, end_date=start + datetime.timedelta(hours=2), max_attendees=1)
+        ann, bob = [Employee.objects.create(first_name=name, last_name="Boss", start_date=timezone.now(), is_supervisor=False) for name in ("Ann", "Bob")]
+        enroll(ann, [training])
+        enroll(bob, [training], waitlist=True)
+
+        EmployeeTraining.objects.get(employee=ann, training=training).delete()
+
+        self.assertEqual(list(EmployeeTraining.objects.filter(training=training).values_list("employee_id", flat=True)), [bob.id])
+        self.assertFalse(WaitlistEntry.objects.exists())
+        self.assertEqual(Training.objects.get(pk=training.id).seats_taken, 1)
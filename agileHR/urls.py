@@ -8,6 +8,7 @@ urlpatterns = [
     path("employees/add", views.employee_add, name="employee_add"),
     path("employees/<int:employee_id>/", views.employee_detail, name="employee_detail"),
     path("employees/<int:employee_id>/edit", views.employee_edit, name="employee_edit"),
+    path("employees/<int:employee_id>/computers", views.employee_computers, name="employee_computers"),
     # ex: /bangazon/departments/
     path("departments/", views.department, name="department"),
     # ex: /bangazon/departments/add
@@ -31,8 +32,17 @@ urlpatterns = [
     path("computers/search", views.computer_search, name="computer_search"),
     # ex: /bangazon/computers/12
     path("computers/<int:computer_id>/", views.computer_detail, name="computer_detail"),
+    path("computers/<int:computer_id>/holders", views.computer_holders, name="computer_holders"),
     path("computers/<int:computer_id>/delete", views.delete_computer, name="delete_computer"),
     # ex: /bangazon/computers/new
-    path("computers/new/", views.new_computer, name="new_computer")
+    path("computers/new/", views.new_computer, name="new_computer"),
+    # ex: /bangazon/import
+    path("import", views.import_data, name="import_data"),
+    # ex: /bangazon/export/assignments.csv
+    path("export/<str:dataset>.<str:file_format>", views.export, name="export"),
+    # ex: /bangazon/api/employees?fields=first_name,last_name&include=department
+    path("api/<str:resource_name>", views.api_list, name="api_list"),
+    # ex: /bangazon/api/computers/12?include=assignments.employee
+    path("api/<str:resource_name>/<int:pk>", views.api_detail, name="api_detail")
 
 ]
\ No newline at end of file
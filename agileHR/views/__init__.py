@@ -2,4 +2,7 @@ from .index_views import *
 from .employee_views import *
 from .department_views import *
 from .training_views import *
-from .computer_views import *
\ No newline at end of file
+from .computer_views import *
+from .import_views import *
+from .export_views import *
+from .api_views import *
\ No newline at end of file
@@ -0,0 +1,98 @@
+import hashlib
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import Http404, HttpResponse, JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import urlencode
+from django.views.decorators.http import require_safe
+from agileHR.api import RESOURCES, ApiError, columns, embed, parse_fields, parse_filters, parse_include
+from agileHR.pagination import keyset_page
+
+API_PAGE_SIZE = 100
+API_MAX_PAGE_SIZE = 1000
+
+
+def api_response(request, payload):
+    """Serializes a payload with a strong ETag computed from the exact bytes sent, answering 304 when the client already holds them.
+
+    Returns:
+        HttpResponse -- the JSON body, or an empty 304 Not Modified
+    """
+
+    body = json.dumps(payload, cls=DjangoJSONEncoder, separators=(",", ":")).encode()
+    etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+    not_modified = get_conditional_response(request, etag=etag)
+    response = not_modified or HttpResponse(body, content_type="application/json")
+    response["ETag"] = etag
+    # pollers must revalidate every time; a 304 costs them no body
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+def api_error(message, status=400):
+    return JsonResponse({"error": message}, status=status)
+
+
+def page_link(request, cursor_name, cursor):
+    if cursor is None:
+        return None
+    params = {key: value for key, value in request.GET.items() if key not in ("after", "before")}
+    params[cursor_name] = cursor
+    return f"{request.path}?{urlencode(params)}"
+
+
+@require_safe
+def api_list(request, resource_name):
+    """This method returns one page of a resource as JSON, ordered by id, with the requested fields and embedded relations.
+
+    Query parameters: fields, fields[resource], include (dotted for nesting, e.g. assignments.computer), limit, the after / before cursors from the links of a previous page, and the filters of the resource, e.g. computer and at for assignments.
+
+    Returns:
+        HttpResponse -- {"data": [...], "links": {"next": ..., "prev": ...}}
+    """
+
+    if resource_name not in RESOURCES:
+        raise Http404("No such resource")
+    try:
+        fields = parse_fields(request.GET, resource_name)
+        include = parse_include(request.GET.get("include"), resource_name)
+        condition = parse_filters(request.GET, resource_name)
+        limit = int(request.GET.get("limit", API_PAGE_SIZE))
+    except ApiError as error:
+        return api_error(str(error))
+    except ValueError:
+        return api_error("limit must be a whole number")
+    limit = min(max(limit, 1), API_MAX_PAGE_SIZE)
+
+    wanted = columns(resource_name, fields, include)
+    if "id" not in wanted:
+        wanted.append("id")
+    rows = RESOURCES[resource_name].queryset().filter(condition).values(*wanted)
+    page = keyset_page(rows, ["id"], limit, after=request.GET.get("after"), before=request.GET.get("before"))
+    data = embed(list(page), resource_name, fields, include)
+    return api_response(request, {
+        "data": data,
+        "links": {"next": page_link(request, "after", page.next_cursor), "prev": page_link(request, "before", page.previous_cursor)}
+    })
+
+
+@require_safe
+def api_detail(request, resource_name, pk):
+    """This method returns a single row of a resource as JSON, with the requested fields and embedded relations.
+
+    Returns:
+        HttpResponse -- {"data": {...}}, or 404 when there is no such row
+    """
+
+    if resource_name not in RESOURCES:
+        raise Http404("No such resource")
+    try:
+        fields = parse_fields(request.GET, resource_name)
+        include = parse_include(request.GET.get("include"), resource_name)
+    except ApiError as error:
+        return api_error(str(error))
+
+    rows = list(RESOURCES[resource_name].queryset().filter(pk=pk).values(*columns(resource_name, fields, include)))
+    if not rows:
+        return api_error("not found", status=404)
+    return api_response(request, {"data": embed(rows, resource_name, fields, include)[0]})
@@ -3,11 +3,22 @@ from django.shortcuts import get_object_or_404, render
 from django.http import HttpResponse, HttpResponseRedirect
 from django.urls import reverse
 from django.contrib import messages
+from django.core.paginator import Paginator
+from django.utils.http import urlencode
 from agileHR.models import *
+from agileHR.assignments import employees_needing_computers
+from agileHR.fragments import page_versions
+from agileHR.history import holders, period
+from agileHR.pagination import keyset_page
+from agileHR.search import ComputerSearch
+from agileHR.stamps import computer_modified, conditional_page
+from bangazon.db.writer import write
+
+COMPUTERS_PER_PAGE = 50
 
 
 def computers(request):
-    """Displays the list of computers currently owned by the company with links to details for each one.
+    """Displays one page of the computers owned by the company, optionally filtered by make, assignment and retirement, with each machine's current holder joined in.
 
     Author: Sebastian Civarolo
 
@@ -15,47 +26,72 @@ def computers(request):
         render -- loads the computer.html template.
     """
 
-    computers = Computer.objects.all().order_by("make", "model")
+    computers = Computer.objects.select_related("current_assignment__employee")
+    filters = {}
+
+    make = request.GET.get("make", "")
+    if make != "":
+        computers = computers.filter(make=make)
+        filters["make"] = make
+
+    assigned = request.GET.get("assigned", "")
+    if assigned == "yes":
+        computers = computers.filter(current_assignment__isnull=False)
+        filters["assigned"] = assigned
+    elif assigned == "no":
+        computers = computers.filter(current_assignment__isnull=True)
+        filters["assigned"] = assigned
+
+    retired = request.GET.get("retired", "")
+    if retired == "yes":
+        computers = computers.filter(retire_date__isnull=False)
+        filters["retired"] = retired
+    elif retired == "no":
+        computers = computers.filter(retire_date__isnull=True)
+        filters["retired"] = retired
+
+    page = keyset_page(computers, ["make", "model", "id"], COMPUTERS_PER_PAGE, after=request.GET.get("after"), before=request.GET.get("before"))
+    list_version = page_versions(page.object_list, "computer", [("employee", "current_assignment.employee_id")], ["computers"])
+
     context = {
-        "computers": computers
+        "computers": page.object_list,
+        "page": page,
+        "list_version": list_version,
+        "makes": Computer.objects.order_by("make").values_list("make", flat=True).distinct(),
+        "make": make,
+        "assigned": filters.get("assigned", ""),
+        "retired": filters.get("retired", ""),
+        "filter_query": urlencode(filters)
     }
     return render(request, 'agileHR/computers.html', context)
 
 
 def computer_search(request):
-    """Displays search results when a user searches for a computer by make or model
+    """Displays one page of ranked search results when a user searches for a computer by make, model, serial number or holder
 
     Author: Sebastian Civarolo
 
     Returns:
-        render -- loads the page with search results when it receives a POST. Message displayed if no results.
+        render -- loads the page with search results for a POSTed search, or for a later page of it requested by GET. Message displayed if no results.
         HttpResponseRedirect -- if a user goes directly to the url, they are redirected to the computers view.
     """
 
-    if request.method == "POST":
-
-        search_text = request.POST["search_text"]
-
-        if search_text is not "":
-            by_make = Computer.objects.filter(make__contains=search_text).order_by("make", "model")
-            by_model = Computer.objects.filter(model__contains=search_text).order_by("make", "model")
-            results = by_make | by_model
-            context = {
-                "results": results,
-                "length": len(results),
-                "search_text": search_text,
-                "no_results": True if len(results) is 0 else False
-            }
-        else:
-            context = {
-                "no_results": True,
-                "search_text": search_text
-            }
-        return render(request, 'agileHR/computer_search.html', context)
-
-    else:
+    search_text = request.POST.get("search_text", request.GET.get("search_text"))
+    if search_text is None:
         return HttpResponseRedirect(reverse('agileHR:computers'))
 
+    paginator = Paginator(ComputerSearch(search_text), COMPUTERS_PER_PAGE)
+    results = paginator.get_page(request.GET.get("page"))
+    context = {
+        "results": results,
+        "length": paginator.count,
+        "search_text": search_text,
+        "search_query": urlencode({"search_text": search_text}),
+        "no_results": paginator.count == 0
+    }
+    return render(request, 'agileHR/computer_search.html', context)
+
+@conditional_page(computer_modified)
 def computer_detail(request, computer_id):
     """Displays the details about a single computer owned by the company.
 
@@ -67,8 +103,8 @@ def computer_detail(request, computer_id):
     """
 
     computer = get_object_or_404(Computer, pk=computer_id)
-    current_assignment = EmployeeComputer.objects.filter(computer_id=computer_id).filter(date_revoked=None)
-    assignment_history = EmployeeComputer.objects.filter(computer_id=computer_id).exclude(date_revoked=None).order_by('-date_assigned')
+    current_assignment = EmployeeComputer.objects.filter(computer_id=computer_id).filter(date_revoked=None).select_related("employee")
+    assignment_history = EmployeeComputer.objects.filter(computer_id=computer_id).exclude(date_revoked=None).select_related("employee").order_by('-date_assigned')
 
     context = {
         "computer": computer,
@@ -79,6 +115,24 @@ def computer_detail(request, computer_id):
     return render(request, "agileHR/computer_detail.html", context)
 
 
+def computer_holders(request, computer_id):
+    """Answers who held a computer on a day (?on=YYYY-MM-DD) or at a moment (?on=YYYY-MM-DDTHH:MM), off the computer's own assignment history.
+
+    Returns:
+        render -- the computer_holders template, listing every assignment in force then
+    """
+
+    computer = get_object_or_404(Computer, pk=computer_id)
+    on = request.GET.get("on", "")
+    context = {"computer": computer, "on": on}
+    if on:
+        try:
+            context["assignments"] = holders(computer_id, *period(on))
+        except ValueError as error:
+            context["error_message"] = str(error)
+    return render(request, "agileHR/computer_holders.html", context)
+
+
 def new_computer(request):
     """Displays the form to add a new computer, and checks for all inputs before saving to the database.
 
@@ -109,14 +163,19 @@ def new_computer(request):
                 })
             else:
                 now = datetime.datetime.now()
-                new_computer = Computer(make=make, model=model, serial_no=serial_no, purchase_date=purchase_date)
-                new_computer.save()
-                join = EmployeeComputer.objects.create(
-                    computer = new_computer,
-                    employee = employee,
-                    date_assigned = now
-                )
-                join.save()
+
+                # the computer and its first assignment are saved together, through the write queue when it is on
+                def add_computer():
+                    new_computer = Computer(make=make, model=model, serial_no=serial_no, purchase_date=purchase_date)
+                    new_computer.save()
+                    EmployeeComputer.objects.create(
+                        computer = new_computer,
+                        employee = employee,
+                        date_assigned = now
+                    )
+                    return new_computer
+
+                new_computer = write(add_computer)
 
                 return HttpResponseRedirect(reverse("agileHR:computer_detail", args=(new_computer.id,)))
         except KeyError:
@@ -124,20 +183,9 @@ def new_computer(request):
                 "error_message": "Please fill out all fields"
             })
     else:
-        # Get all computer assignment history
-        computer_assignments = EmployeeComputer.objects.all()
-
-        # Get employees who have had a computer but do not currently have one.
-        need_computers = Employee.objects.exclude(employeecomputer__date_revoked=None).order_by('last_name')
-
-        # Get employees who have never had a computer.
-        never_computers = Employee.objects.exclude(employeecomputer__in=computer_assignments).order_by('last_name')
-
-        # Combine the two querysets
-        final_list = need_computers | never_computers
-
+        # employees without a computer, read off the availability index
         context = {
-            "employees": final_list
+            "employees": employees_needing_computers()
         }
 
         return render(request, "agileHR/computer_new.html", context)
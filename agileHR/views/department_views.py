@@ -3,11 +3,26 @@ from django.shortcuts import get_object_or_404, render
 from django.http import HttpResponse, HttpResponseRedirect
 from django.urls import reverse
 from django.contrib import messages
+from django.core.paginator import Paginator
+from django.db.models import Case, Count, ExpressionWrapper, F, FloatField, When
 from agileHR.models import *
+from agileHR.fragments import page_versions
+from agileHR.stamps import conditional_page, department_modified
+from bangazon.db.writer import write
+
+DEPARTMENTS_PER_PAGE = 50
+
+# maps the sort query parameter onto the annotated field it orders by
+DEPARTMENT_SORTS = {
+    "name": "name",
+    "size": "size",
+    "budget": "budget",
+    "per_head": "per_head"
+}
 
 
 def department(request):
-    """This method queries the database for department and related employee information and renders the department template.
+    """This method queries the database for departments annotated with their headcount and budget per head, sorts and paginates them, and renders the department template.
 
     Author: Brendan McCray
 
@@ -15,19 +30,43 @@ def department(request):
         render -- loads the department.html template.
     """
 
-    departments = Department.objects.all().order_by("name")
-    dept_size = Employee.objects.raw("""SELECT COUNT(agileHR_employee.department_id) AS "count", agileHR_department.id
-        FROM agileHR_employee
-        JOIN agileHR_department WHERE agileHR_department.id = agileHR_employee.department_id
-        GROUP BY department_id"""
+    sort = request.GET.get("sort", "name")
+    if sort not in DEPARTMENT_SORTS:
+        sort = "name"
+    # names read best A-Z, while size and budget are most useful largest first
+    direction = request.GET.get("dir", "asc" if sort == "name" else "desc")
+
+    # headcount and budget per head come back with each department row, so the template never has to look anything up
+    size = Count("employee")
+    departments = Department.objects.annotate(
+        size=size,
+        per_head=Case(
+            When(size=0, then=None),
+            default=ExpressionWrapper(F("budget") * 1.0 / size, output_field=FloatField()),
+            output_field=FloatField()
+        )
     )
 
+    ordering = DEPARTMENT_SORTS[sort]
+    if direction != "asc":
+        direction = "desc"
+        ordering = "-" + ordering
+    departments = departments.order_by(ordering, "id")
+
+    paginator = Paginator(departments, DEPARTMENTS_PER_PAGE)
+    page = paginator.get_page(request.GET.get("page"))
+    # a row's headcount comes from the annotation, so it is part of the row's fragment key rather than of the department's version
+    list_version = page_versions(page.object_list, "department", lists=["department"])
+
     context = {
-        "departments": departments,
-        "dept_size": dept_size
+        "departments": page,
+        "list_version": list_version,
+        "sort": sort,
+        "dir": direction
     }
     return render(request, "agileHR/department.html", context)
 
+@conditional_page(department_modified)
 def department_detail(request, dept_id):
     """This method queries the database for a specific department and its employee information and renders the department_detail template.
 
@@ -67,7 +106,7 @@ def departmentadd(request):
               })
           else:
             new_dept = Department(name=name.lower(), budget=budget)
-            new_dept.save()
+            write(new_dept.save)
             return HttpResponseRedirect(reverse("agileHR:department"))
         except KeyError:
           return render(request, "agileHR/department_form.html", {
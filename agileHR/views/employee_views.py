@@ -3,36 +3,109 @@ from django.shortcuts import get_object_or_404, render
 from django.http import HttpResponse, HttpResponseRedirect
 from django.urls import reverse
 from django.contrib import messages
+from django.db.models import Count, Q
+from django.utils import timezone
+from django.utils.http import urlencode
 from agileHR.models import *
+from agileHR.assignments import assign_computer, available_computers
+from agileHR.enrollment import TrainingFull, enroll, withdraw
+from agileHR.history import computers_held, period
+from agileHR.hierarchy import HierarchyCycle, chain_of_command, check_supervisor, reports_under
+from agileHR.schedule import ScheduleConflict
+from agileHR.fragments import page_versions
+from agileHR.pagination import keyset_page
+from agileHR.stamps import conditional_page, employee_modified
+from bangazon.db.writer import write
+
+EMPLOYEES_PER_PAGE = 50
 
 
 def employee(request):
-    """This method queries the database for all employees ordered by last name and renders the employee page
+    """This method queries the database for one page of employees ordered by last name, optionally filtered by department and status, and renders the employee page
 
     Author: Rachel Daniel
 
     Returns:
         render -- loads the employee.html template.
     """
-    employee_list = Employee.objects.order_by('last_name')
-    context = {'employee_list': employee_list}
+    now = timezone.now()
+    employees = Employee.objects.select_related("department")
+    filters = {}
+
+    department_id = request.GET.get("department", "")
+    if department_id.isdigit():
+        employees = employees.filter(department_id=department_id)
+        filters["department"] = department_id
+
+    status = request.GET.get("status", "")
+    if status == "active":
+        employees = employees.filter(Q(end_date=None) | Q(end_date__gt=now))
+        filters["status"] = status
+    elif status == "terminated":
+        employees = employees.filter(end_date__lte=now)
+        filters["status"] = status
+
+    page = keyset_page(employees, ["last_name", "id"], EMPLOYEES_PER_PAGE, after=request.GET.get("after"), before=request.GET.get("before"))
+    list_version = page_versions(page.object_list, "employee", [("department", "department_id")], ["employee"])
+
+    context = {
+        "employee_list": page.object_list,
+        "page": page,
+        "list_version": list_version,
+        "departments": Department.objects.order_by("name"),
+        "department_id": filters.get("department", ""),
+        "status": filters.get("status", ""),
+        "filter_query": urlencode(filters)
+    }
     return render(request, 'agileHR/employee.html', context)
 
 
+@conditional_page(employee_modified)
 def employee_detail(request, employee_id):
-    """This method queries the database for the employee clicked on employee page as well as their current (non-revoked) computer, and renders the employee detail page
+    """This method queries the database for the employee clicked on employee page as well as their current (non-revoked) computer, their chain of command and direct reports, and renders the employee detail page
 
     Author: Rachel Daniel
 
     Returns:
         render -- loads the employee_detail.html template.
     """
-    employee = get_object_or_404(Employee, pk=employee_id)
-    employee_computer = EmployeeComputer.objects.filter(employee_id=employee_id).filter(date_revoked=None)
-    context = {"employee": employee, "employee_computer": employee_computer}
+    # headcount counts everyone under the employee at any depth, off the reporting line closure
+    employee = get_object_or_404(Employee.objects.select_related("department").annotate(headcount=Count("descendant_lines")), pk=employee_id)
+    employee_computer = EmployeeComputer.objects.filter(employee_id=employee_id).filter(date_revoked=None).select_related("computer")
+    employee_trainings = EmployeeTraining.objects.filter(employee_id=employee_id).select_related("training").order_by("training__start_date")
+    context = {
+        "employee": employee,
+        "employee_computer": employee_computer,
+        "employee_trainings": employee_trainings,
+        "chain_of_command": chain_of_command(employee_id),
+        "direct_reports": reports_under(employee_id, max_depth=1)
+    }
     return render(request, "agileHR/employee_detail.html", context)
 
 
+def employee_computers(request, employee_id):
+    """Lists the computers an employee held at any point between two dates (?from=YYYY-MM-DD&to=YYYY-MM-DD, both days included, either may be left out), off the employee's own assignment history.
+
+    Returns:
+        render -- the employee_computers template
+    """
+
+    employee = get_object_or_404(Employee, pk=employee_id)
+    start, end = request.GET.get("from", ""), request.GET.get("to", "")
+    context = {"employee": employee, "from": start, "to": end}
+    try:
+        since = period(start)[0] if start else None
+        until = None
+        if end:
+            # a day given as to is included whole, so the period ends where that day does
+            moment, day_end = period(end)
+            until = day_end or moment
+        context["assignments"] = computers_held(employee_id, since, until)
+    except ValueError as error:
+        context["error_message"] = str(error)
+    return render(request, "agileHR/employee_computers.html", context)
+
+
 def employee_add(request):
     """This method queries the database for the departments and renders the form for adding a new employee. Upon submit, the method collects form data from post request, validates, and adds a new employee
 
@@ -90,22 +163,14 @@ def employee_edit(request, employee_id):
     now = datetime.datetime.now()
     departments = Department.objects.order_by("name")
     employee = get_object_or_404(Employee, pk=employee_id)
-    employee_computer = EmployeeComputer.objects.filter(employee_id=employee_id, date_revoked=None)
+    employee_computer = EmployeeComputer.objects.filter(employee_id=employee_id, date_revoked=None).select_related("computer")
     trainings = Training.objects.filter(start_date__gt=now).order_by("start_date")
-    employee_trainings = EmployeeTraining.objects.filter(employee_id=employee_id, training__start_date__gte=now)
-
-
-    # Get all computer assignment history
-    computer_assignments = EmployeeComputer.objects.all()
-
-    # Get computers that have previously been assigned but currently aren't
-    currently_unassigned = Computer.objects.exclude(employeecomputer__date_revoked=None)
+    # the department's supervisors, and whoever the employee reports to now
+    supervisors = Employee.objects.filter(Q(is_supervisor=True, department_id=employee.department_id) | Q(pk=employee.supervisor_id)).exclude(pk=employee.pk).order_by("last_name", "first_name")
+    employee_trainings = EmployeeTraining.objects.filter(employee_id=employee_id, training__start_date__gte=now).select_related("training")
 
-    # Get computers that have never been assigned
-    never_assigned = Computer.objects.exclude(employeecomputer__in=computer_assignments)
-
-    #combine queryset for final set of available computers
-    computers = currently_unassigned | never_assigned
+    # computers that are neither assigned nor retired, read off the availability index
+    computers = available_computers()
 
     if request.method == "POST":
 
@@ -119,6 +184,8 @@ def employee_edit(request, employee_id):
             __comp = request.POST["computer"]
             delete_training_set = request.POST.getlist("delete")
             add_training_set = request.POST.getlist("trainings")
+            join_waitlist = request.POST.get("waitlist", "") == "on"
+            supervisor_id = request.POST.get("supervisor", "")
 
             # check to make sure mandatory info is populated
             if first_name == "" or last_name == "" or start_date == "":
@@ -129,6 +196,7 @@ def employee_edit(request, employee_id):
                     "employee_trainings": employee_trainings,
                     "trainings": trainings,
                     "departments": departments,
+                    "supervisors": supervisors,
                     "edit": "edit",
                     "first_name": employee.first_name,
                     "last_name": employee.last_name,
@@ -136,45 +204,49 @@ def employee_edit(request, employee_id):
                     "end_date": employee.end_date.date() if employee.end_date else None,
                     "is_supervisor": employee.is_supervisor,
                     "department": employee.department,
+                    "supervisor_id": employee.supervisor_id,
                     "error_message": "You must complete all required fields."
                 }
                 return render(request, "agileHR/employee_form.html", context)
             else:
 
-                # check for new computer assignment-- if new comp, unassign any old comps and create join enitity for new
-                if __comp != "select":
-                    if employee_computer:
-                        for assignment in employee_computer:
-                            assignment.date_revoked = now
-                            assignment.save()
-                    new_computer = get_object_or_404(Computer, pk=__comp)
-                    join = EmployeeComputer(computer=new_computer, employee=employee, date_assigned=now)
-                    join.save()
-                    employee.employeecomputer_set.add(join)
-
-                # delete any upcoming trainings with delete boxes checked
-                for training in delete_training_set:
-                    employee_training = EmployeeTraining.objects.get(pk=training)
-                    employee_training.delete()
-
-                # add a join entity to EmployeeTraining for every upcoming training selected
-                for training in add_training_set:
-                    new_training = get_object_or_404(Training, pk=training)
-                    join = EmployeeTraining(employee=employee, training=new_training)
-                    join.save()
-                    employee.employeetraining_set.add(join)
-
-
-                #update employee entity with any altered info
-                employee.first_name = first_name
-                employee.last_name = last_name
-                employee.department = department
-                employee.is_supervisor = is_supervisor
-                employee.start_date = start_date
-                if end_date != "":
-                    employee.end_date = end_date
-                employee.save()
+                # apply the whole edit as one transaction, so it commits (and syncs to disk) once; with the write queue on, that transaction may be shared with other requests' writes
+                def apply_edit():
+
+                    # refuse a supervisor who reports to this employee before anything is changed
+                    supervisor = get_object_or_404(Employee, pk=supervisor_id) if supervisor_id.isdigit() else None
+                    check_supervisor(employee, supervisor.pk if supervisor else None)
+
+                    # check for new computer assignment-- if new comp, revoke any old comps in one update and create join entity for new
+                    if __comp != "select":
+                        new_computer = get_object_or_404(Computer, pk=__comp, is_available=True)
+                        assign_computer(employee, new_computer, now)
+
+                    # delete any upcoming trainings with delete boxes checked in one statement, freeing their seats
+                    withdraw(EmployeeTraining.objects.filter(employee=employee, pk__in=[pk for pk in delete_training_set if pk.isdigit()]))
+
+                    # add a join entity to EmployeeTraining for every upcoming training selected that the employee is not already in, in one insert, provided each has a seat left or the waitlist was asked for
+                    enrolled = EmployeeTraining.objects.filter(employee=employee).values("training_id")
+                    selected = list(Training.objects.filter(pk__in=[pk for pk in add_training_set if pk.isdigit()]).exclude(pk__in=enrolled))
+                    seated = {enrollment.training_id for enrollment in enroll(employee, selected, waitlist=join_waitlist)}
+
+                    #update employee entity with any altered info
+                    employee.first_name = first_name
+                    employee.last_name = last_name
+                    employee.department = department
+                    employee.is_supervisor = is_supervisor
+                    # saving moves the employee's whole subtree under the new supervisor
+                    employee.supervisor = supervisor
+                    employee.start_date = start_date
+                    if end_date != "":
+                        employee.end_date = end_date
+                    employee.save()
+                    return [training.title for training in selected if training.pk not in seated]
+
+                waitlisted = write(apply_edit)
                 messages.success(request, 'Saved!')
+                if waitlisted:
+                    messages.info(request, f"Waitlisted for {', '.join(waitlisted)}")
                 return HttpResponseRedirect(reverse("agileHR:employee"))
 
 
@@ -186,6 +258,7 @@ def employee_edit(request, employee_id):
             "employee_trainings": employee_trainings,
             "trainings": trainings,
             "departments": departments,
+            "supervisors": supervisors,
             "edit": "edit",
             "first_name": employee.first_name,
             "last_name": employee.last_name,
@@ -193,9 +266,30 @@ def employee_edit(request, employee_id):
             "end_date": employee.end_date.date() if employee.end_date else None,
             "is_supervisor": employee.is_supervisor,
             "department": employee.department,
+            "supervisor_id": employee.supervisor_id,
             "error_message": "You must complete all required fields."
             }
             return render(request, 'agileHR/employee_form.html', context)
+        except (TrainingFull, ScheduleConflict, HierarchyCycle) as refused:
+            context = {
+            "employee": employee,
+            "computers": computers,
+            "employee_computer": employee_computer,
+            "employee_trainings": employee_trainings,
+            "trainings": trainings,
+            "departments": departments,
+            "supervisors": supervisors,
+            "edit": "edit",
+            "first_name": employee.first_name,
+            "last_name": employee.last_name,
+            "start_date": employee.start_date.date(),
+            "end_date": employee.end_date.date() if employee.end_date else None,
+            "is_supervisor": employee.is_supervisor,
+            "department": employee.department,
+            "supervisor_id": employee.supervisor_id,
+            "error_message": f"No changes were saved: {refused}."
+            }
+            return render(request, 'agileHR/employee_form.html', context)
     else:
         #render initial edit page with populated data
         context = {
@@ -205,13 +299,14 @@ def employee_edit(request, employee_id):
             "employee_trainings": employee_trainings,
             "trainings": trainings,
             "departments": departments,
+            "supervisors": supervisors,
             "edit": "edit",
             "first_name": employee.first_name,
             "last_name": employee.last_name,
             "start_date": employee.start_date.date(),
             "end_date": employee.end_date.date() if employee.end_date else None,
             "is_supervisor": employee.is_supervisor,
-            "department": employee.department
+            "department": employee.department,
+            "supervisor_id": employee.supervisor_id
             }
-        print("employee_computer", context["employee_computer"])
         return render(request, "agileHR/employee_form.html", context)
@@ -0,0 +1,18 @@
+import datetime
+from django.http import Http404, StreamingHttpResponse
+from agileHR.exports import EXPORTS, FORMATS
+
+
+def export(request, dataset, file_format):
+    """This method streams a whole dataset (employees, assignments or enrollments) as a CSV or JSON download, writing each row as it is read from the database.
+
+    Returns:
+        StreamingHttpResponse -- the file, served as an attachment named after the dataset and today's date
+    """
+
+    if dataset not in EXPORTS or file_format not in FORMATS:
+        raise Http404("No such export")
+    encode, content_type = FORMATS[file_format]
+    response = StreamingHttpResponse(encode(EXPORTS[dataset]), content_type=f"{content_type}; charset=utf-8")
+    response["Content-Disposition"] = f'attachment; filename="{dataset}-{datetime.date.today()}.{file_format}"'
+    return response
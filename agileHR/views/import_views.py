@@ -0,0 +1,33 @@
+from django.shortcuts import render
+from agileHR.exports import EXPORTS
+from agileHR.importer import IMPORTERS, DecodedLines, import_csv
+
+# rejected rows listed on the page; the full count is always shown
+ERRORS_SHOWN = 100
+
+
+def import_data(request):
+    """This method loads a form to upload a CSV file of departments, employees, computers or trainings, and, on POST, streams the file into the database and reports what was created and which rows were rejected.
+
+    Returns:
+        render -- loads the import.html template.
+    """
+
+    context = {"kinds": list(IMPORTERS), "exports": list(EXPORTS)}
+    if request.method == "POST":
+        kind = request.POST.get("kind")
+        upload = request.FILES.get("csv_file")
+        if kind not in IMPORTERS or upload is None:
+            context["error_message"] = "Choose what the file holds and a CSV file to upload."
+            context["kind"] = kind
+            return render(request, "agileHR/import.html", context)
+
+        # the upload is decoded as it is read, a line at a time, rather than loaded whole, so a line in another encoding is rejected on its own
+        report = import_csv(kind, DecodedLines(upload.file))
+        context.update({
+            "kind": kind,
+            "report": report,
+            "errors": report.errors[:ERRORS_SHOWN],
+            "more_errors": report.failed - min(report.failed, ERRORS_SHOWN)
+        })
+    return render(request, "agileHR/import.html", context)
@@ -4,8 +4,16 @@ from django.http import HttpResponse, HttpResponseRedirect
 from django.urls import reverse
 from django.contrib import messages
 from agileHR.models import *
+from agileHR.tallies import HEADCOUNT_LIMIT, UPCOMING_DAYS, dashboard
 
 
 def index(request):
-    context = {}
-    return render(request, "agileHR/index.html", context)
+    """Displays the dashboard: headcounts, employee and computer totals read from the Tally summary rows, and the fill rates of the trainings starting soon
+
+    Returns:
+        render -- loads the dashboard.html template
+    """
+
+    context = dashboard()
+    context.update({"headcount_limit": HEADCOUNT_LIMIT, "upcoming_days": UPCOMING_DAYS})
+    return render(request, "agileHR/dashboard.html", context)
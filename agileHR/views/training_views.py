@@ -4,6 +4,10 @@ from django.http import HttpResponse, HttpResponseRedirect
 from django.urls import reverse
 from django.contrib import messages
 from agileHR.models import *
+from agileHR.enrollment import promote_waitlist
+from agileHR.fragments import page_versions
+from agileHR.stamps import conditional_page, training_modified
+from bangazon.db.writer import write
 
 def training(request):
     """Displays the list of upcoming training sessions with links to details for each one.
@@ -14,10 +18,14 @@ def training(request):
         render -- Returns the training template
     """
 
-    training_list = Training.objects.filter(end_date__date__gte=datetime.date.today()).order_by("start_date")
+    today = datetime.date.today()
+    # compares end_date with the start of today rather than casting it to a date, so an index on end_date can serve the filter
+    start_of_today = timezone.make_aware(datetime.datetime.combine(today, datetime.time()))
+    training_list = list(Training.objects.filter(end_date__gte=start_of_today).order_by("start_date"))
 
     context = {
         "training_list": training_list,
+        "list_version": f"{page_versions(training_list, 'training', lists=['training'])}.{today}",
         "view": "upcoming"
     }
 
@@ -33,16 +41,21 @@ def training_past(request):
         render -- returns the training template
     """
 
-    training_list = Training.objects.filter(end_date__date__lt=datetime.date.today()).order_by("-start_date")
+    today = datetime.date.today()
+    # compares end_date with the start of today rather than casting it to a date, so an index on end_date can serve the filter
+    start_of_today = timezone.make_aware(datetime.datetime.combine(today, datetime.time()))
+    training_list = list(Training.objects.filter(end_date__lt=start_of_today).order_by("-start_date"))
 
     context = {
         "training_list": training_list,
+        "list_version": f"{page_versions(training_list, 'training', lists=['training'])}.{today}",
         "view": "past"
     }
 
     return render(request, "agileHR/training.html", context)
 
 
+@conditional_page(training_modified)
 def training_detail(request, training_id):
     """Displays the details about a single training session hosted by the company
 
@@ -57,7 +70,7 @@ def training_detail(request, training_id):
 
     now = datetime.datetime.now(timezone.utc)
     training_details = get_object_or_404(Training, pk=training_id)
-    attendee_size = len(EmployeeTraining.objects.filter(training_id=training_id))
+    attendee_size = training_details.seats_taken
     start_future = True
     end_future = True
     if training_details.start_date < now:
@@ -65,8 +78,13 @@ def training_detail(request, training_id):
     if training_details.end_date < now:
         end_future = False
 
+    attendees = EmployeeTraining.objects.filter(training_id=training_id).select_related("employee").order_by("employee__last_name", "employee__first_name")
+    waitlist = WaitlistEntry.objects.filter(training_id=training_id).select_related("employee").order_by("joined_at", "id")
+
     context = {
         "training_details": training_details,
+        "attendees": attendees,
+        "waitlist": waitlist,
         "attendee_size": attendee_size,
         "start_future": start_future,
         "end_future": end_future
@@ -132,7 +150,13 @@ def training_edit(request, training_id):
                 training_details.start_date = datetime.datetime.strptime(start_date, "%Y-%m-%d")
                 training_details.end_date = datetime.datetime.strptime(end_date, "%Y-%m-%d")
                 training_details.max_attendees = max_attendees
-                training_details.save()
+
+                def apply_edit():
+                    training_details.save()
+                    # a larger class lets the head of the waitlist in
+                    promote_waitlist(training_id)
+
+                write(apply_edit)
                 return HttpResponseRedirect(reverse("agileHR:traindetail", args=(training_id,)))
         except KeyError:
             return render(request, "agileHR/training_form.html", {
@@ -176,7 +200,7 @@ def training_add(request):
                 })
             else:
                 new_training = Training(title=title, start_date=start_date, end_date=end_date, max_attendees=max_attendees)
-                new_training.save()
+                write(new_training.save)
                 return HttpResponseRedirect(reverse("agileHR:training"))
         except KeyError:
             return render(request, "agileHR/training_form.html", {
@@ -0,0 +1,113 @@
+"""
+SQLite backend for the bangazon project.
+
+The stock django.db.backends.sqlite3 backend, plus connect-time PRAGMAs and an
+optional BEGIN IMMEDIATE for transactions, both read from the database OPTIONS:
+
+    'OPTIONS': {
+        'journal_mode': 'wal',        # readers no longer wait for the writer
+        'synchronous': 'normal',      # with WAL, fsync at checkpoints rather than every commit
+        'mmap_size': 268435456,       # bytes of the file read through memory-mapped I/O
+        'cache_size': -65536,         # page cache; negative values are KiB
+        'busy_timeout': 5000,         # ms to wait for the write lock before "database is locked"
+        'transaction_mode': 'immediate',
+        'cached_statements': 256,     # passed through to sqlite3.connect
+    }
+
+Every other option is handed to sqlite3.connect, as with the stock backend.
+
+Connections also take callbacks to run inside a transaction just before it
+commits, registered with before_commit(): writes that must commit, or roll
+back, with the rest of the transaction, e.g. the agileHR audit trail.
+"""
+
+import re
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+# the PRAGMAs applied to every new connection, in this order; journal_mode first, since the others behave differently under WAL
+PRAGMAS = ("journal_mode", "synchronous", "mmap_size", "cache_size", "busy_timeout", "temp_store")
+
+# values are interpolated into the PRAGMA statement, so only plain words and integers are accepted
+PRAGMA_VALUE = re.compile(r"^(-?\d+|[A-Za-z]+)$")
+
+TRANSACTION_MODES = ("DEFERRED", "IMMEDIATE", "EXCLUSIVE")
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """SQLite connection that is tuned at connect time for several workers sharing one database file."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # (savepoint ids, callback) pairs, as with run_on_commit, so rolling back to a savepoint drops the callbacks registered since
+        self.run_before_commit = []
+        # set while commit() runs those callbacks; atomic() has already left its block by then
+        self.committing = False
+
+    def before_commit(self, func):
+        """Runs func inside the current transaction, right before it commits, or at once outside a transaction. Callbacks run in the order they were registered, and may register more, which run after them; a callback that raises makes the commit fail."""
+
+        if not self.in_atomic_block and not self.committing:
+            func()
+            return
+        self.run_before_commit.append((set(self.savepoint_ids), func))
+
+    def commit(self):
+        self.committing = True
+        try:
+            while self.run_before_commit:
+                _, func = self.run_before_commit.pop(0)
+                func()
+        finally:
+            self.committing = False
+        super().commit()
+
+    def rollback(self):
+        super().rollback()
+        self.run_before_commit = []
+
+    def savepoint_rollback(self, sid):
+        super().savepoint_rollback(sid)
+        self.run_before_commit = [(sids, func) for (sids, func) in self.run_before_commit if sid not in sids]
+
+    def close(self):
+        self.run_before_commit = []
+        super().close()
+
+    def pragmas(self):
+        """The PRAGMAs configured in OPTIONS, validated, as (name, value) pairs."""
+
+        options = self.settings_dict["OPTIONS"]
+        pragmas = []
+        for name in PRAGMAS:
+            value = options.get(name)
+            if value is None or value == "":
+                continue
+            if not PRAGMA_VALUE.match(str(value)):
+                raise ImproperlyConfigured(f"The {name} database option must be a word or an integer, not {value!r}")
+            pragmas.append((name, value))
+        return pragmas
+
+    def transaction_mode(self):
+        mode = (self.settings_dict["OPTIONS"].get("transaction_mode") or "DEFERRED").upper()
+        if mode not in TRANSACTION_MODES:
+            raise ImproperlyConfigured(f"The transaction_mode database option must be one of {', '.join(TRANSACTION_MODES)}")
+        return mode
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        for name in PRAGMAS + ("transaction_mode",):
+            params.pop(name, None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        for name, value in self.pragmas():
+            connection.execute(f"PRAGMA {name} = {value}")
+        return connection
+
+    def _start_transaction_under_autocommit(self):
+        # IMMEDIATE takes the write lock when the transaction begins, so a transaction that reads
+        # before writing waits out busy_timeout for the lock instead of failing when it upgrades
+        self.cursor().execute(f"BEGIN {self.transaction_mode()}")
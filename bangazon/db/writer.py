@@ -0,0 +1,163 @@
+"""
+Single-writer queue with group commit for the bangazon project.
+
+SQLite lets one connection write at a time. When several request threads write
+at once, each waits for the lock, then commits, and every commit is its own
+journal sync. With WRITE_QUEUE enabled, views hand their writes to write(),
+which queues them for one background thread per process. That thread takes
+every job waiting in the queue and runs them in a single transaction, each
+inside its own savepoint, so a failing job rolls back alone and the rest
+commit together. Each caller blocks until the transaction holding its job has
+committed, then gets the job's return value, or its exception re-raised.
+"""
+
+import contextvars
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+# put on the queue to stop the writer thread
+STOP = object()
+
+
+class WriteQueue:
+    """Runs write jobs on one background thread, committing the jobs that arrive together in one transaction.
+
+    Arguments:
+        using {str} -- the database alias written to
+        max_batch {int} -- most jobs committed in one transaction
+        max_wait {float} -- seconds the writer lingers for more jobs after the first; 0 batches only what is already queued
+    """
+
+    def __init__(self, using=DEFAULT_DB_ALIAS, max_batch=64, max_wait=0.0):
+        self.using = using
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.lock = threading.Lock()
+        self.jobs = None
+        self.thread = None
+        self.pid = None
+        self.batches = 0
+        self.jobs_committed = 0
+
+    def submit(self, function, *args, **kwargs):
+        """Queues a job and waits for the transaction it runs in to commit.
+
+        The job runs in a copy of the caller's context, so context variables the request set (e.g. the path agileHR.audit tags entries with) are visible to it on the writer thread.
+
+        Returns:
+            the job's return value; an exception raised by the job, or by the commit, is re-raised here
+        """
+
+        future = Future()
+        context = contextvars.copy_context()
+        self.start().put((context.run, (function,) + args, kwargs, future))
+        return future.result()
+
+    def start(self):
+        """Starts the writer thread if this process has none yet, e.g. in a worker forked after the parent started one"""
+
+        with self.lock:
+            if self.pid != os.getpid() or self.thread is None or not self.thread.is_alive():
+                self.pid = os.getpid()
+                self.jobs = queue.Queue()
+                self.thread = threading.Thread(target=self.run, args=(self.jobs,), name="bangazon-writer", daemon=True)
+                self.thread.start()
+            return self.jobs
+
+    def stop(self):
+        """Lets the writer finish the jobs already queued, then ends its thread and closes its connection"""
+
+        with self.lock:
+            thread, jobs = self.thread, self.jobs
+            self.thread = None
+        if thread is not None and thread.is_alive() and self.pid == os.getpid():
+            jobs.put(STOP)
+            thread.join()
+
+    def collect(self, jobs):
+        """Waits for a job, then takes whatever else is queued, up to max_batch"""
+
+        batch = [jobs.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch and batch[-1] is not STOP:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(jobs.get(timeout=remaining) if remaining > 0 else jobs.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def run(self, jobs):
+        try:
+            while True:
+                batch = self.collect(jobs)
+                stopping = batch[-1] is STOP
+                if stopping:
+                    batch.pop()
+                if batch:
+                    self.commit(batch)
+                if stopping:
+                    return
+        finally:
+            connections[self.using].close()
+
+    def commit(self, batch):
+        """Runs a batch of jobs in one transaction, one savepoint each, and hands out the outcomes once it has committed"""
+
+        connections[self.using].close_if_unusable_or_obsolete()
+        outcomes = []
+        try:
+            with transaction.atomic(using=self.using):
+                for function, args, kwargs, future in batch:
+                    try:
+                        with transaction.atomic(using=self.using):
+                            outcomes.append((future, function(*args, **kwargs), None))
+                    except Exception as exc:
+                        outcomes.append((future, None, exc))
+        except Exception as exc:
+            for _, _, _, future in batch:
+                future.set_exception(exc)
+            return
+
+        self.batches += 1
+        self.jobs_committed += len(outcomes)
+        for future, result, exc in outcomes:
+            if exc is None:
+                future.set_result(result)
+            else:
+                future.set_exception(exc)
+
+
+_write_queue = None
+_write_queue_lock = threading.Lock()
+
+
+def write_queue():
+    """The process-wide WriteQueue, configured from WRITE_QUEUE_MAX_BATCH and WRITE_QUEUE_MAX_WAIT"""
+
+    global _write_queue
+    with _write_queue_lock:
+        if _write_queue is None:
+            _write_queue = WriteQueue(
+                max_batch=getattr(settings, "WRITE_QUEUE_MAX_BATCH", 64),
+                max_wait=getattr(settings, "WRITE_QUEUE_MAX_WAIT", 0.0)
+            )
+        return _write_queue
+
+
+def write(function, *args, **kwargs):
+    """Runs a write job atomically and returns its result.
+
+    With WRITE_QUEUE on, the job goes through the process's single writer and may share its transaction with the jobs of other requests. Otherwise, or when the caller is already inside a transaction, which the writer could not see into, it runs here in a transaction of its own.
+    """
+
+    if not getattr(settings, "WRITE_QUEUE", False) or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+        with transaction.atomic():
+            return function(*args, **kwargs)
+    return write_queue().submit(function, *args, **kwargs)
@@ -0,0 +1,294 @@
+"""
+Prometheus metrics for the bangazon project.
+
+Each worker process aggregates its own counters and histograms in memory under
+a single lock. When METRICS_DIR is set, every worker also writes a snapshot of
+its figures to <METRICS_DIR>/<pid>.json at most once per METRICS_FLUSH_INTERVAL
+seconds, and the /metrics view sums the snapshots of all the workers sharing
+the directory, so whichever worker answers the scrape reports the whole host.
+"""
+
+import copy
+import json
+import math
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.http import HttpResponse
+
+from . import timing
+from .middleware import route_name
+
+# upper bounds, in seconds, of the latency buckets; wide enough to catch a page doing hundreds of queries
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Metric:
+    """Base of the metric types: a name, its help text and one value per combination of label values."""
+
+    kind = None
+
+    def __init__(self, name, documentation, labelnames):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.values = {}
+
+    def merge(self, labels, value):
+        """Adds to the value held for the given labels; also how snapshots of other workers are summed in."""
+
+        self.values[labels] = self.values.get(labels, 0) + value
+
+    def empty_copy(self):
+        metric = copy.copy(self)
+        metric.values = {}
+        return metric
+
+    def samples(self):
+        """Yields (suffix, labels, value) for every line of the exposition."""
+
+        for labels, value in sorted(self.values.items()):
+            yield "", labels, value
+
+
+class Counter(Metric):
+    kind = "counter"
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+
+class Histogram(Metric):
+    """Observations counted into fixed buckets; held per bucket and made cumulative only on output."""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames, buckets=DURATION_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = buckets
+
+    def empty(self):
+        # one slot per bucket, one for +Inf, then the sum of the observations
+        return [0] * (len(self.buckets) + 2)
+
+    def observe(self, labels, amount):
+        slots = self.values.get(labels)
+        if slots is None:
+            slots = self.values[labels] = self.empty()
+        for index, bound in enumerate(self.buckets):
+            if amount <= bound:
+                break
+        else:
+            index = len(self.buckets)
+        slots[index] += 1
+        slots[-1] += amount
+
+    def merge(self, labels, value):
+        slots = self.values.setdefault(labels, self.empty())
+        for index, amount in enumerate(value):
+            slots[index] += amount
+
+    def samples(self):
+        for labels, slots in sorted(self.values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), slots):
+                cumulative += count
+                yield "_bucket", labels + (("le", format_value(bound)),), cumulative
+            yield "_sum", labels, slots[-1]
+            yield "_count", labels, cumulative
+
+
+class Registry:
+    """Holds the metrics of one process and renders them, alone or merged with other workers' snapshots."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = {}
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def snapshot(self):
+        """Returns the current values as plain JSON-serializable data."""
+
+        with self.lock:
+            return {
+                name: [[list(labels), value] for labels, value in metric.values.items()]
+                for name, metric in self.metrics.items()
+            }
+
+    def merged(self, snapshots):
+        """Builds a fresh registry of the same metrics holding the sum of the given snapshots."""
+
+        combined = Registry()
+        for metric in self.metrics.values():
+            combined.register(metric.empty_copy())
+        for snapshot in snapshots:
+            for name, values in snapshot.items():
+                metric = combined.metrics.get(name)
+                if metric is None:
+                    continue
+                for labels, value in values:
+                    metric.merge(tuple(labels), value)
+        return combined
+
+    def exposition(self):
+        """Renders the metrics in the Prometheus text format."""
+
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for suffix, labels, value in metric.samples():
+                pairs = list(zip(metric.labelnames, labels)) + list(labels[len(metric.labelnames):])
+                rendered = ",".join(f'{key}="{escape(label)}"' for key, label in pairs)
+                lines.append(f"{metric.name}{suffix}{{{rendered}}} {format_value(value)}" if rendered else f"{metric.name}{suffix} {format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+REGISTRY = Registry()
+
+REQUEST_DURATION = REGISTRY.register(Histogram(
+    "bangazon_http_request_duration_seconds", "Time spent serving requests, by URL name.", ("route", "method")
+))
+RESPONSES = REGISTRY.register(Counter(
+    "bangazon_http_responses_total", "Responses sent, by URL name and status code.", ("route", "method", "status")
+))
+IN_FLIGHT = REGISTRY.register(Gauge(
+    "bangazon_http_requests_in_flight", "Requests currently being served.", ()
+))
+DB_DURATION = REGISTRY.register(Histogram(
+    "bangazon_db_query_duration_seconds", "Total time a request spent waiting on SQL, by URL name.", ("route",)
+))
+DB_QUERIES = REGISTRY.register(Counter(
+    "bangazon_db_queries_total", "SQL statements executed, by URL name.", ("route",)
+))
+
+
+def metrics_dir():
+    return getattr(settings, "METRICS_DIR", None)
+
+
+def snapshot_path(directory, pid):
+    return os.path.join(directory, f"{pid}.json")
+
+
+def write_snapshot(directory):
+    """Atomically replaces this worker's snapshot file."""
+
+    os.makedirs(directory, exist_ok=True)
+    path = snapshot_path(directory, os.getpid())
+    temporary = f"{path}.tmp"
+    with open(temporary, "w") as snapshot_file:
+        json.dump(REGISTRY.snapshot(), snapshot_file)
+    os.replace(temporary, path)
+
+
+def is_running(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def read_snapshots(directory):
+    """Loads every worker's snapshot; gauges of workers that have exited are dropped, their counters kept."""
+
+    snapshots = []
+    for filename in os.listdir(directory):
+        stem, extension = os.path.splitext(filename)
+        if extension != ".json" or not stem.isdigit():
+            continue
+        try:
+            with open(os.path.join(directory, filename)) as snapshot_file:
+                snapshot = json.load(snapshot_file)
+        except (OSError, ValueError):
+            continue
+        if int(stem) != os.getpid() and not is_running(int(stem)):
+            snapshot.pop(IN_FLIGHT.name, None)
+        snapshots.append(snapshot)
+    return snapshots
+
+
+class MetricsMiddleware:
+    """Records the latency, status code and SQL time of every request into REGISTRY.
+
+    Place it after ServerTimingMiddleware so both read the same statement timings.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.flush_interval = getattr(settings, "METRICS_FLUSH_INTERVAL", 5)
+        self.flushed_at = 0.0
+
+    def __call__(self, request):
+        with timing.timed_request() as request_timing:
+            with REGISTRY.lock:
+                IN_FLIGHT.merge((), 1)
+            started = time.perf_counter()
+            status = 500
+            try:
+                response = self.get_response(request)
+                status = response.status_code
+            finally:
+                elapsed = time.perf_counter() - started
+                route = route_name(request)
+                with REGISTRY.lock:
+                    IN_FLIGHT.merge((), -1)
+                    REQUEST_DURATION.observe((route, request.method), elapsed)
+                    RESPONSES.merge((route, request.method, str(status)), 1)
+                    DB_DURATION.observe((route,), request_timing.db)
+                    DB_QUERIES.merge((route,), request_timing.queries)
+        self.flush()
+        return response
+
+    def flush(self):
+        """Writes this worker's snapshot if METRICS_DIR is set and the last write is old enough."""
+
+        directory = metrics_dir()
+        now = time.monotonic()
+        if directory and now - self.flushed_at >= self.flush_interval:
+            self.flushed_at = now
+            try:
+                write_snapshot(directory)
+            except OSError:
+                pass
+
+
+def metrics(request):
+    """Serves the metrics of this host in the Prometheus text format.
+
+    Returns:
+        HttpResponse -- the exposition, summed over every worker writing to METRICS_DIR
+    """
+
+    directory = metrics_dir()
+    if directory:
+        write_snapshot(directory)
+        registry = REGISTRY.merged(read_snapshots(directory))
+    else:
+        registry = REGISTRY
+    with registry.lock:
+        body = registry.exposition()
+    return HttpResponse(body, content_type=CONTENT_TYPE)
@@ -0,0 +1,61 @@
+"""
+Middleware for the bangazon project.
+"""
+
+import logging
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from . import timing
+
+logger = logging.getLogger("bangazon.timing")
+
+
+def route_name(request):
+    """The namespaced URL name a request resolved to, e.g. agileHR:employee_edit."""
+
+    match = getattr(request, "resolver_match", None)
+    return match.view_name if match else "unresolved"
+
+
+class ServerTimingMiddleware:
+    """Reports the SQL, template and view time of every request.
+
+    The figures go out as a Server-Timing response header, which browser dev
+    tools display next to the request, and as a log line on the
+    bangazon.timing logger keyed by URL name. Set SERVER_TIMING = False to
+    take the middleware out of the stack entirely.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, "SERVER_TIMING", True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with timing.timed_request() as request_timing:
+            response = self.get_response(request)
+
+        db_ms = request_timing.db * 1000
+        template_ms = request_timing.template * 1000
+        view_ms = request_timing.view * 1000
+        response["Server-Timing"] = (
+            f'db;dur={db_ms:.1f};desc="{request_timing.queries} queries", '
+            f'tpl;dur={template_ms:.1f};desc="Templates", '
+            f'view;dur={view_ms:.1f};desc="View"'
+        )
+
+        if logger.isEnabledFor(logging.INFO):
+            name = route_name(request)
+            fields = {
+                "route": name,
+                "method": request.method,
+                "status": response.status_code,
+                "queries": request_timing.queries,
+                "db_ms": round(db_ms, 1),
+                "template_ms": round(template_ms, 1),
+                "view_ms": round(view_ms, 1)
+            }
+            logger.info(" ".join(f"{key}={value}" for key, value in fields.items()), extra={"timing": fields})
+        return response
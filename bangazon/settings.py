@@ -43,6 +43,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'bangazon.middleware.ServerTimingMiddleware',
+    'bangazon.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -50,13 +52,14 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'agileHR.middleware.AuditMiddleware',
 ]
 
 ROOT_URLCONF = 'bangazon.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'bangazon.timing.TimedDjangoTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -76,14 +79,55 @@ WSGI_APPLICATION = 'bangazon.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.1/ref/settings/#databases
 
+# bangazon.db.sqlite3 is the stock SQLite backend plus connect-time PRAGMAs (see
+# bangazon/db/sqlite3/base.py). Each setting can be overridden per environment.
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'ENGINE': 'bangazon.db.sqlite3',
+        'NAME': os.environ.get('BANGAZON_DB_NAME', os.path.join(BASE_DIR, 'db.sqlite3')),
+        # seconds a worker keeps its connection open between requests; 0 reconnects every request
+        'CONN_MAX_AGE': int(os.environ.get('BANGAZON_DB_CONN_MAX_AGE', '600')),
+        'OPTIONS': {
+            'journal_mode': os.environ.get('BANGAZON_DB_JOURNAL_MODE', 'wal'),
+            'synchronous': os.environ.get('BANGAZON_DB_SYNCHRONOUS', 'normal'),
+            'mmap_size': int(os.environ.get('BANGAZON_DB_MMAP_SIZE', str(256 * 1024 * 1024))),
+            'cache_size': int(os.environ.get('BANGAZON_DB_CACHE_SIZE', str(-64 * 1024))),
+            'busy_timeout': int(os.environ.get('BANGAZON_DB_BUSY_TIMEOUT', '5000')),
+            'transaction_mode': os.environ.get('BANGAZON_DB_TRANSACTION_MODE', 'immediate'),
+            'cached_statements': int(os.environ.get('BANGAZON_DB_CACHED_STATEMENTS', '256')),
+        },
+    }
+}
+
+
+# Cache
+# The list pages cache their rendered rows in the default cache (see
+# agileHR/fragments.py). LocMemCache is private to each process, so a deployment
+# with several workers should point BANGAZON_CACHE_BACKEND/LOCATION at a shared
+# cache, e.g. django.core.cache.backends.memcached.MemcachedCache and 127.0.0.1:11211.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('BANGAZON_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('BANGAZON_CACHE_LOCATION', 'bangazon'),
     }
 }
 
 
+# Write queue
+# With BANGAZON_WRITE_QUEUE=1, the form views hand their writes to one writer
+# thread per process, which commits the writes of concurrent requests together
+# (see bangazon/db/writer.py). Off by default: one transaction per request.
+
+WRITE_QUEUE = os.environ.get('BANGAZON_WRITE_QUEUE', '0') == '1'
+
+WRITE_QUEUE_MAX_BATCH = int(os.environ.get('BANGAZON_WRITE_QUEUE_MAX_BATCH', '64'))
+
+# seconds the writer waits for more writes before committing; 0 commits whatever has queued up meanwhile
+WRITE_QUEUE_MAX_WAIT = float(os.environ.get('BANGAZON_WRITE_QUEUE_MAX_WAIT', '0'))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/2.1/ref/settings/#auth-password-validators
 
@@ -121,3 +165,37 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/2.1/howto/static-files/
 
 STATIC_URL = '/static/'
+
+
+# Per-request timing
+# ServerTimingMiddleware reports SQL, template and view time as a Server-Timing
+# header and logs it on the bangazon.timing logger; set BANGAZON_TIMING_LOG=INFO
+# to see one line per request.
+
+SERVER_TIMING = os.environ.get('BANGAZON_SERVER_TIMING', '1') != '0'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'bangazon.timing': {
+            'handlers': ['console'],
+            'level': os.environ.get('BANGAZON_TIMING_LOG', 'WARNING'),
+            'propagate': False,
+        },
+    },
+}
+
+
+# Prometheus metrics, served at /metrics
+# Point BANGAZON_METRICS_DIR at a directory shared by the WSGI workers of a host
+# (one that is emptied on deploys) to report their figures summed.
+
+METRICS_DIR = os.environ.get('BANGAZON_METRICS_DIR') or None
+
+METRICS_FLUSH_INTERVAL = float(os.environ.get('BANGAZON_METRICS_FLUSH_INTERVAL', '5'))
@@ -0,0 +1,118 @@
+"""
+Per-request timing for the bangazon project.
+
+The timing of the request being served lives in a thread local, so the database
+execute wrapper and the template backend below can add to it without being
+handed the request. Both do nothing but call the wrapped code when no request
+is being timed.
+"""
+
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+
+from django.template.backends.django import DjangoTemplates, Template, reraise
+from django.template.exceptions import TemplateDoesNotExist
+
+_local = threading.local()
+
+
+class RequestTiming:
+    """Accumulates the time one request spends in SQL and in template rendering."""
+
+    __slots__ = ("queries", "db", "template", "view")
+
+    def __init__(self):
+        self.queries = 0
+        self.db = 0.0
+        self.template = 0.0
+        self.view = 0.0
+
+
+def start():
+    """Begins timing the current thread's request and returns its RequestTiming."""
+
+    _local.timing = RequestTiming()
+    return _local.timing
+
+
+def stop():
+    """Stops timing the current thread's request."""
+
+    _local.timing = None
+
+
+def current():
+    """Returns the RequestTiming of the request this thread is serving, if it is being timed."""
+
+    return getattr(_local, "timing", None)
+
+
+@contextmanager
+def timed_request():
+    """Times the SQL and templates run inside the block and yields the RequestTiming.
+
+    Nested blocks share the outer timing, so several middleware can read the
+    same figures while the statements are only wrapped once.
+    """
+
+    timing = current()
+    if timing is not None:
+        yield timing
+        return
+    timing = start()
+    started = time.perf_counter()
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(time_query))
+            yield timing
+    finally:
+        timing.view = time.perf_counter() - started
+        stop()
+
+
+def time_query(execute, sql, params, many, context):
+    """Database execute wrapper adding each statement's duration to the current request."""
+
+    timing = current()
+    if timing is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timing.queries += 1
+        timing.db += time.perf_counter() - started
+
+
+class TimedTemplate(Template):
+    """Backend template recording how long the top-level render takes.
+
+    Included and extended templates render inside it through the engine, so they are not counted twice.
+    """
+
+    def render(self, context=None, request=None):
+        timing = current()
+        if timing is None:
+            return super().render(context, request)
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            timing.template += time.perf_counter() - started
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """The stock Django template backend, handing out TimedTemplate instances."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
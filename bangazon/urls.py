@@ -16,7 +16,10 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from .metrics import metrics
+
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("bangazon/", include('agileHR.urls')),
+    path("metrics", metrics, name="metrics"),
 ]